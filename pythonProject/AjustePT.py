@@ -1,15 +1,19 @@
-import pyperclip
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill
+
+from escritor_segundo_plano import EscritorSegundoPlano
+from gravador_resultados import GravadorResultados
+from limitador_taxa import passo_navegacao
+from modelo_instrumento import instrumentos_do_controle
+from navegacao import abrir_detalhe_instrumento, voltar_pagina_inicial
+from navegador_gerenciado import conectar_navegador
+from planilha_controle import carregar_controle
+from pool_navegadores import NUM_NAVEGADORES, executar_em_paralelo
+from rastreamento import emitir_relatorio, etapa, medir
+from registro_execucao import RegistroExecucao
+from saude_sessao import SessaoExpirada, monitor_sessao, processar_com_reinicio
 
 
 def conectar_navegador_existente():
@@ -19,10 +23,7 @@ def conectar_navegador_existente():
     try:
         print("Tentando conectar ao navegador na porta 9222...")
 
-        opcoes_navegador = webdriver.ChromeOptions()
-        opcoes_navegador.debugger_address = "localhost:9222"
-
-        navegador = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opcoes_navegador)
+        navegador = conectar_navegador()
         print("Conectado ao navegador existente com sucesso.")
         return navegador
 
@@ -33,143 +34,140 @@ def conectar_navegador_existente():
 
 def clicar_elemento(navegador, xpath, tempo_espera=10):
     """
-    Clica em um elemento identificado pelo XPath.
+    Clica em um elemento identificado pelo XPath (falha na hora se a sessão já caiu).
     """
+    monitor = monitor_sessao(navegador)
+    monitor.garantir_ativa()
     try:
-        elemento = WebDriverWait(navegador, tempo_espera).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
-        )
-        elemento.click()
+        with etapa("clicar_elemento", seletor=xpath), passo_navegacao():
+            elemento = WebDriverWait(navegador, tempo_espera).until(
+                EC.element_to_be_clickable((By.XPATH, xpath))
+            )
+            elemento.click()
+        monitor.registrar_sucesso()
         print(f"Elemento clicado: {xpath}")
     except (TimeoutException, NoSuchElementException) as erro:
         print(f"Erro ao clicar no elemento {xpath}: {erro}")
+        monitor.registrar_timeout()
+
+
+# Planilha de saída e suas colunas
+CAMINHO_ARQUIVO_SAIDA = r'C:/Users/diego.brito/Downloads/Resultados_Processados.xlsx'
+COLUNAS_SAIDA = ["Instrumento nº", "Técnico", "e-mail do Técnico", "AjustesPT", "Data da Solicitação"]
 
 
-def clicar_e_colar_texto(navegador, xpath):
+def consultar_ajustes_pt(navegador):
     """
-    Clica em um campo e cola o conteúdo da área de transferência.
+    Abre a aba de Ajustes do PT do instrumento aberto e devolve (situação, data da solicitação).
     """
+    clicar_elemento(navegador, '//*[@id="div_-173460853"]/span/span')
+    clicar_elemento(navegador, '//*[@id="menu_link_-173460853_-1293190284"]/div/span/span')
+
+    # Verificar situação "Em Análise" ou "Em Análise (aguardando parecer)"
     try:
-        elemento = WebDriverWait(navegador, 10).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
+        elemento_situacao = WebDriverWait(navegador, 5).until(
+            EC.presence_of_element_located((By.XPATH, '//*[@id="row"]//td[contains(text(),"Em Análise")]'))
         )
-        elemento.click()
-        elemento.send_keys(Keys.CONTROL, 'v')  # Cola o texto copiado
-        print(f"Texto colado no campo: {xpath}")
-    except (TimeoutException, NoSuchElementException) as erro:
-        print(f"Erro ao clicar e colar texto no elemento {xpath}: {erro}")
+        situacao = elemento_situacao.text
+        clicar_elemento(navegador, '//*[@id="tbodyrow"]/tr[5]/td[4]/nobr/a')
+        data_solicitacao = navegador.find_element(By.XPATH, '//*[@id="tr-editarDataSolicitacao"]/td[2]').text
+    except TimeoutException:
+        situacao = "Sem ajuste"
+        data_solicitacao = ""
+    return situacao, data_solicitacao
 
 
-def criar_nova_planilha_excel(caminho_arquivo, dados, colunas):
+@medir("processar_instrumento", lambda navegador, instrumento: instrumento.numero)
+def processar_instrumento(navegador, instrumento):
     """
-    Cria um novo arquivo Excel com os dados fornecidos.
+    Consulta a situação dos Ajustes do PT de um instrumento e devolve a linha de saída,
+    ou None se a consulta falhar.
     """
-    try:
-        nova_planilha = Workbook()
-        aba_resultados = nova_planilha.active
-        aba_resultados.title = "Resultados"
+    instrumento_numero = instrumento.numero
+    tecnico = instrumento.tecnico
+    email_tecnico = instrumento.email_tecnico
 
-        # Adiciona cabeçalhos na planilha
-        aba_resultados.append(colunas)
+    try:
+        # Abrir a página do instrumento (link gravado ou pesquisa pelo menu)
+        abrir_detalhe_instrumento(navegador, instrumento_numero, item_menu=5)
+        situacao, data_solicitacao = consultar_ajustes_pt(navegador)
+        voltar_pagina_inicial(navegador)
+        print(f"Instrumento {instrumento_numero}: {situacao}")
+        return [instrumento_numero, tecnico, email_tecnico, situacao, data_solicitacao]
+    except SessaoExpirada:
+        raise  # Tratada no laço principal, que reinicia o navegador
+    except Exception as erro:
+        print(f"Erro ao processar o instrumento {instrumento_numero}: {erro}")
+        return None
 
-        # Adiciona os dados processados
-        for linha in dados:
-            aba_resultados.append(linha)
 
-        # Salva o novo arquivo Excel
-        nova_planilha.save(caminho_arquivo)
-        print(f"Novo arquivo criado em: {caminho_arquivo}")
-    except Exception as erro:
-        print(f"Erro ao criar o novo arquivo Excel: {erro}")
+def registrar_resultado(gravador, registro, instrumento, linha):
+    """
+    Grava a linha do instrumento e o marca no registro de execução (executado pelo escritor em segundo plano).
+    """
+    if linha is not None:
+        gravador.registrar(linha)
+    registro.marcar(instrumento.numero, concluido=linha is not None)
 
 
-def executar_processo_principal():
+def executar_processo_principal(num_navegadores=NUM_NAVEGADORES):
     """
     Fluxo principal para carregar dados do Excel, processar informações e gerar uma nova planilha.
+    Com num_navegadores > 1, distribui os instrumentos entre navegadores isolados.
+    Uma execução interrompida é retomada: a planilha só é recriada do zero em uma execução nova
+    e os instrumentos já concluídos são pulados.
     """
     print("Iniciando o processo principal...")
 
-    # Conectar ao navegador existente
-    navegador = conectar_navegador_existente()
-    if not navegador:
-        print("Não foi possível conectar ao navegador. Encerrando o processo.")
-        return
-
-    # Definir caminhos de entrada e saída
+    # Definir caminho de entrada
     caminho_arquivo_entrada = r'C:/Users/diego.brito/Downloads/robov1/CONTROLE DE PARCERIAS CGAP.xlsx'
-    caminho_arquivo_saida = r'C:/Users/diego.brito/Downloads/Resultados_Processados.xlsx'
+
+    navegador = None
+    registro = RegistroExecucao("AjustePT")
 
     # Carregar dados do arquivo de entrada
     try:
-        dataframe = pd.read_excel(caminho_arquivo_entrada, sheet_name='PARCERIAS CGAP', engine='openpyxl')
+        # Leitura só das colunas usadas, com o número do instrumento já convertido para texto
+        dataframe = carregar_controle(caminho_arquivo_entrada, 'PARCERIAS CGAP')
+        dataframe = dataframe[dataframe["Instrumento nº"].notna()]
+
+        # Novo arquivo de resultados a cada execução; ao retomar, mantém o que já foi gravado
+        gravador = GravadorResultados(
+            CAMINHO_ARQUIVO_SAIDA, COLUNAS_SAIDA, coluna_chave="Instrumento nº",
+            coluna_instrumento="Instrumento nº", robo="AjustePT",
+        )
+        if registro.execucao_nova():
+            gravador.limpar()
 
-        # Exibir nomes de colunas para verificação
-        print("Colunas disponíveis no arquivo:", dataframe.columns.tolist())
+        instrumentos = registro.filtrar_pendentes(instrumentos_do_controle(dataframe), lambda item: item.numero)
 
-        # Verificar e converter a coluna "Instrumento nº" para string
-        if "Instrumento nº" in dataframe.columns:
-            dataframe["Instrumento nº"] = dataframe["Instrumento nº"].astype(str).str.replace(r'\.0$', '', regex=True)
+        if num_navegadores > 1:
+            resultados = executar_em_paralelo(instrumentos, processar_instrumento, num_navegadores)
         else:
-            print("A coluna 'Instrumento nº' não foi encontrada no arquivo. Encerrando o processo.")
-            return
-
-        colunas_interesse = ["Instrumento nº", "Técnico", "e-mail do Técnico"]
-        if not all(coluna in dataframe.columns for coluna in colunas_interesse):
-            print(f"Colunas necessárias não encontradas: {colunas_interesse}. Encerrando o processo.")
-            return
-
-        dados_saida = []
-
-        # Loop através de cada linha do DataFrame
-        for _, linha in dataframe.iterrows():
-            instrumento_numero = linha["Instrumento nº"]
-            tecnico = linha["Técnico"]
-            email_tecnico = linha["e-mail do Técnico"]
-
-            # Copiar número do instrumento para a área de transferência
-            pyperclip.copy(instrumento_numero)
-
-            try:
-                # Realizar interações no navegador
-                clicar_elemento(navegador, '//*[@id="menuPrincipal"]/div[1]/div[4]')
-                clicar_elemento(navegador, '//*[@id="contentMenu"]/div[1]/ul/li[5]/a')
-                clicar_e_colar_texto(navegador, '//*[@id="consultarNumeroConvenio"]')
-                clicar_elemento(navegador, '//*[@id="form_submit"]')
-                clicar_elemento(navegador, '//*[@id="instrumentoId"]/a')
-                clicar_elemento(navegador, '//*[@id="div_-173460853"]/span/span')
-                clicar_elemento(navegador, '//*[@id="menu_link_-173460853_-1293190284"]/div/span/span')
-
-
-
-                # Verificar situação "Em Análise" ou "Em Análise (aguardando parecer)"
-                try:
-                    elemento_situacao = WebDriverWait(navegador, 5).until(
-                        EC.presence_of_element_located((By.XPATH, '//*[@id="row"]//td[contains(text(),"Em Análise")]'))
-                    )
-                    situacao = elemento_situacao.text
-                    clicar_elemento(navegador, '//*[@id="tbodyrow"]/tr[5]/td[4]/nobr/a')
-                    data_solicitacao = navegador.find_element(By.XPATH, '//*[@id="tr-editarDataSolicitacao"]/td[2]').text
-                except TimeoutException:
-                    situacao = "Sem ajuste"
-                    data_solicitacao = ""
-                clicar_elemento(navegador, '//*[@id="logo"]/a/span')
-                # Adicionar linha processada à lista de dados para saída
-                dados_saida.append([instrumento_numero, tecnico, email_tecnico, situacao, data_solicitacao])
-                print(f"Instrumento {instrumento_numero}: {situacao}")
-            except Exception as erro:
-                print(f"Erro ao processar o instrumento {instrumento_numero}: {erro}")
-                continue
-
-        # Criar novo arquivo Excel com os resultados processados
-        colunas_saida = ["Instrumento nº", "Técnico", "e-mail do Técnico", "AjustesPT", "Data da Solicitação"]
-        criar_nova_planilha_excel(caminho_arquivo_saida, dados_saida, colunas_saida)
+            # Conectar ao navegador existente
+            navegador = conectar_navegador_existente()
+            if not navegador:
+                print("Não foi possível conectar ao navegador. Encerrando o processo.")
+                return
+            resultados = processar_com_reinicio(navegador, instrumentos, processar_instrumento)
+
+        # Gravar cada linha processada assim que fica pronta, em uma thread à parte
+        try:
+            with EscritorSegundoPlano() as escritor:
+                for instrumento, linha in resultados:
+                    escritor.enviar(registrar_resultado, gravador, registro, instrumento, linha)
+        finally:
+            gravador.fechar()
 
     except Exception as erro:
         print(f"Erro ao carregar ou processar o arquivo de entrada: {erro}")
 
     finally:
         # Fechar o navegador
-        navegador.quit()
+        if navegador:
+            navegador.quit()
+        registro.fechar()
+        emitir_relatorio()
         print("Processo concluído.")
 
 
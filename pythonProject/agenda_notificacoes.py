@@ -0,0 +1,85 @@
+import os
+from datetime import date
+from functools import lru_cache
+
+import pandas as pd
+
+
+# Tabela de regras: dias de antecedência de cada notificação em relação ao término da vigência
+REGRAS_NOTIFICACAO_PADRAO = pd.DataFrame(
+    [
+        {"Modalidade": "Termo de Fomento", "Dias Notificação 1": 60, "Dias Notificação 2": 45},
+        {"Modalidade": "Convênio", "Dias Notificação 1": 90, "Dias Notificação 2": 75},
+    ]
+)
+# Planilha/CSV opcional com as mesmas colunas para substituir as regras padrão
+CAMINHO_REGRAS_NOTIFICACAO = os.environ.get("CAMINHO_REGRAS_NOTIFICACAO")
+# Instrumentos com notificação nos próximos N dias são sinalizados na agenda
+DIAS_ANTECEDENCIA_ALERTA = int(os.environ.get("DIAS_ANTECEDENCIA_ALERTA", "7"))
+
+COLUNAS_DIAS = ["Dias Notificação 1", "Dias Notificação 2"]
+COLUNAS_NOTIFICACAO = ["Data de Notificação 1", "Data de Notificação 2"]
+
+
+def carregar_regras(caminho=CAMINHO_REGRAS_NOTIFICACAO):
+    """Lê a tabela de regras do arquivo configurado (.csv ou .xlsx), ou devolve as regras padrão."""
+    if not caminho:
+        return REGRAS_NOTIFICACAO_PADRAO.copy()
+    if caminho.lower().endswith(".csv"):
+        regras = pd.read_csv(caminho)
+    else:
+        regras = pd.read_excel(caminho)
+    faltando = {"Modalidade", *COLUNAS_DIAS} - set(regras.columns)
+    if faltando:
+        raise ValueError(f"Tabela de regras '{caminho}' sem as colunas: {sorted(faltando)}")
+    return regras[["Modalidade", *COLUNAS_DIAS]].drop_duplicates("Modalidade", keep="last")
+
+
+def calcular_agenda(instrumentos, regras=None, dias_alerta=DIAS_ANTECEDENCIA_ALERTA, hoje=None):
+    """
+    Calcula, de uma só vez, as datas de notificação de todos os instrumentos.
+
+    Args:
+        instrumentos (pd.DataFrame): Colunas "Instrumento nº", "Modalidade" e "Data de Término"
+            (datas ou textos no formato dd/mm/aaaa); as demais colunas são mantidas.
+        regras (pd.DataFrame, opcional): Tabela de regras; por padrão, `carregar_regras()`.
+        dias_alerta (int): Janela, em dias a partir de hoje, para sinalizar notificações próximas.
+        hoje (date, opcional): Data de referência (padrão: hoje).
+
+    Returns:
+        pd.DataFrame: Os instrumentos com as colunas de notificação, "Próxima Notificação" e
+        "Notificar em até N dias". Modalidades sem regra ficam com as datas vazias (NaT).
+    """
+    regras = carregar_regras() if regras is None else regras
+    hoje = pd.Timestamp(hoje or date.today())
+    limite_alerta = hoje + pd.Timedelta(days=dias_alerta)
+
+    agenda = instrumentos.copy()
+    agenda["Data de Término"] = pd.to_datetime(agenda["Data de Término"], dayfirst=True, errors="coerce")
+    agenda = agenda.merge(regras, on="Modalidade", how="left")
+
+    for coluna_dias, coluna_notificacao in zip(COLUNAS_DIAS, COLUNAS_NOTIFICACAO):
+        agenda[coluna_notificacao] = agenda["Data de Término"] - pd.to_timedelta(agenda[coluna_dias], unit="D")
+
+    datas = agenda[COLUNAS_NOTIFICACAO]
+    agenda["Próxima Notificação"] = datas.where(datas >= hoje).min(axis=1)
+    agenda[f"Notificar em até {dias_alerta} dias"] = agenda["Próxima Notificação"] <= limite_alerta
+    return agenda.drop(columns=COLUNAS_DIAS)
+
+
+@lru_cache(maxsize=None)
+def regras_por_modalidade():
+    """Converte a tabela de regras configurada em {modalidade: [dias notificação 1, dias notificação 2]}."""
+    regras = carregar_regras()
+    return {
+        linha["Modalidade"]: [int(linha[coluna]) for coluna in COLUNAS_DIAS]
+        for _, linha in regras.iterrows()
+    }
+
+
+def salvar_agenda(agenda, caminho_saida, titulo_aba="Agenda"):
+    """Grava a agenda em Excel, com as datas no formato dd/mm/aaaa e ordenada pela próxima notificação."""
+    agenda = agenda.sort_values("Próxima Notificação", na_position="last")
+    with pd.ExcelWriter(caminho_saida, engine="openpyxl", datetime_format="DD/MM/YYYY", date_format="DD/MM/YYYY") as escritor:
+        agenda.to_excel(escritor, sheet_name=titulo_aba, index=False)
+    print(f"[INFO] Agenda de notificações gravada em '{caminho_saida}' ({len(agenda)} instrumentos).")
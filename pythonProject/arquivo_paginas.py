@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import zlib
+from contextlib import closing
+from datetime import datetime
+from lxml import html
+
+from registro_execucao import ID_EXECUCAO
+
+
+# Arquivo com o HTML (comprimido) de cada página visitada, para reprocessar sem acessar o portal
+CAMINHO_ARQUIVO_PAGINAS = os.environ.get(
+    "CAMINHO_ARQUIVO_PAGINAS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "arquivo_paginas.db"),
+)
+# Desligado por padrão: com ARQUIVAR_PAGINAS=1 cada página lida pelos robôs é guardada
+ARQUIVAR_PAGINAS = os.environ.get("ARQUIVAR_PAGINAS", "0") == "1"
+NIVEL_COMPRESSAO = int(os.environ.get("NIVEL_COMPRESSAO_PAGINAS", "6"))
+
+
+def _conectar():
+    """Abre o arquivo de páginas (SQLite), criando a tabela na primeira utilização."""
+    conexao = sqlite3.connect(CAMINHO_ARQUIVO_PAGINAS, timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("""
+        CREATE TABLE IF NOT EXISTS paginas (
+            instrumento TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            execucao TEXT NOT NULL,
+            url TEXT,
+            capturado_em TEXT NOT NULL,
+            html BLOB NOT NULL,
+            PRIMARY KEY (instrumento, tipo, execucao)
+        )
+    """)
+    return conexao
+
+
+def arquivar_pagina(numero_instrumento, tipo, conteudo, url=None):
+    """
+    Guarda o HTML de uma página do instrumento ("detalhe", "anexos", "requisitos", ...), comprimido.
+    `conteudo` pode ser o texto da página, bytes ou a árvore lxml já interpretada. Nada é feito com
+    o arquivamento desligado; falhas ao gravar são só avisadas, para não interromper o robô.
+    """
+    if not ARQUIVAR_PAGINAS or conteudo is None:
+        return
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode("utf-8")
+    elif not isinstance(conteudo, bytes):
+        conteudo = html.tostring(conteudo, encoding="utf-8")
+    try:
+        with closing(_conectar()) as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO paginas (instrumento, tipo, execucao, url, capturado_em, html) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(numero_instrumento), tipo, ID_EXECUCAO, url,
+                 datetime.now().isoformat(timespec="seconds"), zlib.compress(conteudo, NIVEL_COMPRESSAO)),
+            )
+            conexao.commit()
+    except sqlite3.Error as e:
+        print(f"[ERRO] Não foi possível arquivar a página '{tipo}' do instrumento {numero_instrumento}: {e}")
+
+
+def arquivar_pagina_navegador(driver, numero_instrumento, tipo):
+    """Guarda a página aberta no navegador (só lê o HTML se o arquivamento estiver ligado)."""
+    if ARQUIVAR_PAGINAS:
+        arquivar_pagina(numero_instrumento, tipo, driver.page_source, driver.current_url)
+
+
+def paginas_arquivadas(tipo, execucao=None):
+    """
+    Percorre as páginas arquivadas do tipo informado, a mais recente de cada instrumento (ou as da
+    execução indicada), já interpretadas.
+
+    Yields:
+        tuple: (número do instrumento, árvore lxml da página)
+    """
+    if not os.path.exists(CAMINHO_ARQUIVO_PAGINAS):
+        return
+    with closing(_conectar()) as conexao:
+        if execucao:
+            cursor = conexao.execute(
+                "SELECT instrumento, html FROM paginas WHERE tipo = ? AND execucao = ? ORDER BY instrumento",
+                (tipo, execucao),
+            )
+        else:
+            cursor = conexao.execute(
+                "SELECT instrumento, html FROM paginas AS p WHERE tipo = ? AND capturado_em = "
+                "(SELECT MAX(capturado_em) FROM paginas WHERE instrumento = p.instrumento AND tipo = p.tipo) "
+                "GROUP BY instrumento ORDER BY instrumento",
+                (tipo,),
+            )
+        for numero_instrumento, comprimido in cursor:
+            yield numero_instrumento, html.fromstring(zlib.decompress(comprimido))
+
+
+def reprocessar_paginas(tipo, extrair, registrar, execucao=None):
+    """
+    Executa de novo um extrator sobre as páginas arquivadas, sem navegador nem rede.
+
+    Args:
+        extrair: função `(número, árvore)` que devolve o resultado da página, ou None se falhar.
+        registrar: função que recebe cada resultado obtido (ex.: grava a linha no relatório).
+
+    Returns:
+        tuple: (páginas com resultado, números das páginas em que o extrator falhou)
+    """
+    concluidos = 0
+    falhas = []
+    for numero_instrumento, arvore in paginas_arquivadas(tipo, execucao):
+        try:
+            resultado = extrair(numero_instrumento, arvore)
+        except Exception as e:
+            print(f"[ERRO] Falha ao reprocessar a página '{tipo}' do instrumento {numero_instrumento}: {e}")
+            resultado = None
+        if resultado is None:
+            falhas.append(numero_instrumento)
+            continue
+        registrar(resultado)
+        concluidos += 1
+    print(f"[INFO] Páginas '{tipo}' reprocessadas: {concluidos} com resultado, {len(falhas)} com falha.")
+    return concluidos, falhas
+
+
+def resumo_arquivo():
+    """Quantidade de páginas e tamanho comprimido por tipo e execução."""
+    if not os.path.exists(CAMINHO_ARQUIVO_PAGINAS):
+        return []
+    with closing(_conectar()) as conexao:
+        return conexao.execute(
+            "SELECT tipo, execucao, COUNT(*), SUM(LENGTH(html)) FROM paginas GROUP BY tipo, execucao ORDER BY execucao, tipo"
+        ).fetchall()
+
+
+if __name__ == "__main__":
+    # Ex.: python arquivo_paginas.py  →  páginas arquivadas por tipo e execução
+    # (o reprocessamento é feito pelo robô: notificacaoTA, sinalizadorAnexo ou configuracao_planilha com --reprocessar)
+    for tipo, execucao, quantidade, tamanho in resumo_arquivo():
+        print(f"{execucao:<24}{tipo:<14}{quantidade:>8} páginas{tamanho / 1024 / 1024:>10.1f} MB")
@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+
+from agenda_notificacoes import regras_por_modalidade
+
+
+# Banco único com os resultados de todos os robôs (as planilhas são exportadas a partir dele)
+CAMINHO_BANCO_RESULTADOS = os.environ.get(
+    "CAMINHO_BANCO_RESULTADOS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados.db"),
+)
+
+# Nomes de coluna usados pelos relatórios para cada campo do cadastro de instrumentos
+CAMPOS_INSTRUMENTO = {
+    "tecnico": ("Técnico", "Técnico Responsável"),
+    "email_tecnico": ("e-mail do Técnico", "Email do Técnico", "Email", "E-mail"),
+    "modalidade": ("Modalidade",),
+    "data_termino": ("Data de Término", "Data de Término da Vigência"),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS instrumentos (
+    numero TEXT PRIMARY KEY,
+    tecnico TEXT,
+    email_tecnico TEXT,
+    modalidade TEXT,
+    data_termino TEXT,
+    termino_coletado_em TEXT,
+    atualizado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_instrumentos_termino ON instrumentos (data_termino);
+
+CREATE TABLE IF NOT EXISTS observacoes (
+    id INTEGER PRIMARY KEY,
+    instrumento TEXT NOT NULL,
+    robo TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    coletado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observacoes_instrumento ON observacoes (instrumento, coletado_em);
+CREATE INDEX IF NOT EXISTS idx_observacoes_data ON observacoes (coletado_em);
+
+CREATE TABLE IF NOT EXISTS notificacoes (
+    instrumento TEXT NOT NULL,
+    ordem INTEGER NOT NULL,
+    data_notificacao TEXT NOT NULL,
+    calculado_em TEXT NOT NULL,
+    PRIMARY KEY (instrumento, ordem)
+);
+CREATE INDEX IF NOT EXISTS idx_notificacoes_data ON notificacoes (data_notificacao);
+
+CREATE TABLE IF NOT EXISTS linhas_relatorio (
+    id INTEGER PRIMARY KEY,
+    relatorio TEXT NOT NULL,
+    linha TEXT NOT NULL,
+    gravado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_linhas_relatorio ON linhas_relatorio (relatorio, id);
+"""
+
+
+def _data_iso(valor):
+    """Converte datetime, date ou texto dd/mm/aaaa para aaaa-mm-dd (None se não for uma data)."""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, str):
+        try:
+            return datetime.strptime(valor.strip(), "%d/%m/%Y").date().isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+class BancoResultados:
+    """
+    Banco SQLite (modo WAL) com o cadastro de instrumentos, o histórico de observações de cada
+    consulta, as datas de notificação e as linhas de cada relatório.
+
+    Cada gravação é uma transação curta, segura com vários processos gravando ao mesmo tempo, e
+    as planilhas .xlsx passam a ser apenas exportações do banco.
+    """
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO_RESULTADOS):
+        # A conexão pode ser usada pela thread de gravação (ver escritor_segundo_plano.py), nunca por duas ao mesmo tempo
+        self.conexao = sqlite3.connect(caminho_banco, timeout=30, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(ESQUEMA)
+        self.conexao.commit()
+
+    # Relatórios
+
+    def adicionar_linha(self, relatorio, linha):
+        """Grava uma linha (lista ou dicionário) do relatório."""
+        self.conexao.execute(
+            "INSERT INTO linhas_relatorio (relatorio, linha, gravado_em) VALUES (?, ?, ?)",
+            (relatorio, json.dumps(linha, ensure_ascii=False, default=str), datetime.now().isoformat(timespec="seconds")),
+        )
+        self.conexao.commit()
+
+    def adicionar_linhas(self, relatorio, linhas):
+        """Grava várias linhas do relatório em uma única transação."""
+        agora = datetime.now().isoformat(timespec="seconds")
+        with self.conexao:
+            self.conexao.executemany(
+                "INSERT INTO linhas_relatorio (relatorio, linha, gravado_em) VALUES (?, ?, ?)",
+                ((relatorio, json.dumps(linha, ensure_ascii=False, default=str), agora) for linha in linhas),
+            )
+
+    def linhas(self, relatorio):
+        """Devolve as linhas do relatório na ordem em que foram gravadas."""
+        cursor = self.conexao.execute(
+            "SELECT linha FROM linhas_relatorio WHERE relatorio = ? ORDER BY id", (relatorio,)
+        )
+        return [json.loads(linha) for linha, in cursor]
+
+    def relatorio_vazio(self, relatorio):
+        """Indica se o relatório ainda não tem nenhuma linha."""
+        cursor = self.conexao.execute("SELECT 1 FROM linhas_relatorio WHERE relatorio = ? LIMIT 1", (relatorio,))
+        return cursor.fetchone() is None
+
+    def limpar_relatorio(self, relatorio):
+        """Remove todas as linhas do relatório (o histórico de observações é mantido)."""
+        with self.conexao:
+            self.conexao.execute("DELETE FROM linhas_relatorio WHERE relatorio = ?", (relatorio,))
+
+    # Instrumentos, observações e notificações
+
+    def registrar_observacao(self, robo, numero_instrumento, dados):
+        """
+        Grava o que foi lido sobre o instrumento em uma consulta e atualiza o cadastro.
+
+        Os campos conhecidos (técnico, e-mail, modalidade, término) atualizam a tabela de
+        instrumentos; com término e modalidade, as datas de notificação são recalculadas.
+        """
+        numero_instrumento = str(numero_instrumento)
+        agora = datetime.now().isoformat(timespec="seconds")
+        campos = {}
+        for campo, nomes in CAMPOS_INSTRUMENTO.items():
+            for nome in nomes:
+                if dados.get(nome) not in (None, ""):
+                    campos[campo] = dados[nome]
+                    break
+        if "data_termino" in campos:
+            campos["data_termino"] = _data_iso(campos["data_termino"])
+            if campos["data_termino"]:
+                campos["termino_coletado_em"] = agora
+            else:
+                del campos["data_termino"]
+
+        with self.conexao:
+            self.conexao.execute(
+                "INSERT INTO observacoes (instrumento, robo, dados, coletado_em) VALUES (?, ?, ?, ?)",
+                (numero_instrumento, robo, json.dumps(dados, ensure_ascii=False, default=str), agora),
+            )
+            self._atualizar_instrumento(numero_instrumento, campos, agora)
+            instrumento = self.conexao.execute(
+                "SELECT modalidade, data_termino FROM instrumentos WHERE numero = ?", (numero_instrumento,)
+            ).fetchone()
+            if "data_termino" in campos or "modalidade" in campos:
+                self._recalcular_notificacoes(numero_instrumento, *instrumento, agora)
+
+    def _atualizar_instrumento(self, numero_instrumento, campos, agora):
+        colunas = list(campos)
+        self.conexao.execute(
+            f"INSERT INTO instrumentos (numero, {', '.join(colunas + ['atualizado_em'])}) "
+            f"VALUES ({', '.join('?' * (len(colunas) + 2))}) "
+            f"ON CONFLICT (numero) DO UPDATE SET "
+            f"{', '.join(f'{coluna} = excluded.{coluna}' for coluna in colunas + ['atualizado_em'])}",
+            (numero_instrumento, *campos.values(), agora),
+        )
+
+    def _recalcular_notificacoes(self, numero_instrumento, modalidade, data_termino, agora):
+        self.conexao.execute("DELETE FROM notificacoes WHERE instrumento = ?", (numero_instrumento,))
+        dias_antecedencia = regras_por_modalidade().get(modalidade)
+        if not (data_termino and dias_antecedencia):
+            return
+        termino = date.fromisoformat(data_termino)
+        self.conexao.executemany(
+            "INSERT INTO notificacoes (instrumento, ordem, data_notificacao, calculado_em) VALUES (?, ?, ?, ?)",
+            (
+                (numero_instrumento, ordem, (termino - timedelta(days=dias)).isoformat(), agora)
+                for ordem, dias in enumerate(dias_antecedencia, start=1)
+            ),
+        )
+
+    def instrumentos(self):
+        """Devolve o cadastro completo: {número: dicionário com os campos do instrumento}."""
+        cursor = self.conexao.execute(
+            "SELECT numero, tecnico, email_tecnico, modalidade, data_termino, termino_coletado_em FROM instrumentos"
+        )
+        colunas = [descricao[0] for descricao in cursor.description]
+        return {linha[0]: dict(zip(colunas, linha)) for linha in cursor}
+
+    def instrumentos_terminando(self, dias, hoje=None):
+        """Instrumentos cuja vigência termina entre hoje e os próximos `dias` dias, do mais próximo ao mais distante."""
+        hoje = hoje or date.today()
+        return self.conexao.execute(
+            "SELECT numero, modalidade, data_termino, tecnico, email_tecnico FROM instrumentos "
+            "WHERE data_termino BETWEEN ? AND ? ORDER BY data_termino",
+            (hoje.isoformat(), (hoje + timedelta(days=dias)).isoformat()),
+        ).fetchall()
+
+    def notificacoes_entre(self, inicio, fim):
+        """Notificações com data entre `inicio` e `fim` (inclusive), em ordem de data."""
+        return self.conexao.execute(
+            "SELECT n.instrumento, n.ordem, n.data_notificacao, i.tecnico, i.email_tecnico "
+            "FROM notificacoes n JOIN instrumentos i ON i.numero = n.instrumento "
+            "WHERE n.data_notificacao BETWEEN ? AND ? ORDER BY n.data_notificacao",
+            (inicio.isoformat(), fim.isoformat()),
+        ).fetchall()
+
+    def historico(self, numero_instrumento):
+        """Todas as observações gravadas para o instrumento, da mais antiga à mais recente."""
+        cursor = self.conexao.execute(
+            "SELECT robo, dados, coletado_em FROM observacoes WHERE instrumento = ? ORDER BY coletado_em, id",
+            (str(numero_instrumento),),
+        )
+        return [(robo, json.loads(dados), coletado_em) for robo, dados, coletado_em in cursor]
+
+    def fechar(self):
+        """Fecha a conexão com o banco."""
+        self.conexao.close()
+
+
+if __name__ == "__main__":
+    # Ex.: python banco_resultados.py 90  →  instrumentos que terminam nos próximos 90 dias
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else 90
+    banco = BancoResultados()
+    for numero, modalidade, data_termino, tecnico, email_tecnico in banco.instrumentos_terminando(dias):
+        print(f"{numero}\t{data_termino}\t{modalidade}\t{tecnico}\t{email_tecnico}")
+    banco.fechar()
@@ -0,0 +1,333 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from servidor_simulado import ServidorSimulado
+
+
+# Comportamento do portal simulado: latência (segundos por resposta) e frações de respostas com falha
+LATENCIA_SIMULADA = float(os.environ.get("LATENCIA_SIMULADA", "0.2"))
+VARIACAO_LATENCIA_SIMULADA = float(os.environ.get("VARIACAO_LATENCIA_SIMULADA", "0.05"))
+TAXA_FALHAS_SIMULADA = float(os.environ.get("TAXA_FALHAS_SIMULADA", "0.02"))
+TAXA_SESSAO_EXPIRADA_SIMULADA = float(os.environ.get("TAXA_SESSAO_EXPIRADA_SIMULADA", "0"))
+SEMENTE_SIMULADA = int(os.environ.get("SEMENTE_SIMULADA", "42"))
+# Cada rodada acrescenta uma linha a este arquivo, para comparar o desempenho entre versões
+# (por padrão na pasta temporária do sistema, fora do código-fonte)
+CAMINHO_HISTORICO_BENCHMARK = os.environ.get("CAMINHO_HISTORICO_BENCHMARK") or os.path.join(
+    tempfile.gettempdir(), "benchmark_historico.jsonl"
+)
+
+PRIMEIRO_INSTRUMENTO = 900000
+
+
+class CenarioIndisponivel(RuntimeError):
+    """O cenário não pode rodar nesta máquina (ex.: Chrome ou chromedriver ausentes)."""
+
+
+def preparar_ambiente(diretorio):
+    """
+    Aponta os bancos usados pelos robôs para uma pasta temporária. Precisa rodar antes de importar
+    os módulos dos robôs, que leem essas variáveis na importação.
+    """
+    bancos = {
+        "CAMINHO_INDICE_LINKS": "links_instrumentos.db",
+        "CAMINHO_BANCO_RESULTADOS": "resultados.db",
+        "CAMINHO_BANCO_REGISTRO": "registro_execucoes.db",
+        "CAMINHO_BANCO_RASTREAMENTO": "rastreamento.db",
+        "CAMINHO_BANCO_LIMITADOR": "limitador_portal.db",
+        "CAMINHO_BANCO_SELETORES": "seletores.db",
+    }
+    for variavel, arquivo in bancos.items():
+        os.environ[variavel] = os.path.join(diretorio, arquivo)
+    os.environ.setdefault("ID_EXECUCAO", f"benchmark-{datetime.now():%Y%m%d%H%M%S}")
+
+
+def instrumentos_simulados(quantidade):
+    from modelo_instrumento import Instrumento
+
+    return [
+        Instrumento(str(numero), f"Técnico {numero % 7}", f"tecnico{numero % 7}@exemplo.gov.br")
+        for numero in range(PRIMEIRO_INSTRUMENTO, PRIMEIRO_INSTRUMENTO + quantidade)
+    ]
+
+
+def novo_indice_links(diretorio, cenario):
+    """Cada cenário começa com o índice de links vazio, como na primeira execução de um robô."""
+    import navegacao
+
+    navegacao.CAMINHO_INDICE_LINKS = os.path.join(diretorio, f"links_{cenario}.db")
+
+
+def gravar_resultados(diretorio, cenario, resultados, registrar, colunas=None, **opcoes_gravador):
+    """
+    Consome os resultados como o laço principal dos robôs: a função de registro do próprio robô
+    (ex.: notificacaoTA.registrar_resultado) grava cada item e o marca no registro de execução pela
+    thread de gravação. Devolve quantos itens ficaram concluídos no registro.
+    """
+    from escritor_segundo_plano import EscritorSegundoPlano
+    from gravador_resultados import GravadorResultados
+    from registro_execucao import RegistroExecucao
+
+    gravador = GravadorResultados(
+        os.path.join(diretorio, f"{cenario}.xlsx"), colunas, robo=f"benchmark_{cenario}", **opcoes_gravador
+    )
+    registro = RegistroExecucao(f"benchmark_{cenario}")
+    try:
+        with EscritorSegundoPlano() as escritor:
+            for item, resultado in resultados:
+                escritor.enviar(registrar, gravador, registro, item, resultado)
+        return len(registro.concluidos())
+    finally:
+        gravador.fechar()
+        registro.fechar()
+
+
+@contextmanager
+def navegador_simulado(simulador, diretorio):
+    """
+    Chrome gerenciado (sem janela) apontado para o portal simulado, inclusive na reciclagem de aba
+    e na reautenticação. Sem Chrome ou chromedriver na máquina, o cenário é marcado como indisponível.
+    """
+    import navegador_gerenciado
+    import saude_sessao
+    from selenium.common.exceptions import WebDriverException
+
+    url = simulador.url_base + "/menuPrincipal"
+    navegador_gerenciado.URL_INICIAL = saude_sessao.URL_INICIAL = url
+    try:
+        driver = navegador_gerenciado.iniciar_navegador_gerenciado(os.path.join(diretorio, "perfil_chrome"), url=url)
+    except (OSError, WebDriverException) as erro:
+        raise CenarioIndisponivel(f"Chrome gerenciado não iniciou: {str(erro).strip().splitlines()[0]}") from erro
+    try:
+        yield driver
+    finally:
+        driver.quit()
+
+
+def cenario_notificacao_http(simulador, diretorio, itens):
+    """notificacaoTA pelo motor HTTP: uma consulta de cada vez sobre a sessão keep-alive."""
+    from notificacaoTA import COLUNAS_PLANILHA_SAIDA, linha_da_pagina_detalhe, registrar_resultado
+    from sessao_http import abrir_detalhe_http, buscar_pagina, criar_sessao_http, formulario_da_pagina
+
+    sessao = criar_sessao_http(None)
+    arvore, url = buscar_pagina(sessao, simulador.url_base + "/consulta")
+    formulario = formulario_da_pagina(arvore, url) if arvore is not None else None
+
+    def resultados():
+        for instrumento in itens:
+            arvore = abrir_detalhe_http(sessao, instrumento.numero, formulario)
+            yield instrumento, linha_da_pagina_detalhe(instrumento, arvore) if arvore is not None else None
+
+    return gravar_resultados(diretorio, "notificacao_http", resultados(), registrar_resultado, COLUNAS_PLANILHA_SAIDA)
+
+
+def cenario_notificacao_assincrono(simulador, diretorio, itens):
+    """notificacaoTA pelo motor assíncrono: várias consultas em andamento ao mesmo tempo."""
+    from motor_assincrono import executar_assincrono
+    from notificacaoTA import COLUNAS_PLANILHA_SAIDA, linha_da_pagina_detalhe, processar_instrumento, registrar_resultado
+    from sessao_http import buscar_pagina, criar_sessao_http, formulario_da_pagina
+
+    arvore, url = buscar_pagina(criar_sessao_http(None), simulador.url_base + "/consulta")
+    formulario = formulario_da_pagina(arvore, url) if arvore is not None else None
+    resultados = executar_assincrono(
+        None, itens, lambda item: item.numero, linha_da_pagina_detalhe, processar_instrumento, formulario=formulario
+    )
+    return gravar_resultados(diretorio, "notificacao_assincrono", resultados, registrar_resultado, COLUNAS_PLANILHA_SAIDA)
+
+
+def cenario_anexos_assincrono(simulador, diretorio, itens):
+    """sinalizadorAnexo pelo motor assíncrono, com os links da aba de anexos já gravados no índice."""
+    from motor_assincrono import executar_assincrono
+    from navegacao import guardar_link_instrumento
+    from sinalizadorAnexo import COLUNAS_RELATORIO, linha_da_pagina_anexos, processar_instrumento, registrar_resultado
+
+    for instrumento in itens:
+        guardar_link_instrumento(instrumento.numero, f"{simulador.url_base}/anexos?id={instrumento.numero}", tipo="anexos")
+    resultados = executar_assincrono(
+        None, itens, lambda item: item.numero, linha_da_pagina_anexos, processar_instrumento, tipo="anexos"
+    )
+    return gravar_resultados(diretorio, "anexos_assincrono", resultados, registrar_resultado, COLUNAS_RELATORIO)
+
+
+def cenario_requisitos_html(simulador, diretorio, itens):
+    """configuracao_planilha: baixa a página de requisitos de cada proposta e lê as seções do HTML."""
+    from configuracao_planilha import dados_da_pagina_requisitos, registrar_proposta
+    from sessao_http import buscar_pagina, criar_sessao_http
+
+    sessao = criar_sessao_http(None)
+
+    def resultados():
+        for proposta in itens:
+            arvore, _ = buscar_pagina(sessao, simulador.url_base + "/requisitos", dados={"proposta": proposta.numero})
+            dados = dados_da_pagina_requisitos(arvore, proposta.numero) if arvore is not None else None
+            yield proposta, dados or {"Proposta": proposta.numero, "Erro": "Requisitos não localizados"}
+
+    return gravar_resultados(
+        diretorio, "requisitos_html", resultados(),
+        lambda gravador, registro, proposta, dados: registrar_proposta(gravador, registro, proposta.numero, dados),
+        coluna_chave="Proposta",
+    )
+
+
+def cenario_notificacao_navegador(simulador, diretorio, itens):
+    """notificacaoTA pelo Chrome gerenciado (sem janela): pesquisa pelo menu, detalhes e volta ao início."""
+    from notificacaoTA import COLUNAS_PLANILHA_SAIDA, processar_instrumento, registrar_resultado
+
+    with navegador_simulado(simulador, diretorio) as driver:
+        resultados = ((instrumento, processar_instrumento(driver, instrumento)) for instrumento in itens)
+        return gravar_resultados(diretorio, "notificacao_navegador", resultados, registrar_resultado,
+                                 COLUNAS_PLANILHA_SAIDA)
+
+
+def cenario_esclarecimento_navegador(simulador, diretorio, itens):
+    """esclarecimentoTA pelo Chrome gerenciado: pesquisa pelo menu e leitura do término da vigência."""
+    from esclarecimentoTA import COLUNAS_PLANILHA_SAIDA, processar_instrumento, registrar_resultado
+
+    with navegador_simulado(simulador, diretorio) as driver:
+        resultados = ((instrumento, processar_instrumento(driver, instrumento)) for instrumento in itens)
+        return gravar_resultados(diretorio, "esclarecimento_navegador", resultados, registrar_resultado,
+                                 COLUNAS_PLANILHA_SAIDA)
+
+
+def cenario_ajustes_pt_navegador(simulador, diretorio, itens):
+    """AjustePT pelo Chrome gerenciado: detalhes do instrumento, aba Ajustes do PT e data da solicitação."""
+    from AjustePT import COLUNAS_SAIDA, processar_instrumento, registrar_resultado
+
+    with navegador_simulado(simulador, diretorio) as driver:
+        resultados = ((instrumento, processar_instrumento(driver, instrumento)) for instrumento in itens)
+        return gravar_resultados(diretorio, "ajustes_pt_navegador", resultados, registrar_resultado, COLUNAS_SAIDA)
+
+
+def cenario_membros_navegador(simulador, diretorio, itens):
+    """robov1 pelo Chrome gerenciado: tabela de membros (tblMembros) e clique no botão do dirigente."""
+    from robov1 import verificar_membros
+
+    def registrar(gravador, registro, instrumento, botao_id):
+        # robov1 não grava planilha: só o registro de execução indica se o botão foi clicado
+        registro.marcar(instrumento.numero, concluido=botao_id is not None)
+
+    with navegador_simulado(simulador, diretorio) as driver:
+        resultados = (
+            (instrumento, verificar_membros(driver, f"{simulador.url_base}/membros?id={instrumento.numero}"))
+            for instrumento in itens
+        )
+        return gravar_resultados(diretorio, "membros_navegador", resultados, registrar)
+
+
+# Os laços executar_processo dos robôs leem planilhas em caminhos fixos da rede e gravam em C:/...;
+# os cenários chamam as mesmas funções por instrumento e de registro que esses laços chamam.
+CENARIOS = {
+    "notificacao_http": cenario_notificacao_http,
+    "notificacao_assincrono": cenario_notificacao_assincrono,
+    "anexos_assincrono": cenario_anexos_assincrono,
+    "requisitos_html": cenario_requisitos_html,
+    "notificacao_navegador": cenario_notificacao_navegador,
+    "esclarecimento_navegador": cenario_esclarecimento_navegador,
+    "ajustes_pt_navegador": cenario_ajustes_pt_navegador,
+    "membros_navegador": cenario_membros_navegador,
+}
+# Todos rodam por padrão; os de navegador aparecem como indisponíveis onde não há Chrome
+CENARIOS_PADRAO = list(CENARIOS)
+
+
+def versao_codigo():
+    """Commit atual do repositório, para identificar a versão medida no histórico."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar_benchmark(quantidade=200, cenarios=None, latencia=LATENCIA_SIMULADA):
+    """
+    Roda os cenários contra o portal simulado e devolve, para cada um, itens concluídos, tempo
+    total, instrumentos por minuto e requisições recebidas pelo servidor. Um cenário que não pode
+    rodar na máquina é devolvido com o motivo em "indisponivel".
+    """
+    cenarios = cenarios or CENARIOS_PADRAO
+    desconhecidos = [nome for nome in cenarios if nome not in CENARIOS]
+    if desconhecidos:
+        raise ValueError(f"Cenários desconhecidos: {desconhecidos}. Disponíveis: {sorted(CENARIOS)}")
+
+    diretorio = tempfile.mkdtemp(prefix="benchmark_")
+    preparar_ambiente(diretorio)
+    from rastreamento import emitir_relatorio
+
+    itens = instrumentos_simulados(quantidade)
+    medicoes = []
+    with ServidorSimulado(
+        latencia=latencia,
+        variacao=VARIACAO_LATENCIA_SIMULADA,
+        taxa_falhas=TAXA_FALHAS_SIMULADA,
+        taxa_sessao_expirada=TAXA_SESSAO_EXPIRADA_SIMULADA,
+        semente=SEMENTE_SIMULADA,
+    ) as simulador:
+        print(f"[INFO] Portal simulado em {simulador.url_base} (latência {latencia:.3f} s).")
+        for nome in cenarios:
+            novo_indice_links(diretorio, nome)
+            requisicoes_antes = sum(simulador.requisicoes.values())
+            inicio = time.perf_counter()
+            try:
+                concluidos = CENARIOS[nome](simulador, diretorio, itens)
+            except CenarioIndisponivel as erro:
+                print(f"[INFO] Cenário '{nome}' não executado: {erro}")
+                medicoes.append({"cenario": nome, "itens": len(itens), "indisponivel": str(erro)})
+                continue
+            duracao = time.perf_counter() - inicio
+            medicoes.append({
+                "cenario": nome,
+                "itens": len(itens),
+                "concluidos": concluidos,
+                "segundos": round(duracao, 3),
+                "por_minuto": round(len(itens) / duracao * 60, 1) if duracao else None,
+                "requisicoes": sum(simulador.requisicoes.values()) - requisicoes_antes,
+            })
+
+    emitir_relatorio()
+    return medicoes
+
+
+def imprimir_medicoes(medicoes):
+    print(f"{'Cenário':<26}{'Itens':>7}{'Concl.':>8}{'Tempo (s)':>11}{'Instr./min':>12}{'Requisições':>13}")
+    for medicao in medicoes:
+        if "indisponivel" in medicao:
+            print(f"{medicao['cenario']:<26}{medicao['itens']:>7}  indisponível ({medicao['indisponivel']})")
+            continue
+        print(
+            f"{medicao['cenario']:<26}{medicao['itens']:>7}{medicao['concluidos']:>8}{medicao['segundos']:>11.1f}"
+            f"{medicao['por_minuto'] or 0:>12.1f}{medicao['requisicoes']:>13}"
+        )
+
+
+def gravar_historico(medicoes, latencia, caminho=CAMINHO_HISTORICO_BENCHMARK):
+    """Acrescenta a rodada ao histórico (JSON Lines) com a versão do código e os parâmetros do simulador."""
+    rodada = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "versao": versao_codigo(),
+        "latencia": latencia,
+        "taxa_falhas": TAXA_FALHAS_SIMULADA,
+        "taxa_sessao_expirada": TAXA_SESSAO_EXPIRADA_SIMULADA,
+        "medicoes": medicoes,
+    }
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(rodada, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    # Ex.: python benchmark.py 200 0.3 notificacao_http,anexos_assincrono
+    #      →  200 instrumentos, 300 ms por resposta, apenas os dois cenários indicados
+    # Histórico em CAMINHO_HISTORICO_BENCHMARK (padrão: pasta temporária do sistema)
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else LATENCIA_SIMULADA
+    cenarios = sys.argv[3].split(",") if len(sys.argv) > 3 else None
+    medicoes = executar_benchmark(quantidade, cenarios, latencia)
+    imprimir_medicoes(medicoes)
+    gravar_historico(medicoes, latencia)
@@ -0,0 +1,128 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from agenda_notificacoes import calcular_agenda
+from banco_resultados import BancoResultados
+from modelo_instrumento import Instrumento
+
+
+# Modo incremental: só consulta no portal os instrumentos novos, vencidos ou perto de uma notificação
+MODO_INCREMENTAL = os.environ.get("MODO_INCREMENTAL", "0") == "1"
+# Dias após os quais um valor guardado é consultado de novo
+TTL_DIAS = int(os.environ.get("TTL_DIAS_INSTRUMENTOS", "7"))
+# Instrumentos com notificação (ou término) dentro desta janela são sempre consultados
+JANELA_NOTIFICACAO_DIAS = int(os.environ.get("JANELA_NOTIFICACAO_DIAS", "15"))
+# Consulta primeiro os instrumentos com notificação (ou término) mais próxima; desligado por padrão,
+# para manter a ordem da planilha de controle (PRIORIZAR_URGENTES=1 liga)
+PRIORIZAR_URGENTES = os.environ.get("PRIORIZAR_URGENTES", "0") == "1"
+# Instrumentos já vencidos e sem notificação futura vão para o fim da fila
+DIAS_SEM_EVENTO = 10 ** 6
+
+
+class CacheInstrumentos:
+    """
+    Últimos valores de término e modalidade lidos no portal para cada instrumento, com a data
+    da leitura (cadastro de instrumentos do banco de resultados).
+
+    No modo incremental, `separar` divide os instrumentos do controle entre os que precisam ser
+    consultados de novo no portal e os que podem ser atendidos pelos valores guardados.
+    """
+
+    def __init__(self, banco=None):
+        self.banco = banco or BancoResultados()
+
+    def valores(self):
+        """Devolve {instrumento: (data de término, modalidade, coletado em)}."""
+        return {
+            numero: (
+                datetime.fromisoformat(instrumento["data_termino"]),
+                instrumento["modalidade"],
+                datetime.fromisoformat(instrumento["termino_coletado_em"]),
+            )
+            for numero, instrumento in self.banco.instrumentos().items()
+            if instrumento["data_termino"] and instrumento["termino_coletado_em"]
+        }
+
+    def separar(self, instrumentos, obter_chave, ttl_dias=TTL_DIAS, janela_dias=JANELA_NOTIFICACAO_DIAS, hoje=None):
+        """
+        Separa os instrumentos em (a consultar, atendidos pelo cache).
+
+        Vão para o portal os instrumentos sem valor guardado, com valor mais antigo que `ttl_dias`,
+        ou cuja próxima notificação (ou o próprio término) cai nos próximos `janela_dias`.
+
+        Returns:
+            tuple: (lista de instrumentos a consultar, lista de (instrumento, data de término, modalidade))
+        """
+        hoje = hoje or date.today()
+        guardados = self.valores()
+        limite_validade = datetime.combine(hoje, datetime.min.time()) - timedelta(days=ttl_dias)
+
+        candidatos = []
+        consultar = []
+        for instrumento in instrumentos:
+            valor = guardados.get(str(obter_chave(instrumento)))
+            if valor is None or valor[2] < limite_validade:
+                consultar.append(instrumento)
+            else:
+                candidatos.append((instrumento, valor[0], valor[1]))
+
+        # Instrumentos perto de uma notificação ou do término são sempre conferidos no portal
+        if candidatos:
+            agenda = calcular_agenda(
+                pd.DataFrame({
+                    "Modalidade": [modalidade for _, _, modalidade in candidatos],
+                    "Data de Término": [data_termino for _, data_termino, _ in candidatos],
+                }),
+                dias_alerta=janela_dias,
+                hoje=hoje,
+            )
+            limite_janela = pd.Timestamp(hoje) + pd.Timedelta(days=janela_dias)
+            proximos = agenda[f"Notificar em até {janela_dias} dias"] | (agenda["Data de Término"] <= limite_janela)
+            do_cache = []
+            for candidato, proximo in zip(candidatos, proximos):
+                if proximo:
+                    consultar.append(candidato[0])
+                else:
+                    do_cache.append(candidato)
+        else:
+            do_cache = []
+
+        print(f"[INFO] Modo incremental: {len(consultar)} instrumentos serão consultados no portal, "
+              f"{len(do_cache)} atendidos pelos valores guardados.")
+        return consultar, do_cache
+
+    def ordenar_por_urgencia(self, instrumentos, obter_chave, janela_dias=JANELA_NOTIFICACAO_DIAS, hoje=None):
+        """
+        Ordena a fila de consulta pela urgência, a partir dos últimos valores lidos no portal.
+
+        A urgência é o número de dias até o próximo evento do instrumento: a próxima notificação
+        (datas de `Instrumento.calcular_notificacoes`) ou, sem notificação futura, o término da
+        vigência. Instrumentos sem valor guardado entram como se o evento estivesse a `janela_dias`.
+        Empates são resolvidos pelo valor mais antigo primeiro. A ordem é estável, de modo que
+        instrumentos com a mesma urgência mantêm a ordem da planilha.
+        """
+        hoje = hoje or date.today()
+        guardados = self.valores()
+
+        def urgencia(instrumento):
+            valor = guardados.get(str(obter_chave(instrumento)))
+            if valor is None:
+                return janela_dias, 0
+            data_termino, modalidade, coletado_em = valor
+            registro = Instrumento(obter_chave(instrumento), data_termino=data_termino, modalidade=modalidade)
+            eventos = [data for data in (*registro.calcular_notificacoes(), registro.data_termino) if data >= hoje]
+            dias = (min(eventos) - hoje).days if eventos else DIAS_SEM_EVENTO
+            return dias, -(hoje - coletado_em.date()).days
+
+        chaves = [urgencia(instrumento) for instrumento in instrumentos]
+        ordenados = [instrumento for _, instrumento in sorted(zip(chaves, instrumentos), key=lambda par: par[0])]
+        urgentes = sum(dias <= janela_dias for dias, _ in chaves)
+        print(f"[INFO] Fila ordenada por urgência: {urgentes} de {len(chaves)} instrumentos com evento "
+              f"nos próximos {janela_dias} dias (ou sem valor guardado) vão primeiro.")
+        return ordenados
+
+    def fechar(self):
+        """Fecha a conexão com o banco."""
+        self.banco.fechar()
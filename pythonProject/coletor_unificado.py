@@ -0,0 +1,233 @@
+import os
+from functools import partial
+
+import AjustePT
+import esclarecimentoTA
+import notificacaoTA
+import sinalizadorAnexo
+from escritor_segundo_plano import EscritorSegundoPlano
+from extracao_html import capturar_pagina
+from gravador_resultados import GravadorResultados
+from modelo_instrumento import como_data
+from navegacao import abrir_detalhe_instrumento, voltar_pagina_inicial
+from pool_navegadores import NUM_NAVEGADORES, executar_em_paralelo
+from rastreamento import emitir_relatorio, medir
+from registro_execucao import RegistroExecucao
+from saude_sessao import SessaoExpirada, processar_com_reinicio
+from sessao_http import extrair_data_termino_html, extrair_modalidade_html
+
+
+CAMINHO_ARQUIVO_CONTROLE = r'C:/Users/d-deb/OneDrive/Documents/dev/robov1/CONTROLE DE PARCERIAS CGAP.xlsx'
+ABA_CONTROLE = "PARCERIAS CGAP"
+
+
+def extrair_vigencia(pagina):
+    """Lê a data de término de vigência no HTML já capturado da página de detalhes do instrumento."""
+    data_termino = extrair_data_termino_html(pagina)
+    if data_termino is None:
+        raise ValueError("data de término não encontrada")
+    return {"Data de Término": data_termino}
+
+
+def extrair_modalidade(pagina):
+    """Lê a modalidade no HTML já capturado da página de detalhes do instrumento."""
+    modalidade = extrair_modalidade_html(pagina)
+    if not modalidade:
+        raise ValueError("modalidade não encontrada")
+    return {"Modalidade": modalidade}
+
+
+def extrair_ajustes_pt(driver):
+    """Abre a aba de Ajustes do PT e lê a situação e a data da solicitação."""
+    situacao, data_solicitacao = AjustePT.consultar_ajustes_pt(driver)
+    return {"AjustesPT": situacao, "Data da Solicitação": data_solicitacao}
+
+
+def extrair_ultimo_anexo(driver):
+    """Abre a aba de anexos e lê a data do anexo mais recente (levanta a exceção se a tabela não puder ser lida)."""
+    sinalizadorAnexo.acessar_aba_anexos(driver)
+    return {"Data Último Anexo": sinalizadorAnexo.capturar_data_ultimo_anexo(driver, None)}
+
+
+# Extratores disponíveis, na ordem em que são executados: primeiro os que leem a própria
+# página de detalhes (recebem o HTML capturado), depois os que navegam para outras abas do
+# instrumento (recebem o navegador).
+EXTRATORES = {
+    "vigencia": extrair_vigencia,
+    "modalidade": extrair_modalidade,
+    "ajustes_pt": extrair_ajustes_pt,
+    "ultimo_anexo": extrair_ultimo_anexo,
+}
+EXTRATORES_ATIVOS = [
+    nome.strip() for nome in os.environ.get("EXTRATORES", ",".join(EXTRATORES)).split(",") if nome.strip()
+]
+# Extratores que leem o HTML da página de detalhes, capturado uma única vez por abertura da página
+EXTRATORES_DO_HTML = {"vigencia", "modalidade"}
+# Extratores que saem da página de detalhes: o seguinte a reabre antes de começar
+EXTRATORES_QUE_NAVEGAM = {"ajustes_pt", "ultimo_anexo"}
+# Item do menu de consulta pelo qual cada extrator abre o instrumento (Ajustes do PT usa outra consulta)
+MENU_CONSULTA_EXTRATOR = {"ajustes_pt": 5}
+CHAVE_FALHAS = "Extratores com falha"
+
+
+@medir("coletar_instrumento", lambda driver, instrumento, **_: instrumento.numero)
+def coletar_instrumento(driver, instrumento, extratores=EXTRATORES_ATIVOS):
+    """
+    Abre o instrumento (link gravado ou pesquisa) e executa todos os extratores selecionados na mesma visita.
+    Cada extrator começa na página de detalhes: ela é reaberta depois de um extrator que navega
+    para outra aba (ou quando o extrator usa outra tela de consulta).
+
+    Returns:
+        dict | None: Os campos extraídos (com os extratores que falharam em CHAVE_FALHAS), ou None
+        se o instrumento não puder ser aberto.
+    """
+    numero_instrumento = instrumento.numero
+    registro = {}
+    falhas = []
+    pagina_aberta = None  # Item do menu da página de detalhes aberta; None fora dela
+    pagina = None  # HTML da página de detalhes aberta, capturado no primeiro extrator que o lê
+    try:
+        for nome, extrator in EXTRATORES.items():
+            if nome not in extratores:
+                continue
+            item_menu = MENU_CONSULTA_EXTRATOR.get(nome, 6)
+            if pagina_aberta != item_menu:
+                abrir_detalhe_instrumento(driver, numero_instrumento, item_menu)
+                pagina_aberta = item_menu
+                pagina = None
+            try:
+                if nome in EXTRATORES_DO_HTML:
+                    if pagina is None:
+                        pagina = capturar_pagina(driver)
+                    registro.update(extrator(pagina))
+                else:
+                    registro.update(extrator(driver))
+            except SessaoExpirada:
+                raise  # Tratada por processar_com_reinicio, que reinicia o navegador
+            except Exception as e:
+                print(f"[ERRO] Extrator '{nome}' falhou para o instrumento {numero_instrumento}: {e}")
+                falhas.append(nome)
+            if nome in EXTRATORES_QUE_NAVEGAM:
+                pagina_aberta = None
+        if falhas:
+            registro[CHAVE_FALHAS] = falhas
+        return registro
+    except SessaoExpirada:
+        raise
+    except Exception as e:
+        print(f"[ERRO] Falha ao pesquisar o instrumento {numero_instrumento}: {e}")
+        return None
+    finally:
+        voltar_pagina_inicial(driver)
+
+
+def abrir_relatorios(extratores, execucao_nova):
+    """Abre os gravadores dos relatórios que podem ser alimentados pelos extratores selecionados."""
+    gravadores = {}
+    if "vigencia" in extratores:
+        gravadores["notificacao"] = GravadorResultados(
+            notificacaoTA.CAMINHO_PLANILHA_SAIDA, notificacaoTA.COLUNAS_PLANILHA_SAIDA, "Instrumentos",
+            coluna_instrumento="Instrumento nº", robo="coletor_unificado",
+        )
+        gravadores["esclarecimento"] = GravadorResultados(
+            esclarecimentoTA.CAMINHO_PLANILHA_SAIDA, esclarecimentoTA.COLUNAS_PLANILHA_SAIDA, "Instrumentos"
+        )
+    if "ajustes_pt" in extratores:
+        gravadores["ajustes_pt"] = GravadorResultados(
+            AjustePT.CAMINHO_ARQUIVO_SAIDA, AjustePT.COLUNAS_SAIDA, coluna_chave="Instrumento nº",
+            coluna_instrumento="Instrumento nº", robo="coletor_unificado",
+        )
+        # O relatório de Ajustes do PT é recriado a cada execução
+        if execucao_nova:
+            gravadores["ajustes_pt"].limpar()
+    if "ultimo_anexo" in extratores:
+        gravadores["anexos"] = GravadorResultados(
+            sinalizadorAnexo.CAMINHO_RELATORIO, sinalizadorAnexo.COLUNAS_RELATORIO, "Dados Processados",
+            coluna_instrumento="Número do Instrumento", robo="coletor_unificado",
+        )
+    return gravadores
+
+
+def registrar_relatorios(gravadores, instrumento, registro):
+    """Completa o registro do instrumento com os dados de uma única visita e o distribui entre todos os relatórios abertos."""
+    data_termino = como_data(registro.get("Data de Término"))
+
+    if data_termino and "notificacao" in gravadores:
+        modalidade = registro.get("Modalidade")
+        if modalidade and notificacaoTA.preencher_instrumento(instrumento, data_termino, modalidade):
+            notificacaoTA.gerar_planilha_incremental(gravadores["notificacao"], instrumento)
+        instrumento.data_termino = data_termino
+        esclarecimentoTA.gerar_planilha_incremental(gravadores["esclarecimento"], instrumento)
+
+    if "AjustesPT" in registro and "ajustes_pt" in gravadores:
+        gravadores["ajustes_pt"].registrar([
+            instrumento.numero, instrumento.tecnico, instrumento.email_tecnico,
+            registro["AjustesPT"], registro["Data da Solicitação"],
+        ])
+
+    if "Data Último Anexo" in registro and "anexos" in gravadores:
+        instrumento.data_ultimo_anexo = registro["Data Último Anexo"]
+        gravadores["anexos"].registrar(sinalizadorAnexo.linha_relatorio(instrumento))
+
+
+def registrar_visita(gravadores, registro_execucao, instrumento, registro):
+    """
+    Distribui uma visita completa entre os relatórios e marca o instrumento no registro de execução
+    (executado pelo escritor em segundo plano). Nada é gravado de uma visita incompleta: o
+    instrumento fica pendente e é refeito ao retomar.
+    """
+    if registro is None:
+        registro_execucao.marcar(instrumento.numero, concluido=False)
+    elif CHAVE_FALHAS in registro:
+        falhas = ", ".join(registro[CHAVE_FALHAS])
+        registro_execucao.marcar(instrumento.numero, concluido=False, erro=f"extratores com falha: {falhas}")
+    else:
+        registrar_relatorios(gravadores, instrumento, registro)
+        registro_execucao.marcar(instrumento.numero, concluido=True)
+
+
+def executar_coleta_unificada(extratores=EXTRATORES_ATIVOS, num_navegadores=NUM_NAVEGADORES):
+    """
+    Visita cada instrumento ativo uma única vez, executa os extratores selecionados e alimenta,
+    a partir dessa visita, os relatórios de notificação, esclarecimento, Ajustes do PT e anexos.
+    """
+    extratores = [nome for nome in extratores if nome in EXTRATORES]
+    print(f"[INFO] Extratores selecionados: {extratores}")
+
+    dados_instrumentos = notificacaoTA.coletar_dados_instrumentos_pandas(CAMINHO_ARQUIVO_CONTROLE, ABA_CONTROLE)
+    if not dados_instrumentos:
+        print("[ERRO] Nenhum instrumento encontrado para processamento.")
+        return
+
+    registro_execucao = RegistroExecucao("coletor_unificado")
+    execucao_nova = registro_execucao.execucao_nova()
+    dados_instrumentos = registro_execucao.filtrar_pendentes(
+        dados_instrumentos, lambda item: item.numero
+    )
+    coletar = partial(coletar_instrumento, extratores=extratores)
+
+    if num_navegadores > 1:
+        resultados = executar_em_paralelo(dados_instrumentos, coletar, num_navegadores)
+    else:
+        driver = notificacaoTA.conectar_navegador_existente()
+        if not driver:
+            print("[ERRO] Não foi possível conectar ao navegador. Encerrando o processo.")
+            registro_execucao.fechar()
+            return
+        resultados = processar_com_reinicio(driver, dados_instrumentos, coletar)
+
+    gravadores = abrir_relatorios(extratores, execucao_nova)
+    try:
+        # As gravações seguem para a thread do escritor; o navegador passa logo ao próximo instrumento
+        with EscritorSegundoPlano() as escritor:
+            for instrumento, registro in resultados:
+                escritor.enviar(registrar_visita, gravadores, registro_execucao, instrumento, registro)
+    finally:
+        for gravador in gravadores.values():
+            gravador.fechar()
+        registro_execucao.fechar()
+        emitir_relatorio()
+
+
+if __name__ == "__main__":
+    executar_coleta_unificada()
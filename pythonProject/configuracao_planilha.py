@@ -1,28 +1,35 @@
 import time
-from selenium import webdriver
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, ElementNotInteractableException, NoSuchElementException
-from datetime import datetime
-import pandas as pd
-import os
+from selenium.common.exceptions import TimeoutException, ElementNotInteractableException, WebDriverException
+import sys
+
+from arquivo_paginas import reprocessar_paginas
+from escritor_segundo_plano import EscritorSegundoPlano
+from extracao_html import capturar_pagina, data_mais_recente, existe, texto, textos
+from gravador_resultados import GravadorResultados
+from limitador_taxa import passo_navegacao
+from navegador_gerenciado import conectar_navegador
+from planilha_controle import carregar_planilha
+from pool_navegadores import NUM_NAVEGADORES, executar_em_paralelo
+from rastreamento import emitir_relatorio, etapa, medir
+from registro_execucao import RegistroExecucao
+from saude_sessao import SessaoExpirada, monitor_sessao, processar_com_reinicio
+from seletores import registro_seletores
 
 
 # 1. Função para conectar ao navegador já aberto
 def conectar_navegador_existente():
-    options = webdriver.ChromeOptions()
-    options.debugger_address = "localhost:9222"  # Porta que o Chrome está utilizando para depuração
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
+    # Chrome aberto pelo usuário na porta 9222 ou, com MODO_NAVEGADOR=gerenciado, Chrome sem janela iniciado aqui
+    return conectar_navegador()
 
 
 # 2. Função auxiliar para verificar se um elemento existe com tempo de espera reduzido
 def elemento_existe(driver, xpath, tempo_espera=1):
     try:
-        WebDriverWait(driver, tempo_espera).until(EC.presence_of_element_located((By.XPATH, xpath)))
+        with etapa("elemento_existe", seletor=xpath):
+            WebDriverWait(driver, tempo_espera).until(EC.presence_of_element_located((By.XPATH, xpath)))
         return True
     except TimeoutException:
         print(f"Elemento não encontrado: {xpath}")
@@ -31,49 +38,51 @@ def elemento_existe(driver, xpath, tempo_espera=1):
 
 # 3. Função para garantir que o elemento esteja visível e clicável antes de interagir
 def clicar_elemento(driver, xpath):
+    monitor = monitor_sessao(driver)
+    monitor.garantir_ativa()  # Sessão já perdida: falha na hora, sem esperar o elemento
     try:
         # Esperar o elemento estar visível e clicável
-        elemento = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, xpath)))
-        driver.execute_script("arguments[0].scrollIntoView();", elemento)  # Scroll até o elemento
-        elemento.click()
+        with etapa("clicar_elemento", seletor=xpath), passo_navegacao():
+            elemento = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            driver.execute_script("arguments[0].scrollIntoView();", elemento)  # Scroll até o elemento
+            elemento.click()
+        monitor.registrar_sucesso()
         print(f"Elemento clicado com sucesso: {xpath}")
     except (TimeoutException, ElementNotInteractableException) as e:
         print(f"Erro ao clicar no elemento: {xpath}, Erro: {e}")
+        monitor.registrar_timeout()
         raise e
 
 
 # 4. Função para reiniciar a navegação a partir da proposta seguinte
 def reiniciar_navegacao(driver):
+    # Na tela de login, as esperas abaixo (até 50 s) seriam inúteis: reautentica ou falha na hora
+    monitor_sessao(driver).verificar()
     try:
-        WebDriverWait(driver, 50).until(
-            EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/div[3]/div[1]/div[1]/div[1]/div[3]'))).click()
-        WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/div[3]/div[2]/div[1]/div[1]/ul/li[3]/a'))).click()
+        with passo_navegacao():
+            WebDriverWait(driver, 50).until(
+                EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/div[3]/div[1]/div[1]/div[1]/div[3]'))).click()
+        with passo_navegacao():
+            WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/div[3]/div[2]/div[1]/div[1]/ul/li[3]/a'))).click()
     except TimeoutException:
         print("Elemento não encontrado ou levou muito tempo para carregar durante a navegação. Tentando novamente.")
-        driver.refresh()
-        WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/div[3]/div[1]/div[1]/div[1]/div[3]'))).click()
+        with passo_navegacao():
+            driver.refresh()
+            WebDriverWait(driver, 30).until(
+                EC.element_to_be_clickable((By.XPATH, '/html/body/div[1]/div[3]/div[1]/div[1]/div[1]/div[3]'))).click()
 
 
-# 5. Função para buscar a data mais recente em uma tabela (Certidões, Declarações, etc.)
-def buscar_data_mais_recente(driver, xpath_coluna_datas, secao):
+# 5. Função para buscar a data mais recente em uma tabela (Certidões, Declarações, etc.), lida do HTML já capturado
+def buscar_data_mais_recente(pagina, xpath_coluna_datas, secao):
     try:
-        if elemento_existe(driver, xpath_coluna_datas, tempo_espera=0):  # Sem tempo de espera
-            datas_upload = driver.find_elements(By.XPATH, xpath_coluna_datas)
-            if datas_upload:
-                lista_datas = []
-                for data_element in datas_upload:
-                    data_text = data_element.text
-                    try:
-                        data_convertida = datetime.strptime(data_text, "%d/%m/%Y %H:%M:%S")
-                        lista_datas.append(data_convertida)
-                    except Exception as e:
-                        print(f"Erro ao converter data na seção '{secao}': {data_text}, Erro: {e}")
-                if lista_datas:
-                    data_mais_recente = max(lista_datas)
-                    print(f"Data mais recente na seção '{secao}': {data_mais_recente.strftime('%d/%m/%Y %H:%M:%S')}")
-                    return data_mais_recente.strftime('%d/%m/%Y %H:%M:%S')
+        if existe(pagina, xpath_coluna_datas):
+            data_recente, invalidos = data_mais_recente(textos(pagina, xpath_coluna_datas), "%d/%m/%Y %H:%M:%S")
+            for data_text in invalidos:
+                print(f"Erro ao converter data na seção '{secao}': {data_text}")
+            if data_recente:
+                print(f"Data mais recente na seção '{secao}': {data_recente.strftime('%d/%m/%Y %H:%M:%S')}")
+                return data_recente.strftime('%d/%m/%Y %H:%M:%S')
             print(f"Nenhuma data encontrada na seção '{secao}'.")
         else:
             print(f"Seção '{secao}' não localizada.")
@@ -83,11 +92,11 @@ def buscar_data_mais_recente(driver, xpath_coluna_datas, secao):
         return None
 
 
-# 6. Função para buscar o valor do status, sem tentar converter para data
-def buscar_status(driver, xpath_coluna_status, secao):
+# 6. Função para buscar o valor do status, sem tentar converter para data, lido do HTML já capturado
+def buscar_status(pagina, xpath_coluna_status, secao):
     try:
-        if elemento_existe(driver, xpath_coluna_status, tempo_espera=0):  # Sem tempo de espera
-            status_valor = driver.find_element(By.XPATH, xpath_coluna_status).text
+        status_valor = texto(pagina, xpath_coluna_status)
+        if status_valor is not None:
             print(f"Status na seção '{secao}': {status_valor}")
             return status_valor
         else:
@@ -99,6 +108,23 @@ def buscar_status(driver, xpath_coluna_status, secao):
 
 
 # 7. Função para processar uma proposta
+XPATH_FORMULARIO_REQUISITOS = "/html/body/div[3]/div[16]/div[2]/div[2]/form"
+# XPaths alternativos de "Requisitos para celebração" (a posição do link muda conforme a proposta).
+# A aba "Requisitos" clicada logo antes não entra na lista: estaria sempre presente e seria aprendida como acerto
+XPATHS_REQUISITOS_CELEBRACAO = [
+    '/html/body/div[3]/div[15]/div[1]/div/div[2]/a[12]/div/span/span',
+    '/html/body/div[3]/div[16]/div[1]/div/div[2]/a[29]/div/span/span',
+    '/html/body/div[3]/div[16]/div[1]/div/div[2]/a[13]/div/span/span',
+    '/html/body/div[3]/div[15]/div[1]/div/div[2]/a[13]/div/span/span',
+]
+# XPaths alternativos do botão "Nova Pesquisa"
+XPATHS_NOVA_PESQUISA = [
+    '/html/body/div[3]/div[3]/div[6]/a[2]',
+    '/html/body/div[3]/div[2]/div[6]/a[2]',
+    '/html/body[1]/div[3]/div[3]/div[6]/a[2]',
+]
+
+
 def processar_proposta(driver, proposta_numero):
     print(f"Iniciando o processamento da proposta: {proposta_numero}")
 
@@ -124,171 +150,196 @@ def processar_proposta(driver, proposta_numero):
         print("Aba 'Requisitos' não localizada.")
         return False
 
-    # Tentar clicar em "Requisitos para celebração" com cinco XPaths
-    xpaths = [
-        '/html/body/div[3]/div[15]/div[1]/div/div[2]/a[12]/div/span/span',  # Primeiro XPath
-        '/html/body/div[3]/div[15]/div[1]/div/div[1]/a[3]/div/span/span',  # Segundo XPath
-        '/html/body/div[3]/div[16]/div[1]/div/div[2]/a[29]/div/span/span',  # Terceiro XPath
-        '/html/body/div[3]/div[16]/div[1]/div/div[2]/a[13]/div/span/span',  # Quarto XPath
-        '/html/body/div[3]/div[15]/div[1]/div/div[2]/a[13]/div/span/span'  # Quinto XPath
-    ]
-
-    clicado = False
-    for xpath in xpaths:
-        if elemento_existe(driver, xpath, tempo_espera=1):
-            try:
-                clicar_elemento(driver, xpath)
-                clicado = True
-                print(f"Clicado em 'Requisitos para celebração' usando XPath: {xpath}")
-                break
-            except Exception as e:
-                print(
-                    f"Erro ao tentar clicar em 'Requisitos para celebração' usando XPath: {xpath}. Tentando o próximo...")
-
-    if not clicado:
+    # Tentar clicar em "Requisitos para celebração" pelos XPaths alternativos, do que mais acerta ao que menos acerta
+    xpath = registro_seletores().clicar_primeiro(
+        driver, "requisitos_celebracao", XPATHS_REQUISITOS_CELEBRACAO, clicar_elemento
+    )
+    if xpath:
+        print(f"Clicado em 'Requisitos para celebração' usando XPath: {xpath}")
+    else:
         print("Requisitos para celebração não localizado.")
         return False
 
-    # Consultar valores nas seções, agora com pulos rápidos em caso de não localização
-    dados_proposta = {
+    # Capturar o HTML da página uma única vez e consultar todas as seções localmente
+    elemento_existe(driver, XPATH_FORMULARIO_REQUISITOS, tempo_espera=2)
+    return dados_da_pagina_requisitos(capturar_pagina(driver, proposta_numero, "requisitos"), proposta_numero)
+
+
+# Lê as seções de "Requisitos para celebração" do HTML já capturado (também usado pelo benchmark)
+def dados_da_pagina_requisitos(pagina, proposta_numero):
+    return {
         "Proposta": proposta_numero,
-        "Certidões": buscar_data_mais_recente(driver,
+        "Certidões": buscar_data_mais_recente(pagina,
                                               "/html/body/div[3]/div[16]/div[2]/div[2]/form/div[1]/div[1]/table/tbody/tr[1]/td[2]",
                                               "Certidões"),
-        "Declarações": buscar_data_mais_recente(driver,
+        "Declarações": buscar_data_mais_recente(pagina,
                                                 "/html/body/div[3]/div[16]/div[2]/div[2]/form/div[1]/div[2]/table/tbody/tr[1]/td[2]",
                                                 "Declarações"),
-        "Comprovantes de Execução": buscar_data_mais_recente(driver,
+        "Comprovantes de Execução": buscar_data_mais_recente(pagina,
                                                              "/html/body/div[3]/div[16]/div[2]/div[2]/form/div[1]/div[3]/table/tbody/tr[1]/td[2]",
                                                              "Comprovantes de Execução"),
-        "Outros": buscar_data_mais_recente(driver,
+        "Outros": buscar_data_mais_recente(pagina,
                                            "/html/body/div[3]/div[16]/div[2]/div[2]/form/div[1]/div[4]/table/tbody/tr[1]/td[2]",
                                            "Outros"),
-        "Históricos - Data": buscar_data_mais_recente(driver,
+        "Históricos - Data": buscar_data_mais_recente(pagina,
                                                       "/html/body/div[3]/div[16]/div[2]/div[2]/form/div[1]/div[5]/table/tbody/tr[1]/td[3]",
                                                       "Históricos"),
-        "Históricos - Status": buscar_status(driver,
+        "Históricos - Status": buscar_status(pagina,
                                              "/html/body/div[3]/div[16]/div[2]/div[2]/form/div[1]/div[5]/table/tbody/tr[1]/td[1]",
                                              "Históricos Status")
     }
 
-    return dados_proposta
 
+# 8. Função para salvar o progresso: a linha vai para o banco de resultados e a planilha é gerada nos checkpoints
+CAMINHO_ARQUIVO_RESULTADOS = r"C:\Users\d-deb\OneDrive\Documents\dev\robov1\Consulta Transferegov Requisitos.xlsx"
+# Planilha gerada ao reextrair as páginas de requisitos arquivadas (ver arquivo_paginas.py)
+CAMINHO_ARQUIVO_REPROCESSADO = r"C:\Users\d-deb\OneDrive\Documents\dev\robov1\Consulta Transferegov Requisitos Reprocessado.xlsx"
 
-# 8. Função para salvar o progresso no Excel, agora limpando a planilha no início
-def salvar_progresso(resultado):
-    caminho_arquivo = r"C:\Users\d-deb\OneDrive\Documents\dev\robov1\Consulta Transferegov Requisitos.xlsx"
 
+def salvar_progresso(gravador, resultado):
     try:
-        if not os.path.exists(caminho_arquivo):
-            # Se o arquivo não existir, criar a primeira vez
-            pd.DataFrame([resultado]).to_excel(caminho_arquivo, index=False)
-        else:
-            # Concatenar novos dados ao arquivo existente
-            df_existente = pd.read_excel(caminho_arquivo)
-            df_atualizado = pd.concat([df_existente, pd.DataFrame([resultado])], ignore_index=True)
-            df_atualizado.to_excel(caminho_arquivo, index=False)
-        print(f"Progresso salvo com sucesso no arquivo '{caminho_arquivo}'!")
+        gravador.registrar(resultado)
+        print(f"Progresso salvo com sucesso no banco de resultados ('{gravador.relatorio}')!")
     except Exception as e:
-        print(f"Erro ao salvar o arquivo Excel: {e}")
+        print(f"Erro ao salvar o progresso: {e}")
+
+
+# Executado pelo escritor em segundo plano: grava a proposta e só então a marca como concluída
+def registrar_proposta(gravador, registro, proposta_numero, dados_proposta):
+    salvar_progresso(gravador, dados_proposta)
+    registro.marcar(proposta_numero, concluido="Erro" not in dados_proposta)
 
 
 # 9. Função para clicar no botão "Nova Pesquisa" com fallback para XPaths diferentes
 def clicar_nova_pesquisa(driver):
-    xpaths_nova_pesquisa = [
-        '/html/body/div[3]/div[3]/div[6]/a[2]',  # Primeiro XPath
-        '/html/body/div[3]/div[2]/div[6]/a[2]',  # Segundo XPath
-        '/html/body[1]/div[3]/div[3]/div[6]/a[2]'  # Terceiro XPath
-    ]
-
-    botao_encontrado = False
+    xpath = registro_seletores().clicar_primeiro(driver, "nova_pesquisa", XPATHS_NOVA_PESQUISA, clicar_elemento)
+    if xpath:
+        print(f"Botão 'Nova Pesquisa' clicado com sucesso usando XPath: {xpath}")
+    else:
+        # Se nenhum dos XPaths funcionar, recarregar a página e reiniciar a navegação
+        print("Botão 'Nova Pesquisa' não encontrado após tentar todos os XPaths. Recarregando a página.")
+        reiniciar_navegacao(driver)
 
-    for xpath in xpaths_nova_pesquisa:
-        if elemento_existe(driver, xpath, tempo_espera=2):
-            try:
-                WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, xpath))).click()
-                print(f"Botão 'Nova Pesquisa' clicado com sucesso usando XPath: {xpath}")
-                botao_encontrado = True
-                break
-            except (NoSuchElementException, TimeoutException):
-                print(f"Falha ao clicar no botão 'Nova Pesquisa' com o XPath: {xpath}. Tentando o próximo...")
-        else:
-            print(f"Botão 'Nova Pesquisa' não encontrado com o XPath: {xpath}. Tentando o próximo...")
 
-    # Se nenhum dos XPaths funcionar, recarregar a página e reiniciar a navegação
-    if not botao_encontrado:
-        print(f"Botão 'Nova Pesquisa' não encontrado após tentar todos os XPaths. Recarregando a página.")
+# 10. Função para consultar uma proposta e deixar a tela pronta para a próxima
+@medir("consultar_proposta", lambda driver, proposta_numero: proposta_numero)
+def consultar_proposta(driver, proposta_numero):
+    monitor_sessao(driver).verificar()
+    try:
+        dados_proposta = processar_proposta(driver, proposta_numero)
+        if not dados_proposta:
+            dados_proposta = {"Proposta": proposta_numero, "Erro": "Requisitos não localizados"}
+
+        # Clicar no botão "Nova Pesquisa"
+        clicar_nova_pesquisa(driver)
+        return dados_proposta
+    except SessaoExpirada:
+        raise  # Tratada no laço principal, que reinicia o navegador
+    except Exception as e:
+        print(f"Erro ao processar a proposta {proposta_numero}: {e}")
         reiniciar_navegacao(driver)
+        return {"Proposta": proposta_numero, "Erro": str(e)}
 
 
-# 10. Função principal para processar todas as propostas
-def processar_todas_propostas():
+# 11. Função principal para processar todas as propostas
+def processar_todas_propostas(num_navegadores=NUM_NAVEGADORES):
     resultados = []
     propostas_consultadas = 0
     tempo_acumulado = 0  # Para somar o tempo total
 
     caminho_planilha = r"C:\Users\d-deb\OneDrive\Documents\dev\robov1\propostas_iniciais.xlsx"
-    df_propostas = pd.read_excel(caminho_planilha)
+    df_propostas = carregar_planilha(caminho_planilha, ['NºProposta'])
 
     # Limpar espaços desnecessários
-    df_propostas.columns = df_propostas.columns.str.strip()
     df_propostas['NºProposta'] = df_propostas['NºProposta'].str.strip()
 
-    driver = conectar_navegador_existente()
+    # Limpar a planilha apenas em uma execução nova; ao retomar, pular as propostas já concluídas
+    registro = RegistroExecucao("configuracao_planilha")
+    gravador = GravadorResultados(CAMINHO_ARQUIVO_RESULTADOS, coluna_chave="Proposta")
+    if registro.execucao_nova():
+        gravador.limpar()  # Apagar as linhas gravadas e a planilha existente para começar do zero
+        print(f"A planilha '{CAMINHO_ARQUIVO_RESULTADOS}' foi limpa.")
+    propostas = registro.filtrar_pendentes(df_propostas['NºProposta'].tolist(), lambda proposta: proposta)
+
+    # Modo paralelo: navegadores isolados consultam as propostas simultaneamente
+    if num_navegadores > 1:
+        try:
+            with EscritorSegundoPlano() as escritor:
+                for proposta_numero, dados_proposta in executar_em_paralelo(propostas, consultar_proposta, num_navegadores,
+                                                                            funcao_preparar=reiniciar_navegacao):
+                    if dados_proposta is None:
+                        dados_proposta = {"Proposta": proposta_numero, "Erro": "Falha no navegador"}
+                    escritor.enviar(registrar_proposta, gravador, registro, proposta_numero, dados_proposta)
+        finally:
+            gravador.fechar()
+            registro.fechar()
+            emitir_relatorio()
+        return
 
-    # Limpar a planilha antes de começar
-    caminho_arquivo_resultados = r"C:\Users\d-deb\OneDrive\Documents\dev\robov1\Consulta Transferegov Requisitos.xlsx"
-    if os.path.exists(caminho_arquivo_resultados):
-        os.remove(caminho_arquivo_resultados)  # Apagar o arquivo existente para começar do zero
-        print(f"A planilha '{caminho_arquivo_resultados}' foi limpa.")
+    driver = conectar_navegador_existente()
+    # Gravações em uma thread à parte: a próxima consulta não espera pelo disco
+    escritor = EscritorSegundoPlano()
 
     try:
         reiniciar_navegacao(driver)
 
-        for index, row in df_propostas.iterrows():
-            proposta_numero = row['NºProposta']
+        # Sessão perdida no meio da sequência: reinicia o navegador, volta à tela de consulta e retoma pela proposta interrompida
+        tempo_inicio = time.time()  # Medir o tempo de início da primeira consulta
+        for proposta_numero, dados_proposta in processar_com_reinicio(
+            driver, propostas, consultar_proposta, funcao_preparar=reiniciar_navegacao
+        ):
             propostas_consultadas += 1
+            resultados.append(dados_proposta)
 
-            print(f"\nConsultando proposta {proposta_numero} (Proposta {propostas_consultadas})...")
-
-            try:
-                # Medir o tempo de início da consulta
-                tempo_inicio = time.time()
+            # Medir o tempo de fim da consulta
+            tempo_fim = time.time()
+            tempo_consulta = tempo_fim - tempo_inicio  # Tempo em segundos para essa proposta
+            tempo_acumulado += tempo_consulta  # Acumular o tempo total
 
-                # Processar a proposta
-                dados_proposta = processar_proposta(driver, proposta_numero)
-                resultados.append(dados_proposta)
+            # Convertendo o tempo total acumulado para minutos e segundos
+            minutos_acumulados = int(tempo_acumulado // 60)
+            segundos_acumulados = int(tempo_acumulado % 60)
 
-                # Medir o tempo de fim da consulta
-                tempo_fim = time.time()
-                tempo_consulta = tempo_fim - tempo_inicio  # Tempo em segundos para essa proposta
-                tempo_acumulado += tempo_consulta  # Acumular o tempo total
+            # Exibir informações de monitoramento
+            print(f"Proposta {proposta_numero} consultada em {tempo_consulta:.2f} segundos.")
+            print(f"Tempo total acumulado: {minutos_acumulados}m:{segundos_acumulados:02d}s.")
+            print(f"Propostas consultadas até agora: {propostas_consultadas}")
 
-                # Convertendo o tempo total acumulado para minutos e segundos
-                minutos_acumulados = int(tempo_acumulado // 60)
-                segundos_acumulados = int(tempo_acumulado % 60)
+            # Salvar progresso
+            escritor.enviar(registrar_proposta, gravador, registro, proposta_numero, dados_proposta)
+            tempo_inicio = time.time()  # A próxima consulta começa agora
 
-                # Exibir informações de monitoramento
-                print(f"Proposta {proposta_numero} consultada em {tempo_consulta:.2f} segundos.")
-                print(f"Tempo total acumulado: {minutos_acumulados}m:{segundos_acumulados:02d}s.")
-                print(f"Propostas consultadas até agora: {propostas_consultadas}")
-
-                # Salvar progresso
-                salvar_progresso(dados_proposta)
-
-                # Clicar no botão "Nova Pesquisa"
-                clicar_nova_pesquisa(driver)
+    finally:
+        try:
+            escritor.fechar()  # Espera as gravações pendentes
+        finally:
+            gravador.fechar()
+            registro.fechar()
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass  # Navegador já fechado ao ser reiniciado no meio da execução
+            emitir_relatorio()
 
-            except Exception as e:
-                print(f"Erro ao processar a proposta {proposta_numero}: {e}")
-                salvar_progresso({"Proposta": proposta_numero, "Erro": str(e)})
-                reiniciar_navegacao(driver)
 
+# Reextrai as seções das páginas de requisitos arquivadas, sem navegador nem portal
+def reprocessar_arquivo(execucao=None):
+    gravador = GravadorResultados(CAMINHO_ARQUIVO_REPROCESSADO, coluna_chave="Proposta")
+    gravador.limpar()
+    try:
+        reprocessar_paginas(
+            "requisitos", lambda proposta_numero, pagina: dados_da_pagina_requisitos(pagina, proposta_numero),
+            gravador.registrar, execucao,
+        )
     finally:
-        driver.quit()
+        gravador.fechar()
 
 
-# 11. Executar o processamento de todas as propostas
-processar_todas_propostas()
+# 12. Executar o processamento de todas as propostas
+if __name__ == "__main__":
+    if "--reprocessar" in sys.argv:
+        reprocessar_arquivo()
+    else:
+        processar_todas_propostas()
 
-print("Execução concluída e dados salvos com sucesso!")
+        print("Execução concluída e dados salvos com sucesso!")
@@ -1,65 +1,55 @@
-import os
-import pyperclip
-from openpyxl.reader.excel import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.workbook import Workbook
-from selenium import webdriver
-from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from datetime import datetime, timedelta
-import pandas as pd
-import chromedriver_autoinstaller
-import time
+from datetime import datetime
+
+from escritor_segundo_plano import EscritorSegundoPlano
+from gravador_resultados import GravadorResultados
+from limitador_taxa import passo_navegacao
+from modelo_instrumento import formatar_data, instrumentos_do_controle
+from navegacao import abrir_detalhe_instrumento
+from navegador_gerenciado import conectar_navegador
+from planilha_controle import instrumentos_ativos
+from pool_navegadores import NUM_NAVEGADORES, executar_em_paralelo
+from rastreamento import emitir_relatorio, etapa, medir
+from registro_execucao import RegistroExecucao
+from saude_sessao import SessaoExpirada, monitor_sessao, processar_com_reinicio
 
 
 # Configuração inicial do ChromeDriver
 def conectar_navegador_existente():
     """Conecta ao navegador Chrome já aberto, utilizando a porta de depuração 9222."""
     try:
-        chromedriver_autoinstaller.install()
-        options = webdriver.ChromeOptions()
-        options.debugger_address = "localhost:9222"
-        driver = webdriver.Chrome(options=options)
-        return driver
+        return conectar_navegador()
     except Exception as e:
         print(f"Erro ao conectar ao navegador existente: {e}")
         return None
 
 
 def clicar_elemento(driver, xpath, tempo_espera=10):
-    """Espera e clica em um elemento identificado pelo XPath."""
+    """Espera e clica em um elemento identificado pelo XPath (falha na hora se a sessão já caiu)."""
+    monitor = monitor_sessao(driver)
+    monitor.garantir_ativa()
     try:
-        elemento = WebDriverWait(driver, tempo_espera).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
-        )
-        elemento.click()
+        with etapa("clicar_elemento", seletor=xpath), passo_navegacao():
+            elemento = WebDriverWait(driver, tempo_espera).until(
+                EC.element_to_be_clickable((By.XPATH, xpath))
+            )
+            elemento.click()
+        monitor.registrar_sucesso()
         print(f"Elemento clicado: {xpath}")
     except (TimeoutException, NoSuchElementException) as e:
         print(f"Erro ao encontrar ou clicar no elemento {xpath}: {e}")
+        monitor.registrar_timeout()
     except Exception as e:
         print(f"Erro inesperado: {e}")
 
 
 def coletar_dados_instrumentos_pandas(nome_arquivo, aba):
-    """Extrai dados usando pandas para garantir a leitura correta das colunas."""
+    """Extrai os instrumentos ativos da planilha de controle (leitura só das colunas usadas, com cache)."""
     try:
-        planilha = pd.read_excel(nome_arquivo, sheet_name=aba)
-        dados_filtrados = planilha[
-            (planilha["Status"] == "ATIVOS TODOS") &
-            (planilha["Instrumento nº"].notna()) &
-            (planilha["Técnico"].notna()) &
-            (planilha["e-mail do Técnico"].notna())
-            ][["Instrumento nº", "Técnico", "e-mail do Técnico"]]
-
-        dados_filtrados["e-mail do Técnico"].fillna("não encontrado", inplace=True)
-        dados_filtrados["Instrumento nº"] = dados_filtrados["Instrumento nº"].apply(
-            lambda x: str(int(x)) if pd.notna(x) else "não encontrado"
-        )
-
-        dados_instrumentos = dados_filtrados.to_dict(orient="records")
+        dados_instrumentos = instrumentos_do_controle(instrumentos_ativos(nome_arquivo, aba))
         print(f"Instrumentos coletados: {len(dados_instrumentos)}")
         return dados_instrumentos
     except Exception as e:
@@ -67,6 +57,7 @@ def coletar_dados_instrumentos_pandas(nome_arquivo, aba):
         return []
 
 
+@medir("extrair_data_termino")
 def extrair_data_termino(driver):
     """Extrai a data de término de vigência usando o XPath."""
     try:
@@ -82,94 +73,109 @@ def extrair_data_termino(driver):
         return None
 
 
-def gerar_planilha_incremental(instrumento):
-    """Atualiza a planilha Excel incrementando com um novo instrumento a cada chamada."""
-    nome_arquivo_excel = "C:/Users/diego.brito/Downloads/robov1/Resultados_Instrumentos.xlsx"
+# Planilha de saída e suas colunas
+CAMINHO_PLANILHA_SAIDA = "C:/Users/diego.brito/Downloads/robov1/Resultados_Instrumentos.xlsx"
+COLUNAS_PLANILHA_SAIDA = [
+    "Instrumento nº", "Data de Término", "Modalidade",
+    "Data de Notificação 1", "Data de Notificação 2",
+    "Notificação Enviada", "Técnico", "E-mail"
+]
+
 
+def gerar_planilha_incremental(gravador, instrumento):
+    """
+    Registra um novo instrumento no banco de resultados; a planilha é gerada nos checkpoints e ao final.
+    Devolve True se a linha foi gravada.
+    """
     try:
-        # Verifica se o arquivo já existe
-        if os.path.exists(nome_arquivo_excel):
-            workbook = load_workbook(nome_arquivo_excel)
-            sheet = workbook.active
-        else:
-            workbook = Workbook()
-            sheet = workbook.active
-            sheet.title = "Instrumentos"
-            sheet.append([
-                "Instrumento nº", "Data de Término", "Modalidade",
-                "Data de Notificação 1", "Data de Notificação 2",
-                "Notificação Enviada", "Técnico", "E-mail"
-            ])
-            print(f"Arquivo criado: {nome_arquivo_excel}")
-
-        # Adiciona nova linha com os dados do instrumento
+        # Adiciona nova linha com os dados do instrumento (as datas só são formatadas aqui)
         nova_linha = [
-            instrumento.get("Instrumento nº", "N/A"),
-            instrumento.get("Data de Término", "N/A"),
-            instrumento.get("Modalidade", "N/A"),
-            instrumento.get("Data de Notificação 1", "N/A"),
-            instrumento.get("Data de Notificação 2", "N/A"),
-            instrumento.get("Notificação Enviada", "N/A"),
-            instrumento.get("Técnico", "N/A"),
-            instrumento.get("e-mail do Técnico", "N/A")
+            instrumento.numero or "N/A",
+            formatar_data(instrumento.data_termino, "N/A"),
+            instrumento.modalidade or "N/A",
+            instrumento.notificacao(1, "N/A"),
+            instrumento.notificacao(2, "N/A"),
+            "N/A",  # Notificação Enviada
+            instrumento.tecnico or "N/A",
+            instrumento.email_tecnico or "N/A"
         ]
-        sheet.append(nova_linha)
-        workbook.save(nome_arquivo_excel)
+        gravador.registrar(nova_linha)
         print(f"Dados salvos no Excel: {nova_linha}")
+        return True
     except Exception as e:
         print(f"Erro ao atualizar o Excel: {e}")
+        return False
 
 
-def executar_processo():
-    """Fluxo principal do programa."""
-    driver = conectar_navegador_existente()
-    if not driver:
-        print("Não foi possível conectar ao navegador.")
-        return
+def registrar_resultado(gravador, registro, instrumento, processado):
+    """
+    Grava o instrumento processado e o marca no registro de execução (executado pelo escritor em
+    segundo plano). Só conta como concluído se a linha foi gravada; senão é refeito ao retomar.
+    """
+    gravado = bool(processado) and gerar_planilha_incremental(gravador, processado)
+    registro.marcar(instrumento.numero, concluido=gravado)
 
-    dados_instrumentos = coletar_dados_instrumentos_pandas(
-        "CONTROLE DE PARCERIAS CGAP.xlsx", "PARCERIAS CGAP"
-    )
-    if not dados_instrumentos:
-        print("Nenhum dado encontrado para processamento.")
-        return
 
-    for instrumento in dados_instrumentos:
-        try:
-            numero_instrumento = instrumento.get("Instrumento nº")
-            print(f"Processando instrumento: {numero_instrumento}")
+@medir("processar_instrumento", lambda driver, instrumento: instrumento.numero)
+def processar_instrumento(driver, instrumento):
+    """Consulta um instrumento no portal e devolve seus dados com a data de término, ou None em caso de falha."""
+    numero_instrumento = instrumento.numero
+    try:
+        print(f"Processando instrumento: {numero_instrumento}")
 
-            clicar_elemento(driver, '//*[@id="menuPrincipal"]/div[1]/div[4]')
-            clicar_elemento(driver, '//*[@id="contentMenu"]/div[1]/ul/li[6]/a')
+        # Abre a página do instrumento (link gravado ou pesquisa pelo número)
+        abrir_detalhe_instrumento(driver, numero_instrumento)
 
-            # Pesquisar pelo número do instrumento
-            campo_pesquisa_xpath = '//*[@id="consultarNumeroConvenio"]'
-            campo = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, campo_pesquisa_xpath))
-            )
-            campo.clear()
-            campo.send_keys(str(numero_instrumento))
+        # Extrai informações do instrumento
+        data_termino = extrair_data_termino(driver)
+        if not data_termino:
+            return None
+
+        instrumento.data_termino = data_termino.date()
+        instrumento.modalidade = "Exemplo"  # Substituir por extração real
+        return instrumento
 
-            botao_submit_xpath = '//*[@id="form_submit"]'
-            clicar_elemento(driver, botao_submit_xpath)
+    except SessaoExpirada:
+        raise  # Tratada no laço principal, que reinicia o navegador
+    except Exception as e:
+        print(f"Erro ao processar instrumento {numero_instrumento}: {e}")
+        return None
 
-            time.sleep(2)
 
-            detalhe_instrumento_xpath = '//*[@id="instrumentoId"]/a'
-            clicar_elemento(driver, detalhe_instrumento_xpath)
+def executar_processo(num_navegadores=NUM_NAVEGADORES):
+    """
+    Fluxo principal do programa. Com num_navegadores > 1, distribui os instrumentos entre navegadores isolados.
+    Instrumentos já concluídos na execução atual são pulados ao retomar uma execução interrompida.
+    """
+    dados_instrumentos = coletar_dados_instrumentos_pandas(
+        "CONTROLE DE PARCERIAS CGAP.xlsx", "PARCERIAS CGAP"
+    )
+    if not dados_instrumentos:
+        print("Nenhum dado encontrado para processamento.")
+        return
 
-            # Extrai informações do instrumento
-            data_termino = extrair_data_termino(driver)
-            if not data_termino:
-                continue
+    registro = RegistroExecucao("esclarecimentoTA")
+    dados_instrumentos = registro.filtrar_pendentes(dados_instrumentos, lambda item: item.numero)
+    gravador = GravadorResultados(CAMINHO_PLANILHA_SAIDA, COLUNAS_PLANILHA_SAIDA, "Instrumentos")
 
-            instrumento["Data de Término"] = data_termino.strftime("%d/%m/%Y")
-            instrumento["Modalidade"] = "Exemplo"  # Substituir por extração real
-            gerar_planilha_incremental(instrumento)
+    if num_navegadores > 1:
+        resultados = executar_em_paralelo(dados_instrumentos, processar_instrumento, num_navegadores)
+    else:
+        driver = conectar_navegador_existente()
+        if not driver:
+            print("Não foi possível conectar ao navegador.")
+            return
+        resultados = processar_com_reinicio(driver, dados_instrumentos, processar_instrumento)
 
-        except Exception as e:
-            print(f"Erro ao processar instrumento {numero_instrumento}: {e}")
-            continue
+    try:
+        # Gravações em uma thread à parte: o navegador não espera pelo disco
+        with EscritorSegundoPlano() as escritor:
+            for instrumento, processado in resultados:
+                escritor.enviar(registrar_resultado, gravador, registro, instrumento, processado)
+    finally:
+        gravador.fechar()
+        registro.fechar()
+        emitir_relatorio()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import os
+import queue
+import threading
+
+
+# Tarefas de gravação que podem aguardar na fila antes de o robô esperar pelo disco
+TAMANHO_FILA_GRAVACAO = int(os.environ.get("TAMANHO_FILA_GRAVACAO", "100"))
+
+_FIM = object()
+
+
+class EscritorSegundoPlano:
+    """
+    Etapa de gravação do pipeline: executa as gravações (banco de resultados, exportação da
+    planilha nos checkpoints, registro de execução) em uma thread dedicada, para que o disco
+    lento (ex.: pastas sincronizadas pelo OneDrive) não atrase a próxima consulta ao portal.
+
+    As tarefas são executadas na ordem de envio. A fila é limitada: se o disco ficar muito para
+    trás, `enviar` bloqueia até abrir espaço, sem acumular resultados na memória. Enquanto o
+    escritor estiver aberto, os objetos usados pelas tarefas (gravador, registro) não devem ser
+    usados em outra thread.
+    """
+
+    def __init__(self, tamanho_fila=TAMANHO_FILA_GRAVACAO, nome="escritor-resultados"):
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.erro = None
+        self.thread = threading.Thread(target=self._executar, name=nome, daemon=True)
+        self.thread.start()
+
+    def _executar(self):
+        while True:
+            tarefa = self.fila.get()
+            if tarefa is _FIM:
+                return
+            funcao, args, kwargs = tarefa
+            try:
+                funcao(*args, **kwargs)
+            except Exception as e:
+                # Continua consumindo a fila para não travar quem envia; o erro é levantado em fechar()
+                print(f"[ERRO] Falha na gravação em segundo plano ({getattr(funcao, '__name__', funcao)}): {e}")
+                if self.erro is None:
+                    self.erro = e
+
+    def enviar(self, funcao, *args, **kwargs):
+        """Agenda `funcao(*args, **kwargs)` na thread de gravação (bloqueia se a fila estiver cheia)."""
+        if not self.thread.is_alive():
+            raise RuntimeError("O escritor em segundo plano já foi encerrado.")
+        self.fila.put((funcao, args, kwargs))
+
+    def fechar(self):
+        """Espera as gravações pendentes terminarem e levanta o primeiro erro ocorrido, se houver."""
+        if self.thread.is_alive():
+            self.fila.put(_FIM)
+            self.thread.join()
+        if self.erro is not None:
+            erro, self.erro = self.erro, None
+            raise erro
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento):
+        if tipo is None:
+            self.fechar()
+        else:
+            # Já há uma exceção em andamento: grava o que ficou na fila sem mascará-la
+            try:
+                self.fechar()
+            except Exception as e:
+                print(f"[ERRO] Falha na gravação em segundo plano: {e}")
+        return False
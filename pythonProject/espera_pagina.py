@@ -0,0 +1,134 @@
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from rastreamento import etapa
+
+
+# Conta as requisições XHR/fetch em andamento na página (window.__requisicoesPendentes)
+SCRIPT_MONITOR_REDE = """
+(function () {
+    if (window.__monitorRede) { return; }
+    window.__monitorRede = true;
+    window.__requisicoesPendentes = 0;
+    window.__ultimaAtividadeRede = Date.now();
+    function inicio() { window.__requisicoesPendentes++; window.__ultimaAtividadeRede = Date.now(); }
+    function fim() {
+        window.__requisicoesPendentes = Math.max(0, window.__requisicoesPendentes - 1);
+        window.__ultimaAtividadeRede = Date.now();
+    }
+    const enviar = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        inicio();
+        this.addEventListener('loadend', fim);
+        return enviar.apply(this, arguments);
+    };
+    if (window.fetch) {
+        const buscar = window.fetch;
+        window.fetch = function () {
+            inicio();
+            return buscar.apply(this, arguments).finally(fim);
+        };
+    }
+})();
+"""
+
+# Devolve há quantos ms a rede está ociosa (-1 se houver requisições pendentes ou a página não terminou).
+# arguments[0]: aceitar o documento já interpretado ('interactive'), para navegadores com carregamento "eager"
+SCRIPT_TEMPO_OCIOSO = """
+if (document.readyState === 'loading' || (!arguments[0] && document.readyState !== 'complete')) { return -1; }
+if (window.__monitorRede === undefined) { return null; }
+if (window.__requisicoesPendentes > 0) { return -1; }
+return Date.now() - window.__ultimaAtividadeRede;
+"""
+
+_drivers_monitorados = set()
+
+
+def instalar_monitor_rede(driver):
+    """
+    Instala, via CDP, o contador de requisições em todas as páginas que o navegador abrir.
+
+    Também o injeta na página atual. Em navegadores sem CDP, só a página atual é monitorada.
+    """
+    if id(driver) not in _drivers_monitorados:
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": SCRIPT_MONITOR_REDE})
+        except (AttributeError, WebDriverException):
+            pass
+        _drivers_monitorados.add(id(driver))
+    driver.execute_script(SCRIPT_MONITOR_REDE)
+
+
+def reinstalar_monitor_rede(driver):
+    """Instala o monitor de novo (ex.: em uma aba nova, onde o registro via CDP não vale)."""
+    _drivers_monitorados.discard(id(driver))
+    instalar_monitor_rede(driver)
+
+
+def aguardar_documento_pronto(driver, tempo_espera=10):
+    """Espera `document.readyState` chegar a 'complete'."""
+    WebDriverWait(driver, tempo_espera, poll_frequency=0.1).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+
+def aguardar_rede_ociosa(driver, tempo_ocioso=0.3, tempo_espera=10):
+    """
+    Espera o documento carregar e a página ficar `tempo_ocioso` segundos sem requisições XHR/fetch.
+
+    Retorna assim que a condição é atingida; não levanta erro se a página continuar ocupada
+    até o fim do `tempo_espera` (só avisa), para não interromper o fluxo por uma requisição lenta.
+    """
+    # Com carregamento "eager", o DOM pronto basta; imagens e estilos não seguram a espera
+    carregamento_antecipado = driver.capabilities.get("pageLoadStrategy") == "eager"
+    limite = time.monotonic() + tempo_espera
+    while time.monotonic() < limite:
+        try:
+            ocioso_ms = driver.execute_script(SCRIPT_TEMPO_OCIOSO, carregamento_antecipado)
+            if ocioso_ms is None:
+                # Página nova ainda sem o monitor (navegador sem CDP): instala e recomeça a contagem
+                instalar_monitor_rede(driver)
+            elif ocioso_ms >= tempo_ocioso * 1000:
+                return True
+        except WebDriverException:
+            pass  # Página sendo trocada no meio da consulta
+        time.sleep(0.05)
+    print(f"[INFO] A página não ficou ociosa em {tempo_espera}s; seguindo mesmo assim.")
+    return False
+
+
+def aguardar_obsolescencia(driver, elemento, tempo_espera=10):
+    """Espera o elemento sair do DOM (ex.: a página ou a tabela de resultados anterior foi substituída)."""
+    try:
+        WebDriverWait(driver, tempo_espera, poll_frequency=0.1).until(EC.staleness_of(elemento))
+        return True
+    except TimeoutException:
+        return False
+
+
+def aguardar_elemento(driver, xpath, tempo_espera=10):
+    """Espera o elemento do XPath estar presente e o devolve."""
+    return WebDriverWait(driver, tempo_espera, poll_frequency=0.1).until(
+        EC.presence_of_element_located((By.XPATH, xpath))
+    )
+
+
+def raiz_documento(driver):
+    """Devolve o elemento <html> atual, para depois esperar a troca de página com `aguardar_obsolescencia`."""
+    return driver.find_element(By.TAG_NAME, "html")
+
+
+def aguardar_pagina_pronta(driver, xpath=None, elemento_anterior=None, tempo_espera=10):
+    """
+    Espera, na ordem, pelos sinais informados: troca do elemento anterior, presença do XPath
+    alvo e rede ociosa. Retorna assim que todos estiverem satisfeitos.
+    """
+    with etapa("aguardar_pagina_pronta", seletor=xpath):
+        if elemento_anterior is not None:
+            aguardar_obsolescencia(driver, elemento_anterior, tempo_espera)
+        if xpath:
+            aguardar_elemento(driver, xpath, tempo_espera)
+        aguardar_rede_ociosa(driver, tempo_espera=tempo_espera)
@@ -0,0 +1,58 @@
+from datetime import datetime
+from lxml import html
+
+from arquivo_paginas import arquivar_pagina
+
+
+def capturar_pagina(driver, numero_instrumento=None, tipo=None):
+    """
+    Lê o HTML da página atual em uma única chamada ao WebDriver e devolve a árvore lxml.
+
+    Todas as consultas seguintes (XPath, textos, atributos) são feitas localmente sobre essa
+    árvore, sem novas idas e voltas ao navegador. Informando o instrumento e o tipo da página,
+    o HTML também é guardado no arquivo de páginas (ver arquivo_paginas.py), se ligado.
+    """
+    conteudo = driver.page_source
+    if numero_instrumento is not None and tipo:
+        arquivar_pagina(numero_instrumento, tipo, conteudo, driver.current_url)
+    return html.fromstring(conteudo)
+
+
+def normalizar_texto(texto):
+    """Remove espaços extras, como o `.text` do Selenium faz com o texto exibido."""
+    return " ".join(texto.split())
+
+
+def textos(arvore, xpath):
+    """Devolve o texto normalizado de todos os elementos encontrados pelo XPath (vazios incluídos)."""
+    return [normalizar_texto(elemento.text_content()) for elemento in arvore.xpath(xpath)]
+
+
+def texto(arvore, xpath):
+    """Devolve o texto do primeiro elemento encontrado pelo XPath, ou None se não houver."""
+    encontrados = textos(arvore, xpath)
+    return encontrados[0] if encontrados else None
+
+
+def existe(arvore, xpath):
+    """Indica se o XPath encontra algum elemento na árvore."""
+    return bool(arvore.xpath(xpath))
+
+
+def data_mais_recente(lista_textos, formato):
+    """
+    Converte os textos de data no formato informado e devolve a maior data.
+
+    Returns:
+        tuple: (data mais recente ou None, lista dos textos que não puderam ser convertidos)
+    """
+    datas = []
+    invalidos = []
+    for data_texto in lista_textos:
+        if not data_texto:
+            continue
+        try:
+            datas.append(datetime.strptime(data_texto, formato))
+        except ValueError:
+            invalidos.append(data_texto)
+    return (max(datas) if datas else None), invalidos
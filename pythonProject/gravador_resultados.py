@@ -0,0 +1,163 @@
+import json
+import os
+from openpyxl import Workbook, load_workbook
+
+from banco_resultados import BancoResultados
+from rastreamento import etapa
+
+
+class GravadorResultados:
+    """
+    Grava as linhas de resultado no banco de resultados (SQLite) e gera a planilha Excel de uma só vez.
+
+    Cada linha é gravada no banco assim que chega, de modo que uma queda do robô não perde o que
+    já foi processado. O arquivo .xlsx é reescrito apenas nos checkpoints (a cada
+    `intervalo_checkpoint` linhas) e no fechamento, em uma única passagem write-only gravada em
+    arquivo temporário e depois substituída de forma atômica.
+
+    Com `coluna_chave`, apenas a última linha de cada chave vai para a planilha (útil quando um
+    item que falhou é reprocessado ao retomar a execução).
+
+    Com `coluna_instrumento`, cada linha também é registrada como observação do instrumento
+    (histórico, cadastro e notificações no banco), identificada pelo nome do `robo`.
+    """
+
+    def __init__(self, caminho_planilha, colunas=None, titulo_aba="Resultados", intervalo_checkpoint=50,
+                 coluna_chave=None, coluna_instrumento=None, robo=None, banco=None):
+        self.caminho_planilha = caminho_planilha
+        self.relatorio = os.path.normpath(caminho_planilha)
+        self.colunas = list(colunas) if colunas else None
+        self.titulo_aba = titulo_aba
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self.coluna_chave = coluna_chave
+        self.coluna_instrumento = coluna_instrumento
+        self.robo = robo or os.path.splitext(os.path.basename(caminho_planilha))[0]
+        self.linhas_desde_checkpoint = 0
+        self.banco_proprio = banco is None
+        self.banco = banco or BancoResultados()
+
+        diretorio = os.path.dirname(caminho_planilha)
+        if diretorio and not os.path.exists(diretorio):
+            os.makedirs(diretorio)
+            print(f"[INFO] Diretório criado: {diretorio}")
+
+        # Resultados gravados antes da existência do banco: preserva as linhas já gravadas
+        if self.banco.relatorio_vazio(self.relatorio):
+            caminho_diario = os.path.splitext(caminho_planilha)[0] + ".diario.jsonl"
+            if os.path.exists(caminho_diario):
+                self._importar_diario(caminho_diario)
+            elif os.path.exists(caminho_planilha):
+                self._importar_planilha_existente()
+
+    def _importar_diario(self, caminho_diario):
+        """Copia para o banco as linhas do diário JSON Lines usado pelas versões anteriores."""
+        linhas = []
+        with open(caminho_diario, encoding="utf-8") as diario:
+            for texto in diario:
+                try:
+                    linhas.append(json.loads(texto))
+                except json.JSONDecodeError:
+                    continue
+        self.banco.adicionar_linhas(self.relatorio, linhas)
+        os.replace(caminho_diario, caminho_diario + ".importado")
+        print(f"[INFO] {len(linhas)} linhas do diário '{caminho_diario}' importadas para o banco de resultados.")
+
+    def _importar_planilha_existente(self):
+        """Copia para o banco as linhas de uma planilha de resultados já existente."""
+        try:
+            workbook = load_workbook(self.caminho_planilha, read_only=True)
+            linhas = [list(linha) for linha in workbook.active.iter_rows(min_row=2, values_only=True)]
+            workbook.close()
+            self.banco.adicionar_linhas(self.relatorio, linhas)
+            print(f"[INFO] Linhas existentes de '{self.caminho_planilha}' importadas para o banco de resultados.")
+        except Exception as e:
+            print(f"[ERRO] Não foi possível importar a planilha existente '{self.caminho_planilha}': {e}")
+
+    def registrar(self, linha, observacao=True):
+        """
+        Grava uma linha (lista ou dicionário) no banco e gera a planilha ao atingir o checkpoint.
+        Com `observacao=False` (linha montada a partir de valores já guardados), o histórico do
+        instrumento não é atualizado.
+        """
+        with etapa("gravar_linha"):
+            self.banco.adicionar_linha(self.relatorio, linha)
+
+            if self.coluna_instrumento and observacao:
+                dados = linha if isinstance(linha, dict) else dict(zip(self.colunas or [], linha))
+                if dados.get(self.coluna_instrumento):
+                    self.banco.registrar_observacao(self.robo, dados[self.coluna_instrumento], dados)
+
+        self.linhas_desde_checkpoint += 1
+        if self.linhas_desde_checkpoint >= self.intervalo_checkpoint:
+            self.exportar()
+
+    def ler_linhas(self):
+        """Lê as linhas do relatório gravadas no banco, na ordem de chegada."""
+        return self.banco.linhas(self.relatorio)
+
+    def _definir_colunas(self, linhas):
+        """Usa as colunas informadas ou, para linhas em dicionário, a união das chaves na ordem de chegada."""
+        if self.colunas:
+            return self.colunas
+        colunas = []
+        for linha in linhas:
+            if isinstance(linha, dict):
+                colunas.extend(chave for chave in linha if chave not in colunas)
+        return colunas
+
+    def _manter_ultima_por_chave(self, linhas, colunas):
+        """Mantém apenas a última ocorrência de cada chave, na posição da primeira ocorrência."""
+        indice_chave = colunas.index(self.coluna_chave) if self.coluna_chave in colunas else None
+        por_chave = {}
+        for linha in linhas:
+            if isinstance(linha, dict):
+                chave = linha.get(self.coluna_chave)
+            else:
+                chave = linha[indice_chave] if indice_chave is not None and indice_chave < len(linha) else None
+            por_chave[str(chave)] = linha
+        return list(por_chave.values())
+
+    def exportar(self):
+        """Reescreve a planilha Excel a partir do banco em uma única passagem write-only."""
+        with etapa("exportar_planilha") as atual:
+            if not self._exportar():
+                atual.resultado = "falha"
+
+    def _exportar(self):
+        linhas = self.ler_linhas()
+        colunas = self._definir_colunas(linhas)
+        if self.coluna_chave:
+            linhas = self._manter_ultima_por_chave(linhas, colunas)
+        caminho_temporario = self.caminho_planilha + ".tmp"
+
+        try:
+            workbook = Workbook(write_only=True)
+            aba = workbook.create_sheet(self.titulo_aba)
+            aba.append(colunas)
+            for linha in linhas:
+                if isinstance(linha, dict):
+                    aba.append([linha.get(coluna) for coluna in colunas])
+                else:
+                    aba.append(linha)
+            workbook.save(caminho_temporario)
+            os.replace(caminho_temporario, self.caminho_planilha)
+            self.linhas_desde_checkpoint = 0
+            print(f"[INFO] Planilha '{self.caminho_planilha}' gerada com {len(linhas)} linhas.")
+            return True
+        except Exception as e:
+            print(f"[ERRO] Falha ao gerar a planilha '{self.caminho_planilha}' (os dados continuam no banco): {e}")
+            return False
+
+    def limpar(self):
+        """Remove as linhas do relatório e a planilha para iniciar uma execução do zero."""
+        self.banco.limpar_relatorio(self.relatorio)
+        if os.path.exists(self.caminho_planilha):
+            os.remove(self.caminho_planilha)
+        self.linhas_desde_checkpoint = 0
+
+    def fechar(self):
+        """Gera a planilha final, caso haja linhas ainda não exportadas, e fecha o banco aberto pelo gravador."""
+        if self.linhas_desde_checkpoint or not os.path.exists(self.caminho_planilha):
+            self.exportar()
+        if self.banco_proprio:
+            self.banco.fechar()
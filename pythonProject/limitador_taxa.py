@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from rastreamento import etapa
+
+
+# Banco compartilhado pelo limitador: todos os robôs e navegadores da máquina dividem o mesmo ritmo
+CAMINHO_BANCO_LIMITADOR = os.environ.get(
+    "CAMINHO_BANCO_LIMITADOR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "limitador_portal.db"),
+)
+# Desligado por padrão, como os demais modos novos; LIMITADOR_ATIVO=1 liga (útil com vários robôs
+# ou navegadores ao mesmo tempo: 2 passos/s no início, adaptando-se ao portal)
+LIMITADOR_ATIVO = os.environ.get("LIMITADOR_ATIVO", "0") == "1"
+
+# Passos de navegação por segundo (somando todos os navegadores) e limites da adaptação
+TAXA_INICIAL = float(os.environ.get("TAXA_INICIAL", "2"))
+TAXA_MINIMA = float(os.environ.get("TAXA_MINIMA", "0.2"))
+TAXA_MAXIMA = float(os.environ.get("TAXA_MAXIMA", "20"))
+# Quantos passos podem sair de uma vez depois de um período ocioso
+CAPACIDADE_RAJADA = float(os.environ.get("CAPACIDADE_RAJADA", "5"))
+# Latência (s) acima da qual o portal é considerado sobrecarregado
+LATENCIA_ALVO = float(os.environ.get("LATENCIA_ALVO", "3"))
+# AIMD: cada segundo de tráfego sem problemas soma INCREMENTO_TAXA; cada sinal de sobrecarga multiplica por FATOR_REDUCAO
+INCREMENTO_TAXA = float(os.environ.get("INCREMENTO_TAXA", "0.1"))
+FATOR_REDUCAO = float(os.environ.get("FATOR_REDUCAO", "0.5"))
+# Peso da última medição na média móvel de latência
+PESO_LATENCIA = 0.2
+
+
+class LimitadorAdaptativo:
+    """
+    Balde de fichas compartilhado (SQLite) com taxa ajustada por AIMD.
+
+    Cada passo de navegação consome uma ficha antes de ir ao portal. A taxa de reposição sobe
+    devagar enquanto os passos terminam bem e abaixo da latência alvo, e cai pela metade quando
+    um passo falha ou a média de latência passa do alvo. A redução é aplicada no máximo uma vez
+    por intervalo de latência alvo, para que uma rajada de falhas simultâneas (um mesmo episódio
+    de lentidão) não derrube a taxa até o mínimo.
+
+    O estado fica em um banco SQLite para ser dividido entre processos: o pool de navegadores e
+    robôs diferentes rodando ao mesmo tempo disputam as mesmas fichas. Cada processo mantém uma
+    única conexão com o banco, aberta no primeiro uso.
+    """
+
+    def __init__(self, nome="portal", caminho_banco=CAMINHO_BANCO_LIMITADOR):
+        self.nome = nome
+        self.caminho_banco = caminho_banco
+        self._conexao = None
+        self._pid_conexao = None
+        self._trava = threading.Lock()
+        with self._conectar() as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS limitadores (
+                    nome TEXT PRIMARY KEY,
+                    taxa REAL NOT NULL,
+                    fichas REAL NOT NULL,
+                    atualizado_em REAL NOT NULL,
+                    latencia_media REAL NOT NULL,
+                    ultima_reducao REAL NOT NULL
+                )
+            """)
+            conexao.execute(
+                "INSERT OR IGNORE INTO limitadores VALUES (?, ?, ?, ?, ?, ?)",
+                (nome, TAXA_INICIAL, CAPACIDADE_RAJADA, time.time(), 0.0, 0.0),
+            )
+
+    @contextmanager
+    def _conectar(self):
+        """
+        Entrega a conexão do processo atual, uma thread por vez. Um worker do pool criado por fork
+        não reaproveita a conexão herdada do processo principal: abre a sua.
+        """
+        with self._trava:
+            if self._conexao is None or self._pid_conexao != os.getpid():
+                self._conexao = sqlite3.connect(
+                    self.caminho_banco, timeout=30, isolation_level=None, check_same_thread=False
+                )
+                self._conexao.execute("PRAGMA journal_mode=WAL")
+                self._pid_conexao = os.getpid()
+            try:
+                yield self._conexao
+            except Exception:
+                # A conexão é reaproveitada: não deixa uma transação aberta por uma falha no meio
+                if self._conexao.in_transaction:
+                    self._conexao.rollback()
+                raise
+
+    def adquirir(self):
+        """Espera até haver uma ficha disponível e a consome."""
+        # O tempo parado aqui aparece no relatório de desempenho como "aguardar_limitador"
+        with etapa("aguardar_limitador") as atual:
+            while True:
+                with self._conectar() as conexao:
+                    conexao.execute("BEGIN IMMEDIATE")
+                    taxa, fichas, atualizado_em = conexao.execute(
+                        "SELECT taxa, fichas, atualizado_em FROM limitadores WHERE nome = ?", (self.nome,)
+                    ).fetchone()
+                    agora = time.time()
+                    fichas = min(CAPACIDADE_RAJADA, fichas + max(0.0, agora - atualizado_em) * taxa)
+                    if fichas >= 1:
+                        fichas -= 1
+                        espera = 0.0
+                    else:
+                        espera = (1 - fichas) / taxa
+                    conexao.execute(
+                        "UPDATE limitadores SET fichas = ?, atualizado_em = ? WHERE nome = ?", (fichas, agora, self.nome)
+                    )
+                    conexao.execute("COMMIT")
+                if not espera:
+                    return
+                atual.tentativas += 1
+                time.sleep(espera)
+
+    def registrar(self, latencia, sucesso):
+        """Ajusta a taxa a partir da latência e do resultado de um passo."""
+        with self._conectar() as conexao:
+            conexao.execute("BEGIN IMMEDIATE")
+            taxa, latencia_media, ultima_reducao = conexao.execute(
+                "SELECT taxa, latencia_media, ultima_reducao FROM limitadores WHERE nome = ?", (self.nome,)
+            ).fetchone()
+            agora = time.time()
+            latencia_media = latencia if not latencia_media else (
+                PESO_LATENCIA * latencia + (1 - PESO_LATENCIA) * latencia_media
+            )
+
+            if not sucesso or latencia_media > LATENCIA_ALVO:
+                if agora - ultima_reducao >= LATENCIA_ALVO:
+                    taxa = max(TAXA_MINIMA, taxa * FATOR_REDUCAO)
+                    ultima_reducao = agora
+                    print(f"[INFO] Portal lento ou com falhas (latência média {latencia_media:.1f}s): "
+                          f"ritmo reduzido para {taxa:.2f} passos/s.")
+            else:
+                taxa = min(TAXA_MAXIMA, taxa + INCREMENTO_TAXA / taxa)
+
+            conexao.execute(
+                "UPDATE limitadores SET taxa = ?, latencia_media = ?, ultima_reducao = ? WHERE nome = ?",
+                (taxa, latencia_media, ultima_reducao, self.nome),
+            )
+            conexao.execute("COMMIT")
+
+    @contextmanager
+    def passo(self):
+        """Executa um passo de navegação dentro do limite, medindo a latência e o resultado."""
+        self.adquirir()
+        inicio = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.registrar(time.monotonic() - inicio, sucesso=False)
+            raise
+        self.registrar(time.monotonic() - inicio, sucesso=True)
+
+
+_limitador_portal = None
+
+
+@contextmanager
+def passo_navegacao():
+    """
+    Envolve um passo de navegação no portal (espera + clique) com o limitador compartilhado.
+
+    Só atua com LIMITADOR_ATIVO=1.
+    """
+    global _limitador_portal
+    if not LIMITADOR_ATIVO:
+        yield
+        return
+    if _limitador_portal is None:
+        _limitador_portal = LimitadorAdaptativo()
+    with _limitador_portal.passo():
+        yield
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+
+from agenda_notificacoes import regras_por_modalidade
+
+
+FORMATO_DATA = "%d/%m/%Y"
+
+
+def como_data(valor):
+    """Converte datetime, date ou texto dd/mm/aaaa para date (None se não for uma data)."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    if isinstance(valor, str):
+        try:
+            return datetime.strptime(valor.strip(), FORMATO_DATA).date()
+        except ValueError:
+            return None
+    return None
+
+
+def formatar_data(valor, padrao=None):
+    """Formata uma data como dd/mm/aaaa para os relatórios; valores vazios viram `padrao`."""
+    if isinstance(valor, date):
+        return valor.strftime(FORMATO_DATA)
+    return padrao if valor is None else valor
+
+
+class Instrumento:
+    """
+    Registro compacto de um instrumento ao longo do processamento.
+
+    As datas são guardadas como `date` e só são formatadas na exportação (ver `formatar_data`),
+    evitando converter texto ↔ data a cada etapa. `__slots__` mantém os registros leves quando
+    milhares deles circulam entre o controle, o portal e os relatórios (e entre processos do pool).
+    """
+
+    __slots__ = (
+        "numero",
+        "tecnico",
+        "email_tecnico",
+        "data_termino",
+        "modalidade",
+        "notificacoes",
+        "data_ultimo_anexo",
+    )
+
+    def __init__(self, numero, tecnico=None, email_tecnico=None, data_termino=None, modalidade=None,
+                 notificacoes=(), data_ultimo_anexo=None):
+        self.numero = numero
+        self.tecnico = tecnico
+        self.email_tecnico = email_tecnico
+        self.data_termino = como_data(data_termino)
+        self.modalidade = modalidade
+        self.notificacoes = tuple(notificacoes)
+        self.data_ultimo_anexo = como_data(data_ultimo_anexo)
+
+    def __repr__(self):
+        campos = ", ".join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"Instrumento({campos})"
+
+    def __eq__(self, outro):
+        if not isinstance(outro, Instrumento):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(outro, campo) for campo in self.__slots__)
+
+    def calcular_notificacoes(self):
+        """
+        Calcula as datas de notificação pela tabela de regras (ver agenda_notificacoes.py).
+        Sem término ou com modalidade sem regra, o registro fica sem notificações.
+        """
+        dias_antecedencia = regras_por_modalidade().get(self.modalidade)
+        if self.data_termino and dias_antecedencia:
+            self.notificacoes = tuple(self.data_termino - timedelta(days=dias) for dias in dias_antecedencia)
+        else:
+            self.notificacoes = ()
+        return self.notificacoes
+
+    def notificacao(self, ordem, padrao=None):
+        """Data da notificação de ordem `ordem` (1, 2, ...) já formatada, ou `padrao` se não houver."""
+        if ordem <= len(self.notificacoes):
+            return formatar_data(self.notificacoes[ordem - 1])
+        return padrao
+
+
+def instrumentos_do_controle(controle):
+    """Cria os registros a partir das colunas "Instrumento nº", "Técnico" e "e-mail do Técnico" do controle."""
+    return [
+        Instrumento(numero, tecnico, email_tecnico)
+        for numero, tecnico, email_tecnico in zip(
+            controle["Instrumento nº"].tolist(),
+            controle["Técnico"].tolist(),
+            controle["e-mail do Técnico"].tolist(),
+        )
+    ]
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import queue
+import threading
+
+import aiohttp
+from lxml import html
+
+from arquivo_paginas import ARQUIVAR_PAGINAS, arquivar_pagina
+from navegacao import guardar_link_instrumento, links_gravados
+from sessao_http import TEMPO_LIMITE_HTTP, dados_formulario_consulta, link_detalhe_da_pesquisa, pagina_do_instrumento
+
+
+# Máximo de requisições em andamento ao mesmo tempo e, dentre elas, por servidor
+LIMITE_REQUISICOES = int(os.environ.get("LIMITE_REQUISICOES", "16"))
+LIMITE_POR_HOST = int(os.environ.get("LIMITE_POR_HOST", "8"))
+
+
+async def buscar_pagina_async(sessao, url, metodo="get", dados=None):
+    """Versão assíncrona de `buscar_pagina`: devolve (árvore lxml, URL final), ou (None, None) em caso de falha."""
+    try:
+        if metodo == "post":
+            requisicao = sessao.post(url, data=dados)
+        else:
+            requisicao = sessao.get(url, params=dados)
+        async with requisicao as resposta:
+            resposta.raise_for_status()
+            conteudo = await resposta.read()
+            return html.fromstring(conteudo), str(resposta.url)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        print(f"[ERRO] Falha na requisição HTTP para {url}: {e}")
+        return None, None
+
+
+async def abrir_pagina_async(sessao, numero_instrumento, url, tipo="detalhe", formulario=None):
+    """
+    Busca a página do instrumento pelo link gravado no índice (`url`, lido antes do laço). Para a
+    página de detalhes sem link gravado, envia o formulário de consulta e grava o link encontrado.
+    As gravações em SQLite (índice de links e arquivo de páginas) rodam em threads, fora do laço.
+
+    Returns:
+        lxml.html.HtmlElement | None: a árvore da página, ou None se for preciso recorrer ao navegador.
+    """
+    if not url and tipo == "detalhe" and formulario and formulario.get("campo_numero"):
+        dados = dados_formulario_consulta(formulario, numero_instrumento)
+        arvore, url_final = await buscar_pagina_async(sessao, formulario["acao"], formulario["metodo"], dados)
+        url = link_detalhe_da_pesquisa(arvore, url_final)
+        if url:
+            await asyncio.to_thread(guardar_link_instrumento, numero_instrumento, url)
+    if not url:
+        return None
+
+    arvore, url_final = await buscar_pagina_async(sessao, url)
+    if not pagina_do_instrumento(arvore, numero_instrumento, tipo):
+        return None
+    if ARQUIVAR_PAGINAS:
+        await asyncio.to_thread(arquivar_pagina, numero_instrumento, tipo, arvore, url_final)
+    return arvore
+
+
+async def _processar_item(sessao, semaforo, indice, item, obter_numero, extrair_linha, tipo, formulario, links):
+    """Baixa a página de um item (respeitando o limite de requisições) e monta a sua linha."""
+    numero_instrumento = obter_numero(item)
+    try:
+        async with semaforo:
+            arvore = await abrir_pagina_async(
+                sessao, numero_instrumento, links.get(str(numero_instrumento)), tipo, formulario
+            )
+        return indice, (extrair_linha(item, arvore) if arvore is not None else None)
+    except Exception as e:
+        print(f"[ERRO] Falha ao consultar o instrumento {numero_instrumento}: {e}")
+        return indice, None
+
+
+async def _coletar(itens, obter_numero, extrair_linha, tipo, formulario, cookies, user_agent, fila):
+    """Consulta todos os itens em uma única sessão aiohttp e entrega cada resultado na fila assim que fica pronto."""
+    # Links de todos os itens em uma consulta só, em vez de uma consulta SQLite bloqueante por item
+    links = await asyncio.to_thread(links_gravados, tipo)
+    conector = aiohttp.TCPConnector(limit=LIMITE_REQUISICOES, limit_per_host=LIMITE_POR_HOST)
+    semaforo = asyncio.Semaphore(LIMITE_REQUISICOES)
+    async with aiohttp.ClientSession(
+        connector=conector,
+        cookies=cookies,
+        headers={"User-Agent": user_agent} if user_agent else None,
+        timeout=aiohttp.ClientTimeout(total=TEMPO_LIMITE_HTTP),
+    ) as sessao:
+        tarefas = [
+            _processar_item(sessao, semaforo, indice, item, obter_numero, extrair_linha, tipo, formulario, links)
+            for indice, item in enumerate(itens)
+        ]
+        for tarefa in asyncio.as_completed(tarefas):
+            fila.put(await tarefa)
+
+
+def executar_assincrono(driver, itens, obter_numero, extrair_linha, funcao_navegador, tipo="detalhe",
+                        formulario=None):
+    """
+    Consulta as páginas dos itens de forma concorrente, reaproveitando a sessão autenticada do navegador.
+
+    As requisições rodam em um laço asyncio em segundo plano, com no máximo LIMITE_REQUISICOES em
+    andamento (LIMITE_POR_HOST por servidor) sobre um único pool de conexões. Cada resultado é
+    devolvido assim que fica pronto; os itens cuja página não pôde ser lida por HTTP são
+    processados depois, um a um, por `funcao_navegador(driver, item)`. Sem navegador (driver=None,
+    ex.: no benchmark contra o portal simulado), a consulta é feita sem cookies e esses itens
+    voltam com linha None.
+
+    Args:
+        obter_numero: função que devolve o número do instrumento de um item.
+        extrair_linha: função `(item, árvore lxml)` que devolve a linha do relatório ou None.
+        tipo: página consultada ("detalhe" ou "anexos", conforme o índice de links).
+
+    Yields:
+        tuple: (item, linha) para cada item da lista; linha é None quando o processamento falhou.
+    """
+    fila = queue.Queue()
+    cookies = {cookie["name"]: cookie["value"] for cookie in driver.get_cookies()} if driver else {}
+    user_agent = driver.execute_script("return navigator.userAgent") if driver else None
+
+    def rodar_laco():
+        try:
+            asyncio.run(_coletar(itens, obter_numero, extrair_linha, tipo, formulario, cookies, user_agent, fila))
+        except Exception as e:
+            print(f"[ERRO] Motor assíncrono interrompido: {e}")
+        finally:
+            fila.put(None)
+
+    threading.Thread(target=rodar_laco, daemon=True).start()
+
+    recebidos = set()
+    pendentes = []
+    while True:
+        resultado = fila.get()
+        if resultado is None:
+            break
+        indice, linha = resultado
+        recebidos.add(indice)
+        if linha is None:
+            pendentes.append(indice)
+        else:
+            yield itens[indice], linha
+
+    # Itens sem resultado por HTTP (ou não alcançados, se o laço foi interrompido) vão para o navegador
+    pendentes.extend(indice for indice in range(len(itens)) if indice not in recebidos)
+    if pendentes and driver:
+        print(f"[INFO] {len(pendentes)} itens serão consultados pelo navegador.")
+    for indice in sorted(pendentes):
+        yield itens[indice], funcao_navegador(driver, itens[indice]) if driver else None
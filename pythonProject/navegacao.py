@@ -0,0 +1,233 @@
+import os
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from arquivo_paginas import arquivar_pagina_navegador
+from espera_pagina import aguardar_pagina_pronta, raiz_documento
+from limitador_taxa import passo_navegacao
+from rastreamento import etapa
+from saude_sessao import monitor_sessao
+
+
+XPATH_CAMPO_PESQUISA = '//*[@id="consultarNumeroConvenio"]'
+
+# Define o valor do campo e dispara os eventos que o formulário escuta, sem usar a área de transferência
+SCRIPT_PREENCHER_CAMPO = """
+const campo = arguments[0];
+campo.focus();
+campo.value = arguments[1];
+campo.dispatchEvent(new Event('input', {bubbles: true}));
+campo.dispatchEvent(new Event('change', {bubbles: true}));
+return campo.value;
+"""
+
+
+def preencher_numero_instrumento(driver, numero_instrumento, tempo_espera=10):
+    """
+    Preenche o campo 'consultarNumeroConvenio' com o número do instrumento diretamente no DOM.
+
+    Não usa pyperclip nem Ctrl+V: cada navegador recebe o valor pela própria sessão do WebDriver,
+    o que permite executar vários robôs ao mesmo tempo na mesma máquina.
+    """
+    numero_instrumento = str(numero_instrumento).strip()
+    campo = WebDriverWait(driver, tempo_espera).until(
+        EC.element_to_be_clickable((By.XPATH, XPATH_CAMPO_PESQUISA))
+    )
+    try:
+        valor = driver.execute_script(SCRIPT_PREENCHER_CAMPO, campo, numero_instrumento)
+    except WebDriverException:
+        valor = None
+
+    # Se o script não conseguiu definir o valor, digita o número pelo WebDriver
+    if valor != numero_instrumento:
+        campo.clear()
+        campo.send_keys(numero_instrumento)
+    print(f"Número do instrumento preenchido no campo de pesquisa: {numero_instrumento}")
+    return campo
+
+
+# Índice persistente com os links das páginas de cada instrumento ("detalhe", "anexos", ...)
+CAMINHO_INDICE_LINKS = os.environ.get(
+    "CAMINHO_INDICE_LINKS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "links_instrumentos.db"),
+)
+XPATH_DETALHE_INSTRUMENTO = '//*[@id="instrumentoId"]/a'
+XPATH_MARCADOR_DETALHE = '//*[@id="tr-alterarTerminoVigencia"]'
+XPATH_LOGO = '//*[@id="logo"]/a'
+# Item do menu de consulta usado pela maioria dos robôs (AjustePT consulta pelo item 5)
+ITEM_MENU_CONSULTA = 6
+
+
+def tipo_link_detalhe(item_menu=ITEM_MENU_CONSULTA):
+    """
+    Tipo da página de detalhes no índice de links: cada tela de consulta abre o instrumento em um
+    contexto próprio, então o link de uma não serve para a outra.
+    """
+    return "detalhe" if item_menu == ITEM_MENU_CONSULTA else f"detalhe_menu_{item_menu}"
+
+
+def _conectar_indice_links():
+    """Abre o índice de links (SQLite), criando a tabela na primeira utilização."""
+    conexao = sqlite3.connect(CAMINHO_INDICE_LINKS, timeout=30)
+    conexao.execute("""
+        CREATE TABLE IF NOT EXISTS links_paginas (
+            instrumento TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            url TEXT NOT NULL,
+            atualizado_em TEXT NOT NULL,
+            PRIMARY KEY (instrumento, tipo)
+        )
+    """)
+    return conexao
+
+
+def obter_link_instrumento(numero_instrumento, tipo="detalhe"):
+    """Devolve o link gravado para a página do instrumento, ou None."""
+    with closing(_conectar_indice_links()) as conexao:
+        linha = conexao.execute(
+            "SELECT url FROM links_paginas WHERE instrumento = ? AND tipo = ?", (str(numero_instrumento), tipo)
+        ).fetchone()
+    return linha[0] if linha else None
+
+
+def links_gravados(tipo="detalhe"):
+    """Devolve, em uma única consulta, os links gravados de um tipo de página: {número do instrumento: url}."""
+    with closing(_conectar_indice_links()) as conexao:
+        return dict(conexao.execute("SELECT instrumento, url FROM links_paginas WHERE tipo = ?", (tipo,)))
+
+
+def link_identifica_instrumento(url, numero_instrumento):
+    """
+    Indica se a URL aponta para um instrumento específico: o número ou um id (ex.: id, idConvenio,
+    convenioId) nos parâmetros. Sem isso, a página aberta depende do estado da sessão, e o link não
+    serve para consultas diretas.
+    """
+    for chave, valores in parse_qs(urlsplit(url).query).items():
+        if str(numero_instrumento) in valores or re.fullmatch(r"(?i:id)\w*|\w+Id", chave):
+            return True
+    return False
+
+
+def guardar_link_instrumento(numero_instrumento, url, tipo="detalhe"):
+    """Grava (ou atualiza) o link de uma página do instrumento."""
+    with closing(_conectar_indice_links()) as conexao:
+        conexao.execute(
+            "INSERT OR REPLACE INTO links_paginas (instrumento, tipo, url, atualizado_em) VALUES (?, ?, ?, ?)",
+            (str(numero_instrumento), tipo, url, datetime.now().isoformat(timespec="seconds")),
+        )
+        conexao.commit()
+
+
+def remover_link_instrumento(numero_instrumento, tipo="detalhe"):
+    """Remove do índice um link que deixou de funcionar."""
+    with closing(_conectar_indice_links()) as conexao:
+        conexao.execute(
+            "DELETE FROM links_paginas WHERE instrumento = ? AND tipo = ?", (str(numero_instrumento), tipo)
+        )
+        conexao.commit()
+
+
+def _clicar(driver, xpath, tempo_espera=10):
+    """Espera o elemento ficar clicável e clica; propaga TimeoutException se ele não aparecer."""
+    monitor = monitor_sessao(driver)
+    monitor.garantir_ativa()  # Sessão perdida: falha na hora, sem esperar o elemento
+    try:
+        with passo_navegacao():
+            elemento = WebDriverWait(driver, tempo_espera).until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            elemento.click()
+    except TimeoutException:
+        monitor.registrar_timeout()
+        raise
+    monitor.registrar_sucesso()
+    return elemento
+
+
+def voltar_pagina_inicial(driver, tempo_espera=10):
+    """Clica no logo e espera a página inicial substituir a atual e terminar de carregar."""
+    try:
+        pagina_anterior = raiz_documento(driver)
+        _clicar(driver, XPATH_LOGO, tempo_espera)
+        aguardar_pagina_pronta(driver, elemento_anterior=pagina_anterior, tempo_espera=tempo_espera)
+    except (TimeoutException, WebDriverException) as e:
+        print(f"Erro ao retornar à página inicial: {e}")
+
+
+def abrir_tela_consulta(driver, item_menu=ITEM_MENU_CONSULTA):
+    """Abre, pelo menu principal, a tela de consulta de instrumentos."""
+    _clicar(driver, '//*[@id="menuPrincipal"]/div[1]/div[4]')
+    _clicar(driver, f'//*[@id="contentMenu"]/div[1]/ul/li[{item_menu}]/a')
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, XPATH_CAMPO_PESQUISA)))
+
+
+def pesquisar_instrumento(driver, numero_instrumento, item_menu=ITEM_MENU_CONSULTA):
+    """
+    Abre a página de detalhes do instrumento pelo menu de consulta (menu → pesquisa → resultado).
+
+    Returns:
+        str: O link da página de detalhes (href do resultado ou, se ele não for navegável, a URL aberta).
+    """
+    abrir_tela_consulta(driver, item_menu)
+    preencher_numero_instrumento(driver, numero_instrumento)
+    _clicar(driver, '//*[@id="form_submit"]')
+
+    link = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, XPATH_DETALHE_INSTRUMENTO)))
+    href = link.get_attribute("href") or ""
+    link.click()
+    # Só segue (e lê a URL) depois que os resultados da pesquisa deram lugar à página de detalhes
+    aguardar_pagina_pronta(driver, XPATH_MARCADOR_DETALHE, elemento_anterior=link)
+    return href if href.startswith("http") else driver.current_url
+
+
+def detalhe_instrumento_carregado(driver, numero_instrumento, tempo_espera=5):
+    """Confere se a página aberta é a página de detalhes do instrumento informado."""
+    try:
+        WebDriverWait(driver, tempo_espera).until(
+            EC.presence_of_element_located((By.XPATH, XPATH_MARCADOR_DETALHE))
+        )
+    except TimeoutException:
+        return False
+    return str(numero_instrumento) in driver.page_source
+
+
+def abrir_detalhe_instrumento(driver, numero_instrumento, item_menu=ITEM_MENU_CONSULTA):
+    """
+    Abre a página de detalhes do instrumento, usando o link gravado em execuções anteriores.
+
+    Com o link no índice, basta um `driver.get`. Se o link não existir ou estiver vencido
+    (sessão expirada, página diferente), faz a pesquisa pelo menu e grava o novo link.
+    Os links são gravados por tela de consulta (`item_menu`, ver tipo_link_detalhe).
+    Antes, confere a sessão (ver saude_sessao.py): com a sessão perdida, falha na hora.
+    Levanta TimeoutException se a página de detalhes do instrumento não carregar.
+    """
+    monitor_sessao(driver).verificar()
+    tipo = tipo_link_detalhe(item_menu)
+    with etapa("abrir_detalhe_instrumento", seletor="link gravado") as atual:
+        url = obter_link_instrumento(numero_instrumento, tipo)
+        if url:
+            try:
+                driver.get(url)
+                if detalhe_instrumento_carregado(driver, numero_instrumento):
+                    print(f"Instrumento {numero_instrumento} aberto pelo link gravado.")
+                    arquivar_pagina_navegador(driver, numero_instrumento, "detalhe")
+                    return
+            except WebDriverException as e:
+                print(f"Erro ao abrir o link gravado do instrumento {numero_instrumento}: {e}")
+            print(f"Link gravado do instrumento {numero_instrumento} vencido. Pesquisando pelo menu...")
+            remover_link_instrumento(numero_instrumento, tipo)
+            atual.tentativas += 1
+
+        atual.seletor = "pesquisa pelo menu"
+        url = pesquisar_instrumento(driver, numero_instrumento, item_menu)
+        # Sempre espera a página de detalhes deste instrumento; o arquivamento só decide se ela é guardada.
+        # O link só vai para o índice depois dessa conferência.
+        if not detalhe_instrumento_carregado(driver, numero_instrumento):
+            raise TimeoutException(f"Página de detalhes do instrumento {numero_instrumento} não carregou.")
+        guardar_link_instrumento(numero_instrumento, url, tipo)
+        arquivar_pagina_navegador(driver, numero_instrumento, "detalhe")
@@ -0,0 +1,110 @@
+import atexit
+import os
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from utilitarios import servico_chromedriver
+
+
+# Como os robôs obtêm o navegador: "existente" (Chrome aberto pelo usuário na porta 9222) ou
+# "gerenciado" (Chrome iniciado pelo robô, sem janela, com o perfil já autenticado)
+MODO_NAVEGADOR = os.environ.get("MODO_NAVEGADOR", "existente")
+PORTA_NAVEGADOR_EXISTENTE = int(os.environ.get("PORTA_NAVEGADOR_EXISTENTE", "9222"))
+URL_INICIAL = os.environ.get("URL_INICIAL_NAVEGADORES", "https://portal.transferegov.sistema.gov.br/")
+# Perfil do Chrome gerenciado: autenticar uma vez com `python navegador_gerenciado.py`
+DIRETORIO_PERFIL_GERENCIADO = os.environ.get(
+    "DIRETORIO_PERFIL_GERENCIADO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfis_navegadores", "gerenciado"),
+)
+# Recursos que o Chrome gerenciado deixa de baixar (categorias de PADROES_RECURSOS, separadas por vírgula)
+RECURSOS_BLOQUEADOS = [
+    categoria.strip()
+    for categoria in os.environ.get("RECURSOS_BLOQUEADOS", "imagens,fontes,estilos,analiticos").split(",")
+    if categoria.strip()
+]
+
+PADROES_RECURSOS = {
+    "imagens": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.svg*", "*.ico*", "*.webp*", "*.bmp*"],
+    "fontes": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "estilos": ["*.css*"],
+    "analiticos": ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*"],
+}
+
+
+def navegador_gerenciado_ativo():
+    return MODO_NAVEGADOR == "gerenciado"
+
+
+def opcoes_navegador_gerenciado(diretorio_perfil, sem_janela=True):
+    """
+    Opções do Chrome iniciado pelo robô: perfil próprio (sessão do portal reaproveitada), sem
+    janela e com carregamento "eager" (o WebDriver devolve o controle quando o DOM está pronto,
+    sem esperar imagens e folhas de estilo).
+    """
+    opcoes = webdriver.ChromeOptions()
+    opcoes.add_argument(f"--user-data-dir={diretorio_perfil}")
+    opcoes.add_argument("--no-first-run")
+    opcoes.add_argument("--no-default-browser-check")
+    opcoes.add_argument("--window-size=1366,900")
+    if sem_janela:
+        opcoes.add_argument("--headless=new")
+    opcoes.page_load_strategy = "eager"
+    return opcoes
+
+
+def bloquear_recursos(driver, categorias=None):
+    """
+    Bloqueia, via CDP (Network.setBlockedURLs), o download dos recursos das categorias informadas
+    em todas as páginas abertas por este navegador. Navegadores sem CDP seguem sem bloqueio.
+    """
+    categorias = RECURSOS_BLOQUEADOS if categorias is None else categorias
+    padroes = [padrao for categoria in categorias for padrao in PADROES_RECURSOS.get(categoria, [])]
+    if not padroes:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+    except (AttributeError, WebDriverException) as e:
+        print(f"[INFO] Não foi possível bloquear recursos neste navegador: {e}")
+
+
+def _fechar_navegador(driver):
+    """Fecha o Chrome gerenciado na saída do processo (se o robô ainda não o fechou)."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def iniciar_navegador_gerenciado(diretorio_perfil=DIRETORIO_PERFIL_GERENCIADO, sem_janela=True, url=URL_INICIAL):
+    """
+    Inicia o Chrome gerenciado, bloqueia os recursos dispensáveis e abre a página inicial do portal.
+    Com janela (autenticação manual), nada é bloqueado.
+    """
+    os.makedirs(diretorio_perfil, exist_ok=True)
+    driver = webdriver.Chrome(service=servico_chromedriver(), options=opcoes_navegador_gerenciado(diretorio_perfil, sem_janela))
+    # O Chrome gerenciado pertence ao robô: é fechado ao final do processo
+    atexit.register(_fechar_navegador, driver)
+    if sem_janela:
+        bloquear_recursos(driver)
+    if url:
+        driver.get(url)
+    return driver
+
+
+def conectar_navegador(porta=PORTA_NAVEGADOR_EXISTENTE):
+    """
+    Devolve o navegador usado pelos robôs conforme MODO_NAVEGADOR: o Chrome gerenciado ou o Chrome
+    já aberto pelo usuário na porta de depuração. Propaga WebDriverException se não conseguir.
+    """
+    if navegador_gerenciado_ativo():
+        return iniciar_navegador_gerenciado()
+    options = webdriver.ChromeOptions()
+    options.debugger_address = f"localhost:{porta}"
+    return webdriver.Chrome(service=servico_chromedriver(), options=options)
+
+
+if __name__ == "__main__":
+    # Abre o perfil gerenciado com janela para autenticar no portal; os robôs reaproveitam a sessão
+    iniciar_navegador_gerenciado(sem_janela=False)
+    input("[INFO] Faça o login no portal e pressione Enter para salvar o perfil...")
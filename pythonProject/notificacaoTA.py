@@ -1,286 +1,382 @@
 import os
-import pyperclip
-from openpyxl.reader.excel import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.workbook import Workbook
-from selenium import webdriver
-from selenium.webdriver import Keys
+import sys
+from itertools import chain
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
-from openpyxl.styles import PatternFill
-import chromedriver_autoinstaller
-import time
+
+from agenda_notificacoes import calcular_agenda, salvar_agenda
+from arquivo_paginas import reprocessar_paginas
+from cache_instrumentos import MODO_INCREMENTAL, PRIORIZAR_URGENTES, CacheInstrumentos
+from escritor_segundo_plano import EscritorSegundoPlano
+from extracao_html import capturar_pagina
+from gravador_resultados import GravadorResultados
+from limitador_taxa import passo_navegacao
+from modelo_instrumento import Instrumento, formatar_data, instrumentos_do_controle
+from navegacao import abrir_detalhe_instrumento, voltar_pagina_inicial
+from navegador_gerenciado import conectar_navegador
+from planilha_controle import instrumentos_ativos
+from pool_navegadores import NUM_NAVEGADORES, executar_em_paralelo
+from rastreamento import emitir_relatorio, etapa, medir
+from registro_execucao import RegistroExecucao
+from saude_sessao import SessaoExpirada, monitor_sessao, processar_com_reinicio
+from sessao_http import (
+    MOTOR_COLETA,
+    abrir_detalhe_http,
+    atualizar_cookies,
+    capturar_formulario_consulta,
+    criar_sessao_http,
+    extrair_data_termino_html,
+    extrair_modalidade_html,
+)
 
 # Configuração inicial do ChromeDriver
 def conectar_navegador_existente():
     """Conecta ao navegador Chrome já aberto, utilizando a porta de depuração 9222."""
     try:
-        chromedriver_autoinstaller.install()
-        options = webdriver.ChromeOptions()
-        options.debugger_address = "localhost:9222"
-        driver = webdriver.Chrome(options=options)
-        return driver
+        return conectar_navegador()
     except Exception as e:
         print(f"Erro ao conectar ao navegador existente: {e}")
         return None
 
 
 def clicar_elemento(driver, xpath, tempo_espera=10):
-    """Espera e clica em um elemento identificado pelo XPath."""
+    """Espera e clica em um elemento identificado pelo XPath (falha na hora se a sessão já caiu)."""
+    monitor = monitor_sessao(driver)
+    monitor.garantir_ativa()
     try:
-        elemento = WebDriverWait(driver, tempo_espera).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
-        )
-        elemento.click()
+        with etapa("clicar_elemento", seletor=xpath), passo_navegacao():
+            elemento = WebDriverWait(driver, tempo_espera).until(
+                EC.element_to_be_clickable((By.XPATH, xpath))
+            )
+            elemento.click()
+        monitor.registrar_sucesso()
         print(f"Elemento clicado: {xpath}")
     except (TimeoutException, NoSuchElementException) as e:
         print(f"Erro ao encontrar ou clicar no elemento {xpath}: {e}")
+        monitor.registrar_timeout()
     except Exception as e:
         print(f"Erro inesperado: {e}")
 
 
 def coletar_dados_instrumentos_pandas(nome_arquivo, aba):
-    """Extrai dados usando pandas para garantir a leitura correta das colunas."""
+    """Extrai os instrumentos ativos da planilha de controle (leitura só das colunas usadas, com cache)."""
     try:
-        planilha = pd.read_excel(nome_arquivo, sheet_name=aba)
-        dados_filtrados = planilha[
-            (planilha["Status"] == "ATIVOS TODOS") &
-            (planilha["Instrumento nº"].notna()) &
-            (planilha["Técnico"].notna()) &
-            (planilha["e-mail do Técnico"].notna())
-        ][["Instrumento nº", "Técnico", "e-mail do Técnico"]]
-        dados_filtrados["e-mail do Técnico"].fillna("não encontrado", inplace=True)
-        dados_filtrados["Instrumento nº"] = dados_filtrados["Instrumento nº"].apply(lambda x: str(int(x)) if pd.notna(x) else "não encontrado")
-        dados_instrumentos = dados_filtrados.to_dict(orient="records")
+        dados_instrumentos = instrumentos_do_controle(instrumentos_ativos(nome_arquivo, aba))
         for item in dados_instrumentos:
-            print(f"Instrumento: {item['Instrumento nº']}, Técnico: {item['Técnico']}, E-mail: {item['e-mail do Técnico']}")
+            print(f"Instrumento: {item.numero}, Técnico: {item.tecnico}, E-mail: {item.email_tecnico}")
         return dados_instrumentos
     except Exception as e:
         print(f"Erro ao coletar dados do Excel com pandas: {e}")
         return []
 
 
-def extrair_data_termino(driver):
-    """Extrai a data de término de vigência usando o XPath."""
-    try:
-        xpath_data_termino = '//*[@id="tr-alterarTerminoVigencia"]/td[2]'
-        elemento_data = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.XPATH, xpath_data_termino))
-        )
-        data_texto = elemento_data.text.strip()
-        print(f"Data extraída: {data_texto}")
-        data_termino = datetime.strptime(data_texto, "%d/%m/%Y")
-        return data_termino
-    except Exception as e:
-        print(f"Erro ao extrair data de término: {e}")
-        return None
-
-
-
-def gerar_planilha_incremental(instrumento):
+# Planilha de saída e suas colunas
+CAMINHO_PLANILHA_SAIDA = r"C:/Temp/Instrumentos_Parcerias.xlsx"
+COLUNAS_PLANILHA_SAIDA = [
+    "Instrumento nº",
+    "Data de Término da Vigência",
+    "Notificação 1",
+    "Notificação 2",
+    "Técnico",
+    "Email do Técnico",
+    "Modalidade",
+]
+# Agenda recalculada a partir das linhas gravadas (sem consultar o portal)
+CAMINHO_AGENDA = r"C:/Temp/Agenda_Notificacoes.xlsx"
+# Planilha gerada ao reextrair as páginas de detalhes arquivadas (ver arquivo_paginas.py)
+CAMINHO_PLANILHA_REPROCESSADA = r"C:/Temp/Instrumentos_Parcerias_Reprocessado.xlsx"
+
+
+def gerar_planilha_incremental(gravador, instrumento, observacao=True):
     """
-    Atualiza ou cria uma planilha Excel contendo as informações do instrumento processado.
-    Adiciona colunas com as seguintes informações:
-    - Instrumento nº, Data de Término, Notificação 1, Notificação 2, Técnico, Email do Técnico
+    Registra no gravador de resultados as informações do instrumento processado.
+    A linha vai imediatamente para o banco de resultados; a planilha é gerada nos checkpoints e ao final.
+    Colunas: Instrumento nº, Data de Término, Notificação 1, Notificação 2, Técnico, Email do Técnico, Modalidade
+    As datas do registro são formatadas aqui, apenas na exportação.
     """
-    # Define o nome do arquivo Excel
-    nome_arquivo_excel = r"C:/Temp/Instrumentos_Parcerias.xlsx"
-
-    # Garante que o diretório existe; se não, cria o diretório
-    diretorio = os.path.dirname(nome_arquivo_excel)
-    if not os.path.exists(diretorio):
-        try:
-            os.makedirs(diretorio)
-            print(f"Diretório criado: {diretorio}")
-        except Exception as e:
-            print(f"Erro ao criar o diretório {diretorio}: {e}")
-            return
-
-    # Verifica se o arquivo já existe
-    if not os.path.exists(nome_arquivo_excel):
-        # Se o arquivo não existir, cria o arquivo com cabeçalhos
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Instrumentos"
-        # Adiciona cabeçalhos
-        sheet.append([
-            "Instrumento nº",
-            "Data de Término da Vigência",
-            "Notificação 1",
-            "Notificação 2",
-            "Técnico",
-            "Email do Técnico"
-        ])
-        workbook.save(nome_arquivo_excel)
-        print(f"Arquivo '{nome_arquivo_excel}' criado com cabeçalhos.")
-
-    # Carrega a planilha existente
-    workbook = load_workbook(nome_arquivo_excel)
-    sheet = workbook["Instrumentos"]
-
-    # Adiciona os dados do instrumento na próxima linha
     nova_linha = [
-        instrumento.get("Instrumento nº"),
-        instrumento.get("Data de Término"),
-        instrumento.get("Data de Notificação 1"),
-        instrumento.get("Data de Notificação 2"),
-        instrumento.get("Técnico"),
-        instrumento.get("Email do Técnico"),
+        instrumento.numero,
+        formatar_data(instrumento.data_termino),
+        instrumento.notificacao(1),
+        instrumento.notificacao(2),
+        instrumento.tecnico,
+        instrumento.email_tecnico,
+        instrumento.modalidade,
     ]
-    sheet.append(nova_linha)
+    gravador.registrar(nova_linha, observacao)
+    print(f"Instrumento adicionado ao arquivo '{gravador.caminho_planilha}': {nova_linha}")
 
-    # Salva a planilha
-    workbook.save(nome_arquivo_excel)
-    print(f"Instrumento adicionado ao arquivo '{nome_arquivo_excel}': {nova_linha}")
 
 
 
 
+def preencher_instrumento(instrumento, data_termino, modalidade):
+    """
+    Completa o registro do instrumento com término, modalidade e datas de notificação.
 
-def calcular_notificacoes(modalidade, data_termino):
+    Returns:
+        Instrumento | None: O próprio registro, ou None se as notificações não puderem ser calculadas.
     """
-    Calcula as datas de notificação com base na modalidade e na data de término.
+    instrumento.data_termino = data_termino.date() if isinstance(data_termino, datetime) else data_termino
+    instrumento.modalidade = modalidade
+    if len(instrumento.calcular_notificacoes()) != 2:
+        print(f"Erro ao calcular as notificações para o instrumento {instrumento.numero}.")
+        return None
+    return instrumento
 
-    Args:
-        modalidade (str): A modalidade do instrumento (Ex.: "Termo de Fomento", "Convênio").
-        data_termino (datetime): A data de término da vigência do instrumento.
+
+def gerar_agenda(gravador, caminho_saida=CAMINHO_AGENDA):
+    """
+    Recalcula em lote as notificações de todos os instrumentos já gravados e grava a agenda,
+    sinalizando os que têm notificação nos próximos dias. Não acessa o portal: basta rodar de
+    novo quando as regras mudarem.
+    """
+    linhas = [list(linha) for linha in gravador.ler_linhas() if isinstance(linha, list)]
+    if not linhas:
+        print("[INFO] Nenhum instrumento gravado para montar a agenda.")
+        return None
+    colunas = COLUNAS_PLANILHA_SAIDA
+    instrumentos = pd.DataFrame([(linha + [None] * len(colunas))[:len(colunas)] for linha in linhas], columns=colunas)
+    instrumentos = (
+        instrumentos.drop_duplicates("Instrumento nº", keep="last")
+        .drop(columns=["Notificação 1", "Notificação 2"])
+        .rename(columns={"Data de Término da Vigência": "Data de Término"})
+    )
+    agenda = calcular_agenda(instrumentos)
+    salvar_agenda(agenda, caminho_saida)
+    return agenda
+
+
+@medir("processar_instrumento", lambda driver, instrumento: instrumento.numero)
+def processar_instrumento(driver, instrumento):
+    """
+    Consulta um instrumento no portal e completa o seu registro com término e notificações.
 
     Returns:
-        list[datetime]: Uma lista com as datas de notificação calculadas.
+        Instrumento | None: O registro preenchido, ou None se o instrumento deve ser ignorado.
     """
+    numero_instrumento = instrumento.numero
+
+    if not isinstance(numero_instrumento, (int, str)):
+        print(f"Formato inesperado para o número do instrumento: {numero_instrumento}")
+        return None
+
     try:
-        if modalidade == "Termo de Fomento":
-            # Notificar com 60 e 45 dias antes do término
-            notificacoes = [
-                data_termino - timedelta(days=60),
-                data_termino - timedelta(days=45),
-            ]
-        elif modalidade == "Convênio":
-            # Notificar com 90 e 75 dias antes do término
-            notificacoes = [
-                data_termino - timedelta(days=90),
-                data_termino - timedelta(days=75),
-            ]
-        else:
-            print(f"Modalidade desconhecida: {modalidade}. Não será possível calcular as notificações.")
-            notificacoes = []
-
-        return notificacoes
+        # Navega para a página do instrumento (link gravado ou pesquisa pelo menu)
+        abrir_detalhe_instrumento(driver, numero_instrumento)
 
+        # Lê término e modalidade do HTML da página, com o mesmo extrator do caminho HTTP e do reprocessamento
+        preenchido = linha_da_pagina_detalhe(instrumento, capturar_pagina(driver))
+        if preenchido is None:
+            print(f"Data de término ou modalidade não encontrada para o instrumento {numero_instrumento}")
+
+        # Retorna à página inicial e segue assim que ela termina de carregar
+        voltar_pagina_inicial(driver)
+
+        return preenchido
+
+    except SessaoExpirada:
+        raise  # Tratada no laço principal, que reinicia o navegador
     except Exception as e:
-        print(f"Erro ao calcular notificações para modalidade '{modalidade}': {e}")
-        return []
+        print(f"Erro ao processar o instrumento {numero_instrumento}: {e}")
+        voltar_pagina_inicial(driver)  # Retorna à página inicial em caso de erro
+        return None
+
+
+def linha_da_pagina_detalhe(instrumento, arvore):
+    """Completa o registro a partir do HTML já baixado da página de detalhes, ou devolve None se faltarem dados."""
+    numero_instrumento = instrumento.numero
+    try:
+        data_termino = extrair_data_termino_html(arvore)
+        modalidade = extrair_modalidade_html(arvore)
+    except ValueError as e:
+        print(f"Erro ao interpretar a página do instrumento {numero_instrumento}: {e}")
+        return None
+    if not (data_termino and modalidade):
+        return None
+    print(f"Instrumento {numero_instrumento} lido do HTML: {data_termino:%d/%m/%Y}, {modalidade}")
+    return preencher_instrumento(instrumento, data_termino, modalidade)
+
 
+def registrar_resultado(gravador, registro, instrumento, preenchido, observacao=True):
+    """
+    Registra as informações na planilha (e, se lidas agora no portal, no histórico do instrumento,
+    que alimenta o modo incremental) e marca o instrumento no registro de execução.
+    """
+    if preenchido is None:
+        registro.marcar(instrumento.numero, concluido=False)
+        return
+    gerar_planilha_incremental(gravador, preenchido, observacao)
+    registro.marcar(preenchido.numero, concluido=True)
+    print(f"Dados registrados para o instrumento {preenchido.numero}.")
+
+
+def processar_instrumento_http(driver, sessao, formulario, instrumento):
+    """
+    Consulta o instrumento pelo caminho HTTP, reaproveitando a sessão autenticada do navegador.
+    Se a página exigir o navegador (JavaScript, sessão expirada, link vencido), recorre ao fluxo normal.
+    """
+    numero_instrumento = instrumento.numero
+    arvore = abrir_detalhe_http(sessao, numero_instrumento, formulario)
+    if arvore is not None:
+        preenchido = linha_da_pagina_detalhe(instrumento, arvore)
+        if preenchido is not None:
+            return preenchido
+
+    print(f"Instrumento {numero_instrumento}: consulta HTTP indisponível, usando o navegador.")
+    preenchido = processar_instrumento(driver, instrumento)
+    # O navegador pode ter renovado a sessão; leva os cookies novos para o cliente HTTP
+    atualizar_cookies(sessao, driver)
+    return preenchido
+
+
+def reprocessar_arquivo(execucao=None):
+    """
+    Reextrai término e modalidade das páginas de detalhes arquivadas, sem navegador nem portal,
+    e gera a planilha reprocessada. Técnico e e-mail vêm das últimas linhas do relatório normal.
+    """
+    gravador = GravadorResultados(
+        CAMINHO_PLANILHA_REPROCESSADA, COLUNAS_PLANILHA_SAIDA, "Instrumentos", robo="notificacaoTA_reprocessado"
+    )
+    gravador.limpar()
+    responsaveis = {
+        str(linha[0]): (linha[4], linha[5]) for linha in gravador.banco.linhas(os.path.normpath(CAMINHO_PLANILHA_SAIDA))
+    }
+
+    def extrair(numero_instrumento, arvore):
+        tecnico, email_tecnico = responsaveis.get(numero_instrumento, (None, None))
+        return linha_da_pagina_detalhe(Instrumento(numero_instrumento, tecnico, email_tecnico), arvore)
+
+    try:
+        reprocessar_paginas(
+            "detalhe", extrair, lambda preenchido: gerar_planilha_incremental(gravador, preenchido, False), execucao
+        )
+    finally:
+        gravador.fechar()
 
 
-def executar_processo():
+def executar_processo(num_navegadores=NUM_NAVEGADORES, motor=MOTOR_COLETA, incremental=MODO_INCREMENTAL,
+                      priorizar=PRIORIZAR_URGENTES):
     """
     Fluxo principal:
     - Verifica os instrumentos com base nas regras de notificação.
     - Cria e atualiza a planilha conforme os instrumentos são processados.
+    - Com num_navegadores > 1, distribui os instrumentos entre navegadores isolados
+      e grava os resultados na mesma planilha.
+    - Com motor="http", lê as páginas diretamente pela sessão do navegador e só usa o
+      navegador quando a página exige (nesse modo a consulta é feita em um único processo).
+    - Com motor="assincrono", mantém várias consultas HTTP em andamento ao mesmo tempo
+      (ver motor_assincrono.py) e deixa para o navegador apenas as que falharem.
+    - Instrumentos já concluídos na execução atual (registro de execução) são pulados,
+      de modo que uma execução interrompida é retomada de onde parou.
+    - Com incremental=True, só consulta no portal os instrumentos novos, com valores guardados
+      há mais de TTL_DIAS ou perto de uma notificação; os demais usam os últimos valores lidos.
+    - Com priorizar=True, os instrumentos com notificação ou término mais próximos (pelos últimos
+      valores lidos) são consultados primeiro, para que uma execução interrompida já tenha
+      atualizado os mais urgentes.
     """
-    driver = conectar_navegador_existente()
-    if driver:
-        # Coleta os dados dos instrumentos do Excel
-        try:
-            dados_instrumentos = coletar_dados_instrumentos_pandas(
-                r'C:/Users/d-deb/OneDrive/Documents/dev/robov1/CONTROLE DE PARCERIAS CGAP.xlsx', "PARCERIAS CGAP"
-            )
-            print("Dados dos instrumentos carregados:", dados_instrumentos)
+    # Coleta os dados dos instrumentos do Excel
+    try:
+        dados_instrumentos = coletar_dados_instrumentos_pandas(
+            r'C:/Users/d-deb/OneDrive/Documents/dev/robov1/CONTROLE DE PARCERIAS CGAP.xlsx', "PARCERIAS CGAP"
+        )
+        print("Dados dos instrumentos carregados:", dados_instrumentos)
 
-        except Exception as e:
-            print(f"Erro ao carregar os dados do Excel: {e}")
+    except Exception as e:
+        print(f"Erro ao carregar os dados do Excel: {e}")
+        return
+
+    registro = RegistroExecucao("notificacaoTA")
+    dados_instrumentos = registro.filtrar_pendentes(dados_instrumentos, lambda item: item.numero)
+    gravador = GravadorResultados(
+        CAMINHO_PLANILHA_SAIDA, COLUNAS_PLANILHA_SAIDA, "Instrumentos",
+        coluna_instrumento="Instrumento nº", robo="notificacaoTA",
+    )
+
+    # Últimos valores lidos no portal; no modo incremental atendem os instrumentos que não mudaram
+    cache = CacheInstrumentos(gravador.banco)
+    servidos_do_cache = []
+    if incremental:
+        dados_instrumentos, do_cache = cache.separar(dados_instrumentos, lambda item: item.numero)
+        servidos_do_cache = [
+            (instrumento, preencher_instrumento(instrumento, data_termino, modalidade))
+            for instrumento, data_termino, modalidade in do_cache
+        ]
+    numeros_do_cache = {str(instrumento.numero) for instrumento, _ in servidos_do_cache}
+    if priorizar and dados_instrumentos:
+        dados_instrumentos = cache.ordenar_por_urgencia(dados_instrumentos, lambda item: item.numero)
+
+    if not dados_instrumentos:
+        resultados = []
+    elif motor == "assincrono":
+        from motor_assincrono import executar_assincrono
+
+        driver = conectar_navegador_existente()
+        if not driver:
+            print("Não foi possível conectar ao navegador. Encerrando o processo.")
+            return
+        formulario = capturar_formulario_consulta(driver)
+        resultados = executar_assincrono(
+            driver,
+            dados_instrumentos,
+            lambda item: item.numero,
+            linha_da_pagina_detalhe,
+            processar_instrumento,
+            formulario=formulario,
+        )
+    elif motor == "http":
+        driver = conectar_navegador_existente()
+        if not driver:
+            print("Não foi possível conectar ao navegador. Encerrando o processo.")
             return
+        sessao = criar_sessao_http(driver)
+        formulario = capturar_formulario_consulta(driver)
+        resultados = (
+            (instrumento, processar_instrumento_http(driver, sessao, formulario, instrumento))
+            for instrumento in dados_instrumentos
+        )
+    elif num_navegadores > 1:
+        resultados = executar_em_paralelo(dados_instrumentos, processar_instrumento, num_navegadores)
+    else:
+        driver = conectar_navegador_existente()
+        if not driver:
+            print("Não foi possível conectar ao navegador. Encerrando o processo.")
+            return
+        # Sessão perdida no meio da sequência: reinicia o navegador e retoma pelo instrumento interrompido
+        resultados = processar_com_reinicio(driver, dados_instrumentos, processar_instrumento)
 
-        for idx, instrumento in enumerate(dados_instrumentos):
-            try:
-                numero_instrumento = instrumento.get("Instrumento nº")
-                tecnico = instrumento.get("Técnico")
-                email_tecnico = instrumento.get("e-mail do Técnico")
-
-                if not isinstance(numero_instrumento, (int, str)):
-                    print(f"Formato inesperado para o número do instrumento: {numero_instrumento}")
-                    continue
-
-                # Navega para a página do instrumento
-                clicar_elemento(driver, '//*[@id="menuPrincipal"]/div[1]/div[4]')
-                clicar_elemento(driver, '//*[@id="contentMenu"]/div[1]/ul/li[6]/a')
-
-                # Localiza o campo de pesquisa e o botão de submissão
-                campo_pesquisa_xpath = '//*[@id="consultarNumeroConvenio"]'
-                botao_submit_xpath = '//*[@id="form_submit"]'
-
-                campo = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, campo_pesquisa_xpath))
-                )
-                campo.clear()
-                campo.send_keys(str(numero_instrumento))
-
-                # Clica no botão de submissão
-                submit_button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, botao_submit_xpath))
-                )
-                submit_button.click()
-
-                time.sleep(2)
-
-                detalhe_instrumento_xpath = '//*[@id="instrumentoId"]/a'
-                elemento_detalhe = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, detalhe_instrumento_xpath))
-                )
-                elemento_detalhe.click()
-
-                # Extrai a data de término de vigência
-                data_termino = extrair_data_termino(driver)
-                if not data_termino:
-                    print(f"Data de término não encontrada para o instrumento {numero_instrumento}")
-                    clicar_elemento(driver, '//*[@id="logo"]/a')  # Retorna à página inicial
-                    continue
-
-                # Extrai a modalidade
-                modalidade_xpath = '//*[@id="tr-alterarModalidade"]/td[2]/table/tbody/tr/td[1]'
-                elemento_modalidade = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, modalidade_xpath))
-                )
-                modalidade = elemento_modalidade.text.strip()
-                print(f"Modalidade extraída para o instrumento {numero_instrumento}: {modalidade}")
-
-                # Calcula as notificações
-                notificacoes = calcular_notificacoes(modalidade, data_termino)
-                if len(notificacoes) != 2:
-                    print(f"Erro ao calcular as notificações para o instrumento {numero_instrumento}.")
-                    clicar_elemento(driver, '//*[@id="logo"]/a')  # Retorna à página inicial
-                    continue
-
-                # Registra as informações na planilha
-                gerar_planilha_incremental({
-                    "Instrumento nº": numero_instrumento,
-                    "Data de Término": data_termino.strftime("%d/%m/%Y"),
-                    "Data de Notificação 1": notificacoes[0].strftime("%d/%m/%Y"),
-                    "Data de Notificação 2": notificacoes[1].strftime("%d/%m/%Y"),
-                    "Técnico": tecnico,
-                    "Email do Técnico": email_tecnico,
-                })
-
-                print(f"Dados registrados para o instrumento {numero_instrumento}.")
-
-                # Retorna à página inicial antes de continuar
-                clicar_elemento(driver, '//*[@id="logo"]/a')
-                time.sleep(2)
-
-            except Exception as e:
-                print(f"Erro ao processar o instrumento {numero_instrumento}: {e}")
-                clicar_elemento(driver, '//*[@id="logo"]/a')  # Retorna à página inicial em caso de erro
-                continue
+    try:
+        # As gravações seguem para a thread do escritor; o navegador passa logo ao próximo instrumento
+        with EscritorSegundoPlano() as escritor:
+            for instrumento, preenchido in chain(servidos_do_cache, resultados):
+                observacao = str(instrumento.numero) not in numeros_do_cache
+                escritor.enviar(registrar_resultado, gravador, registro, instrumento, preenchido, observacao)
 
-    else:
-        print("Não foi possível conectar ao navegador. Encerrando o processo.")
+        try:
+            gerar_agenda(gravador)
+        except Exception as e:
+            print(f"Erro ao gerar a agenda de notificações: {e}")
+    finally:
+        gravador.fechar()
+        registro.fechar()
+        emitir_relatorio()
 
 
 
 if __name__ == "__main__":
-    executar_processo()
+    if "--agenda" in sys.argv:
+        # Só recalcula a agenda a partir das linhas já gravadas (ex.: depois de mudar as regras)
+        gravador = GravadorResultados(CAMINHO_PLANILHA_SAIDA, COLUNAS_PLANILHA_SAIDA, "Instrumentos")
+        try:
+            gerar_agenda(gravador)
+        finally:
+            gravador.fechar()
+    elif "--reprocessar" in sys.argv:
+        # Reextrai os dados das páginas arquivadas (ex.: depois de corrigir um extrator)
+        reprocessar_arquivo()
+    else:
+        executar_processo()
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import pickle
+from openpyxl import load_workbook
+
+import pandas as pd
+
+
+# Cópias já interpretadas das planilhas de entrada (pickle), reaproveitadas enquanto o arquivo não mudar
+DIRETORIO_CACHE_PLANILHAS = os.environ.get(
+    "DIRETORIO_CACHE_PLANILHAS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_planilhas"),
+)
+
+COLUNAS_CONTROLE = ["Instrumento nº", "Técnico", "e-mail do Técnico", "Status"]
+STATUS_ATIVO = "ATIVOS TODOS"
+
+
+def _hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo, lido em blocos."""
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _caminho_cache(caminho, aba, colunas):
+    chave = "|".join([os.path.abspath(caminho), str(aba), *colunas])
+    return os.path.join(DIRETORIO_CACHE_PLANILHAS, hashlib.sha1(chave.encode("utf-8")).hexdigest() + ".pkl")
+
+
+def _ler_colunas(caminho, aba, colunas):
+    """Lê só as colunas pedidas, linha a linha, com o openpyxl em modo somente leitura."""
+    workbook = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = workbook[aba] if aba else workbook.active
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = [str(valor).strip() if valor is not None else None for valor in next(linhas, ())]
+        faltando = [coluna for coluna in colunas if coluna not in cabecalho]
+        if faltando:
+            raise ValueError(f"Colunas não encontradas em '{caminho}': {faltando}")
+        indices = [cabecalho.index(coluna) for coluna in colunas]
+        valores = [
+            [linha[indice] if indice < len(linha) else None for indice in indices]
+            for linha in linhas
+        ]
+    finally:
+        workbook.close()
+    return pd.DataFrame(valores, columns=colunas)
+
+
+def _sem_linhas_vazias(dados):
+    """Cópia dos dados sem as linhas em que todas as colunas estão vazias."""
+    return dados.dropna(how="all").reset_index(drop=True)
+
+
+def carregar_planilha(caminho, colunas, aba=None):
+    """
+    Carrega as colunas indicadas de uma planilha, usando a cópia em cache quando possível.
+
+    A cópia é reaproveitada se a data de modificação e o tamanho do arquivo não mudaram; se
+    mudaram, o conteúdo é comparado pelo hash antes de interpretar a planilha de novo.
+    Linhas com todas as colunas pedidas vazias (ex.: linhas formatadas ao final da planilha,
+    que a leitura somente leitura do openpyxl devolve) são descartadas, como no pd.read_excel.
+    """
+    colunas = list(colunas)
+    caminho_cache = _caminho_cache(caminho, aba, colunas)
+    estado = os.stat(caminho)
+    cache = None
+    if os.path.exists(caminho_cache):
+        try:
+            with open(caminho_cache, "rb") as arquivo:
+                cache = pickle.load(arquivo)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            cache = None
+
+    if cache and (cache["mtime"], cache["tamanho"]) == (estado.st_mtime, estado.st_size):
+        return _sem_linhas_vazias(cache["dados"])
+
+    hash_atual = _hash_arquivo(caminho)
+    if cache and cache["hash"] == hash_atual:
+        dados = cache["dados"]
+    else:
+        print(f"[INFO] Interpretando a planilha '{caminho}'...")
+        dados = _ler_colunas(caminho, aba, colunas)
+
+    os.makedirs(DIRETORIO_CACHE_PLANILHAS, exist_ok=True)
+    caminho_temporario = caminho_cache + ".tmp"
+    with open(caminho_temporario, "wb") as arquivo:
+        pickle.dump(
+            {"mtime": estado.st_mtime, "tamanho": estado.st_size, "hash": hash_atual, "dados": dados},
+            arquivo,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(caminho_temporario, caminho_cache)
+    return _sem_linhas_vazias(dados)
+
+
+def normalizar_numeros(serie):
+    """Converte números de instrumento (ex.: 912345.0, " 912345 ") para texto sem casas decimais; vazios viram NA."""
+    numeros = pd.to_numeric(serie, errors="coerce")
+    texto = serie.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+    return numeros.round().astype("Int64").astype("string").where(numeros.notna(), texto)
+
+
+def carregar_controle(caminho, aba="PARCERIAS CGAP"):
+    """Carrega as colunas usadas pelos robôs da planilha de controle, com o número do instrumento normalizado."""
+    controle = carregar_planilha(caminho, COLUNAS_CONTROLE, aba)
+    controle["Instrumento nº"] = normalizar_numeros(controle["Instrumento nº"])
+    return controle
+
+
+def instrumentos_ativos(caminho, aba="PARCERIAS CGAP"):
+    """Instrumentos com status 'ATIVOS TODOS' e número, técnico e e-mail preenchidos."""
+    controle = carregar_controle(caminho, aba)
+    return controle[
+        (controle["Status"] == STATUS_ATIVO)
+        & controle["Instrumento nº"].notna()
+        & controle["Técnico"].notna()
+        & controle["e-mail do Técnico"].notna()
+    ]
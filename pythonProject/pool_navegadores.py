@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import subprocess
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from multiprocessing.util import Finalize
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+from navegador_gerenciado import URL_INICIAL, bloquear_recursos, navegador_gerenciado_ativo
+from utilitarios import CAMINHO_CHROME, caminho_chromedriver
+
+
+# Configuração do modo de execução paralela
+NUM_NAVEGADORES = int(os.environ.get("NUM_NAVEGADORES", "1"))
+PORTA_BASE = int(os.environ.get("PORTA_BASE_NAVEGADORES", "9300"))
+DIRETORIO_PERFIS = os.environ.get(
+    "DIRETORIO_PERFIS_NAVEGADORES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfis_navegadores"),
+)
+
+
+def aguardar_porta_depuracao(porta, tempo_limite=30):
+    """Aguarda até que o Chrome responda na porta de depuração informada."""
+    limite = time.monotonic() + tempo_limite
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"http://localhost:{porta}/json/version", timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def iniciar_navegador_isolado(indice, caminho_driver=None):
+    """
+    Abre uma instância própria do Chrome (perfil e porta de depuração exclusivos) e conecta a ela.
+
+    O perfil fica em DIRETORIO_PERFIS/worker_<indice> e é reaproveitado entre execuções,
+    de modo que basta autenticar no portal uma única vez em cada perfil. Com MODO_NAVEGADOR=gerenciado,
+    o Chrome roda sem janela, com carregamento "eager" e sem baixar imagens, fontes e estilos.
+
+    Returns:
+        tuple: (driver, processo_chrome)
+    """
+    porta = PORTA_BASE + indice
+    diretorio_perfil = os.path.join(DIRETORIO_PERFIS, f"worker_{indice}")
+    os.makedirs(diretorio_perfil, exist_ok=True)
+
+    print(f"[INFO] Worker {indice}: iniciando Chrome na porta {porta} com perfil '{diretorio_perfil}'...")
+    gerenciado = navegador_gerenciado_ativo()
+    processo_chrome = subprocess.Popen([
+        CAMINHO_CHROME,
+        f"--remote-debugging-port={porta}",
+        f"--user-data-dir={diretorio_perfil}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        *(["--headless=new", "--window-size=1366,900"] if gerenciado else []),
+        URL_INICIAL,
+    ])
+
+    if not aguardar_porta_depuracao(porta):
+        processo_chrome.terminate()
+        raise WebDriverException(f"Chrome do worker {indice} não respondeu na porta {porta}.")
+
+    options = webdriver.ChromeOptions()
+    options.debugger_address = f"localhost:{porta}"
+    if gerenciado:
+        options.page_load_strategy = "eager"
+    driver = webdriver.Chrome(service=Service(caminho_driver or caminho_chromedriver()), options=options)
+    if gerenciado:
+        bloquear_recursos(driver)
+    print(f"[INFO] Worker {indice}: conectado ao navegador isolado.")
+    return driver, processo_chrome
+
+
+# Navegador do processo worker atual (um por processo do pool)
+_driver_worker = None
+
+
+def _encerrar_worker(driver, processo_chrome):
+    """Fecha a sessão do WebDriver e o Chrome isolado do worker."""
+    try:
+        driver.quit()
+    finally:
+        processo_chrome.terminate()
+
+
+def _iniciar_worker(fila_indices, funcao_preparar, caminho_driver):
+    """Inicializa o processo worker com seu próprio Chrome, reservando um índice (porta/perfil) livre."""
+    global _driver_worker
+    indice = fila_indices.get()
+    driver, processo_chrome = iniciar_navegador_isolado(indice, caminho_driver)
+    _driver_worker = driver
+    # Executado na saída do processo worker, quando o pool é encerrado
+    Finalize(None, _encerrar_worker, args=(driver, processo_chrome), exitpriority=10)
+    if funcao_preparar:
+        funcao_preparar(driver)
+
+
+def _processar_item(funcao_processar, item):
+    """Processa um item no navegador do worker; devolve None em caso de falha."""
+    try:
+        return funcao_processar(_driver_worker, item)
+    except Exception as e:
+        print(f"[ERRO] Falha ao processar o item {item}: {e}")
+        return None
+
+
+def executar_em_paralelo(itens, funcao_processar, num_navegadores=NUM_NAVEGADORES, funcao_preparar=None):
+    """
+    Distribui os itens entre `num_navegadores` processos, cada um com seu próprio Chrome.
+
+    Os itens são entregues dinamicamente ao próximo navegador livre e os resultados voltam ao
+    processo principal à medida que ficam prontos, para que possam ser gravados (e registrados
+    como concluídos) sem esperar o fim da execução.
+
+    Args:
+        itens (list): Itens a processar (instrumentos ou propostas), já na ordem desejada.
+        funcao_processar (callable): Função de módulo `f(driver, item)` que devolve a linha de
+            resultado do item, ou None quando o item falhou ou deve ser descartado.
+        num_navegadores (int): Quantidade de navegadores/processos simultâneos.
+        funcao_preparar (callable, opcional): Função `f(driver)` executada uma vez por navegador
+            antes da primeira consulta (ex.: navegar até a tela de pesquisa).
+
+    Yields:
+        tuple: (item, linha) na mesma ordem dos itens de entrada.
+
+    Raises:
+        BrokenProcessPool: se um navegador do pool falhar (ex.: o Chrome não iniciar no worker).
+    """
+    itens = list(itens)
+    quantidade = max(1, min(num_navegadores, len(itens)))
+    if not itens:
+        return
+
+    # Resolve o ChromeDriver uma única vez e compartilha o caminho com os workers
+    caminho_driver = caminho_chromedriver()
+    fila_indices = multiprocessing.Queue()
+    for indice in range(quantidade):
+        fila_indices.put(indice)
+    print(f"[INFO] Iniciando {quantidade} navegadores para {len(itens)} itens.")
+
+    with ProcessPoolExecutor(
+        max_workers=quantidade,
+        initializer=_iniciar_worker,
+        initargs=(fila_indices, funcao_preparar, caminho_driver),
+    ) as executor:
+        linhas = executor.map(_processar_item, repeat(funcao_processar), itens)
+        entregues = 0
+        try:
+            for item, linha in zip(itens, linhas):
+                yield item, linha
+                entregues += 1
+        except BrokenProcessPool as e:
+            # Propaga para que o robô não trate uma execução interrompida como completa; os itens
+            # não entregues continuam pendentes no registro da execução e são retomados na próxima
+            print(f"[ERRO] Um navegador do pool foi encerrado com falha; {len(itens) - entregues} "
+                  f"itens não processados: {e}")
+            raise
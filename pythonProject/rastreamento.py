@@ -0,0 +1,243 @@
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from multiprocessing.util import Finalize
+
+from registro_execucao import ID_EXECUCAO
+
+
+# Banco com a duração de cada etapa medida (clique, espera, extração, gravação)
+CAMINHO_BANCO_RASTREAMENTO = os.environ.get(
+    "CAMINHO_BANCO_RASTREAMENTO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rastreamento.db"),
+)
+RASTREAMENTO_ATIVO = os.environ.get("RASTREAMENTO_ATIVO", "1") != "0"
+# As etapas ficam em memória e vão para o banco em lotes, para a medição não pesar no disco
+TAMANHO_LOTE_RASTREAMENTO = int(os.environ.get("TAMANHO_LOTE_RASTREAMENTO", "200"))
+
+# Rodada do robô: definida no processo principal e herdada (pelo ambiente) pelos workers do pool.
+# O relatório do fim da execução considera só as etapas desta rodada, mesmo com vários robôs
+# gravando no mesmo banco ao mesmo tempo.
+RODADA = os.environ.setdefault("RODADA_RASTREAMENTO", f"{os.getpid()}-{int(time.time())}")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS etapas (
+    id INTEGER PRIMARY KEY,
+    execucao TEXT NOT NULL,
+    processo INTEGER NOT NULL,
+    etapa TEXT NOT NULL,
+    seletor TEXT,
+    instrumento TEXT,
+    profundidade INTEGER NOT NULL,
+    inicio REAL NOT NULL,
+    duracao REAL NOT NULL,
+    resultado TEXT NOT NULL,
+    tentativas INTEGER NOT NULL,
+    rodada TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_etapas_inicio ON etapas (inicio);
+"""
+
+
+def _preparar_banco(conexao):
+    """Cria as tabelas e acrescenta a coluna da rodada a bancos gravados por versões anteriores."""
+    conexao.executescript(ESQUEMA)
+    colunas = {coluna[1] for coluna in conexao.execute("PRAGMA table_info(etapas)")}
+    if "rodada" not in colunas:
+        conexao.execute("ALTER TABLE etapas ADD COLUMN rodada TEXT")
+    conexao.execute("CREATE INDEX IF NOT EXISTS idx_etapas_rodada ON etapas (rodada)")
+
+
+class Etapa:
+    """Uma etapa medida. Quem mede pode ajustar `resultado`, `tentativas` e `seletor` antes de ela terminar."""
+
+    __slots__ = ("nome", "seletor", "instrumento", "profundidade", "inicio", "duracao", "resultado", "tentativas")
+
+    def __init__(self, nome, seletor=None, instrumento=None, profundidade=0):
+        self.nome = nome
+        self.seletor = seletor
+        self.instrumento = instrumento
+        self.profundidade = profundidade
+        self.inicio = time.time()
+        self.duracao = 0.0
+        self.resultado = "ok"
+        self.tentativas = 1
+
+
+_local = threading.local()
+_pendentes = []
+_trava = threading.Lock()
+_processo_registrado = None
+
+
+def _pilha():
+    if not hasattr(_local, "pilha"):
+        _local.pilha = []
+    return _local.pilha
+
+
+def _guardar(etapa):
+    global _processo_registrado
+    with _trava:
+        if _processo_registrado != os.getpid():
+            # Primeira etapa deste processo (ou de um worker do pool): grava o que restar na saída
+            _pendentes.clear()
+            _processo_registrado = os.getpid()
+            Finalize(None, descarregar, exitpriority=20)
+        _pendentes.append(etapa)
+        cheio = len(_pendentes) >= TAMANHO_LOTE_RASTREAMENTO
+    if cheio:
+        descarregar()
+
+
+def descarregar():
+    """Grava no banco as etapas medidas que ainda estão em memória."""
+    with _trava:
+        lote = list(_pendentes)
+        _pendentes.clear()
+    if not lote:
+        return
+    try:
+        conexao = sqlite3.connect(CAMINHO_BANCO_RASTREAMENTO, timeout=30)
+        try:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            _preparar_banco(conexao)
+            with conexao:
+                conexao.executemany(
+                    "INSERT INTO etapas (execucao, processo, etapa, seletor, instrumento, profundidade, inicio, "
+                    "duracao, resultado, tentativas, rodada) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (ID_EXECUCAO, os.getpid(), etapa.nome, etapa.seletor,
+                         None if etapa.instrumento is None else str(etapa.instrumento),
+                         etapa.profundidade, etapa.inicio, etapa.duracao, etapa.resultado, etapa.tentativas, RODADA)
+                        for etapa in lote
+                    ),
+                )
+        finally:
+            conexao.close()
+    except sqlite3.Error as e:
+        print(f"[ERRO] Não foi possível gravar as medições de tempo: {e}")
+
+
+@contextmanager
+def etapa(nome, seletor=None, instrumento=None):
+    """
+    Mede a duração do bloco como uma etapa. Exceções que atravessam o bloco viram o resultado
+    (nome da exceção) e são levantadas de novo.
+
+    Etapas aninhadas herdam o instrumento da etapa externa; informar `instrumento` o define para
+    todas as etapas internas.
+    """
+    if not RASTREAMENTO_ATIVO:
+        yield Etapa(nome, seletor, instrumento)
+        return
+
+    pilha = _pilha()
+    if instrumento is None and pilha:
+        instrumento = pilha[-1].instrumento
+    atual = Etapa(nome, seletor, instrumento, len(pilha))
+    pilha.append(atual)
+    inicio = time.perf_counter()
+    try:
+        yield atual
+    except BaseException as e:
+        atual.resultado = type(e).__name__
+        raise
+    finally:
+        atual.duracao = time.perf_counter() - inicio
+        pilha.pop()
+        _guardar(atual)
+
+
+def medir(nome, obter_instrumento=None):
+    """
+    Decorador que mede cada chamada da função como uma etapa. Retorno None é registrado como
+    resultado "vazio". `obter_instrumento(*args, **kwargs)` identifica o instrumento da chamada.
+    """
+    def decorador(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            instrumento = obter_instrumento(*args, **kwargs) if obter_instrumento else None
+            with etapa(nome, instrumento=instrumento) as atual:
+                retorno = funcao(*args, **kwargs)
+                if retorno is None:
+                    atual.resultado = "vazio"
+                return retorno
+        return medida
+    return decorador
+
+
+def _percentil(valores_ordenados, fracao):
+    """Percentil pelo método do posto mais próximo."""
+    posicao = max(0, math.ceil(fracao * len(valores_ordenados)) - 1)
+    return valores_ordenados[min(posicao, len(valores_ordenados) - 1)]
+
+
+def relatorio_desempenho(desde=None, mais_lentos=10, caminho_banco=CAMINHO_BANCO_RASTREAMENTO):
+    """
+    Monta o relatório das etapas da rodada atual (ou, com `desde`, de todas as gravadas a partir
+    desse timestamp): contagem, p50, p95, máximo e tempo total por etapa, e os instrumentos mais lentos.
+    """
+    if not os.path.exists(caminho_banco):
+        return "Nenhuma etapa medida."
+    filtro, parametro = ("rodada = ?", RODADA) if desde is None else ("inicio >= ?", desde)
+    conexao = sqlite3.connect(caminho_banco, timeout=30)
+    try:
+        _preparar_banco(conexao)
+        linhas = conexao.execute(
+            f"SELECT etapa, duracao, resultado, tentativas FROM etapas WHERE {filtro}", (parametro,)
+        ).fetchall()
+        # Etapa mais externa de cada instrumento (ex.: processar_instrumento) = tempo total do instrumento
+        lentos = conexao.execute(
+            "SELECT instrumento, etapa, duracao, resultado FROM etapas "
+            f"WHERE {filtro} AND profundidade = 0 AND instrumento IS NOT NULL "
+            "ORDER BY duracao DESC LIMIT ?",
+            (parametro, mais_lentos),
+        ).fetchall()
+    finally:
+        conexao.close()
+    if not linhas:
+        return "Nenhuma etapa medida."
+
+    por_etapa = {}
+    for nome, duracao, resultado, tentativas in linhas:
+        dados = por_etapa.setdefault(nome, {"duracoes": [], "falhas": 0, "retentativas": 0})
+        dados["duracoes"].append(duracao)
+        dados["falhas"] += resultado not in ("ok", "vazio")
+        dados["retentativas"] += tentativas - 1
+
+    saida = [
+        f"{'Etapa':<28}{'Qtd':>7}{'p50 (s)':>10}{'p95 (s)':>10}{'Máx (s)':>10}{'Total (s)':>11}{'Falhas':>8}{'Retent.':>9}"
+    ]
+    for nome, dados in sorted(por_etapa.items(), key=lambda item: -sum(item[1]["duracoes"])):
+        duracoes = sorted(dados["duracoes"])
+        saida.append(
+            f"{nome:<28}{len(duracoes):>7}{_percentil(duracoes, 0.5):>10.3f}{_percentil(duracoes, 0.95):>10.3f}"
+            f"{duracoes[-1]:>10.3f}{sum(duracoes):>11.1f}{dados['falhas']:>8}{dados['retentativas']:>9}"
+        )
+    if lentos:
+        saida.append("")
+        saida.append(f"Instrumentos mais lentos ({len(lentos)}):")
+        for instrumento, nome, duracao, resultado in lentos:
+            saida.append(f"  {instrumento:<20}{duracao:>9.2f} s  ({nome}, {resultado})")
+    return "\n".join(saida)
+
+
+def emitir_relatorio(desde=None):
+    """Grava as medições pendentes e imprime o relatório de desempenho da execução."""
+    if not RASTREAMENTO_ATIVO:
+        return
+    descarregar()
+    print("[INFO] Relatório de desempenho da execução:")
+    print(relatorio_desempenho(desde))
+
+
+if __name__ == "__main__":
+    # Ex.: python rastreamento.py 24  →  relatório das etapas medidas nas últimas 24 horas
+    horas = float(sys.argv[1]) if len(sys.argv) > 1 else 24
+    print(relatorio_desempenho(time.time() - horas * 3600))
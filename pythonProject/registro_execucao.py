@@ -0,0 +1,94 @@
+import os
+import sqlite3
+from datetime import date, datetime
+
+
+# Banco do registro de execuções e identificador da execução atual
+CAMINHO_BANCO_REGISTRO = os.environ.get(
+    "CAMINHO_BANCO_REGISTRO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "registro_execucoes.db"),
+)
+# Por padrão, uma execução por dia: reiniciar o robô no mesmo dia retoma de onde parou
+ID_EXECUCAO = os.environ.get("ID_EXECUCAO") or date.today().isoformat()
+
+STATUS_CONCLUIDO = "concluido"
+STATUS_FALHA = "falha"
+
+
+class RegistroExecucao:
+    """
+    Registro persistente dos itens (instrumentos ou propostas) já processados por um robô.
+
+    Cada item é gravado com a chave (robô, id da execução, número do item). Ao reiniciar uma
+    execução com o mesmo id, os itens concluídos são pulados e apenas os que falharam ou ainda
+    não foram consultados voltam para a fila.
+    """
+
+    def __init__(self, robo, id_execucao=ID_EXECUCAO, caminho_banco=CAMINHO_BANCO_REGISTRO):
+        self.robo = robo
+        self.id_execucao = id_execucao
+        # A conexão pode ser usada pela thread de gravação (ver escritor_segundo_plano.py), nunca por duas ao mesmo tempo
+        self.conexao = sqlite3.connect(caminho_banco, timeout=30, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS itens_execucao (
+                robo TEXT NOT NULL,
+                id_execucao TEXT NOT NULL,
+                item TEXT NOT NULL,
+                status TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 1,
+                erro TEXT,
+                atualizado_em TEXT NOT NULL,
+                PRIMARY KEY (robo, id_execucao, item)
+            )
+        """)
+        self.conexao.commit()
+
+    def concluidos(self):
+        """Devolve o conjunto dos itens já concluídos nesta execução."""
+        cursor = self.conexao.execute(
+            "SELECT item FROM itens_execucao WHERE robo = ? AND id_execucao = ? AND status = ?",
+            (self.robo, self.id_execucao, STATUS_CONCLUIDO),
+        )
+        return {linha[0] for linha in cursor}
+
+    def execucao_nova(self):
+        """Indica se ainda não há nenhum item registrado para esta execução."""
+        cursor = self.conexao.execute(
+            "SELECT 1 FROM itens_execucao WHERE robo = ? AND id_execucao = ? LIMIT 1",
+            (self.robo, self.id_execucao),
+        )
+        return cursor.fetchone() is None
+
+    def filtrar_pendentes(self, itens, obter_chave):
+        """Remove da lista os itens já concluídos, preservando a ordem dos demais."""
+        concluidos = self.concluidos()
+        pendentes = [item for item in itens if str(obter_chave(item)) not in concluidos]
+        if concluidos:
+            print(f"[INFO] Execução '{self.id_execucao}' retomada: {len(itens) - len(pendentes)} itens já "
+                  f"concluídos serão pulados, {len(pendentes)} pendentes.")
+        return pendentes
+
+    def marcar(self, item, concluido, erro=None):
+        """Registra o resultado do processamento de um item."""
+        self.conexao.execute("""
+            INSERT INTO itens_execucao (robo, id_execucao, item, status, erro, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (robo, id_execucao, item) DO UPDATE SET
+                status = excluded.status,
+                erro = excluded.erro,
+                tentativas = tentativas + 1,
+                atualizado_em = excluded.atualizado_em
+        """, (
+            self.robo,
+            self.id_execucao,
+            str(item),
+            STATUS_CONCLUIDO if concluido else STATUS_FALHA,
+            erro,
+            datetime.now().isoformat(timespec="seconds"),
+        ))
+        self.conexao.commit()
+
+    def fechar(self):
+        """Fecha a conexão com o banco do registro."""
+        self.conexao.close()
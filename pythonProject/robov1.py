@@ -1,81 +1,88 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-import time
+
+from espera_pagina import aguardar_pagina_pronta, aguardar_rede_ociosa, raiz_documento
+from extracao_html import capturar_pagina
+from navegador_gerenciado import conectar_navegador
 
 
 # Função para conectar ao navegador já aberto
 def conectar_navegador_existente():
-    options = webdriver.ChromeOptions()
-    options.debugger_address = "localhost:9222"  # Porta que o Chrome está utilizando para depuração
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
+    # Chrome aberto pelo usuário na porta 9222 ou, com MODO_NAVEGADOR=gerenciado, Chrome sem janela iniciado aqui
+    return conectar_navegador()
 
 
 # Função para buscar os cargos "Presidente" ou "Prefeito" na tabela, encontrar o botão e clicar
 def identificar_cargo_e_clicar_botao(driver):
     try:
         # Esperar até que a tabela esteja presente
-        tabela_membros = WebDriverWait(driver, 10).until(
+        WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.XPATH, '//*[@id="tblMembros"]'))  # Substitua pelo XPath da tabela
         )
 
-        # Buscar todas as linhas da tabela
-        linhas_tabela = tabela_membros.find_elements(By.XPATH, './/tr')
+        # Capturar o HTML uma única vez e percorrer as linhas da tabela localmente
+        pagina = capturar_pagina(driver)
+        linhas_tabela = pagina.xpath('//*[@id="tblMembros"]//tr')
 
         # Percorrer todas as linhas e verificar o campo de cargo
         for linha in linhas_tabela:
-            try:
-                # Verificar se existe um campo de cargo dentro da linha com atributo title
-                cargo_element = linha.find_element(By.XPATH, './/td[@title]')  # Procura a célula que contém o 'title'
-                title_texto = cargo_element.get_attribute("title")
-                print(f"Cargo encontrado: {title_texto}")
-
-                # Verificar se o cargo é "Presidente" ou "Prefeito"
-                if title_texto in ["Presidente", "Prefeito"]:
-                    print(f"Cargo '{title_texto}' encontrado. Identificando o botão correspondente...")
-
-                    # Localizar o botão dentro da mesma linha pelo ID e clicar
-                    botao_element = linha.find_element(By.XPATH, './/button[contains(@id, "tblMembros_acoes")]')
-                    botao_id = botao_element.get_attribute("id")
-                    print(f"Botão encontrado com ID: {botao_id}")
-
-                    # Clicar no botão correspondente
-                    botao_element.click()
-                    print("Botão clicado com sucesso!")
-                    time.sleep(1)  # Pausa para garantir que a ação ocorra corretamente
-
-                    break  # Para de procurar após encontrar e clicar no cargo correto
-
-            except NoSuchElementException:
-                # Se não encontrar um campo com o 'title' ou botão na linha, continua para a próxima linha
+            # Verificar se existe um campo de cargo dentro da linha com atributo title
+            celulas_cargo = linha.xpath('.//td[@title]')  # Procura a célula que contém o 'title'
+            if not celulas_cargo:
                 continue
+            title_texto = celulas_cargo[0].get("title")
+            print(f"Cargo encontrado: {title_texto}")
+
+            # Verificar se o cargo é "Presidente" ou "Prefeito"
+            if title_texto in ["Presidente", "Prefeito"]:
+                print(f"Cargo '{title_texto}' encontrado. Identificando o botão correspondente...")
+
+                # Localizar o botão dentro da mesma linha pelo ID
+                botoes = linha.xpath('.//button[contains(@id, "tblMembros_acoes")]')
+                if not botoes:
+                    # Se não encontrar o botão na linha, continua para a próxima linha
+                    continue
+                botao_id = botoes[0].get("id")
+                print(f"Botão encontrado com ID: {botao_id}")
+
+                # Clicar no botão correspondente (única ida ao navegador além da captura do HTML)
+                driver.find_element(By.ID, botao_id).click()
+                print("Botão clicado com sucesso!")
+                aguardar_rede_ociosa(driver)  # Espera a ação do botão terminar no servidor
+
+                print("Verificação concluída.")
+                return botao_id  # Para de procurar após encontrar e clicar no cargo correto
 
         print("Verificação concluída.")
 
     except (TimeoutException, NoSuchElementException) as e:
         print(f"Erro ao verificar o cargo e clicar no botão: {e}")
+    return None
 
-# Função principal para executar o fluxo de automação
-def executar_automacao():
-    driver = conectar_navegador_existente()
-
+# Função para abrir a página da tabela de membros e clicar no botão do cargo (devolve o ID do botão clicado ou None)
+def verificar_membros(driver, url):
     # Acessar a URL onde a tabela está localizada
-    driver.get("URL_DO_SEU_SITE")  # Substitua pela URL do seu site
+    pagina_anterior = raiz_documento(driver)
+    driver.get(url)
 
-    # Esperar 5 segundos para o site carregar completamente
-    time.sleep(5)
+    # Esperar a página trocar, a tabela aparecer e a rede ficar ociosa
+    aguardar_pagina_pronta(driver, '//*[@id="tblMembros"]', elemento_anterior=pagina_anterior)
 
     # Buscar o cargo e clicar no botão correspondente
-    identificar_cargo_e_clicar_botao(driver)
+    return identificar_cargo_e_clicar_botao(driver)
+
+# Função principal para executar o fluxo de automação
+def executar_automacao():
+    driver = conectar_navegador_existente()
+
+    verificar_membros(driver, "URL_DO_SEU_SITE")  # Substitua pela URL do seu site
 
-    # Fechar o navegador após o teste
-    time.sleep(5)  # Opcional: Mantenha o navegador aberto para verificar
+    # Fechar o navegador após o teste, assim que as requisições disparadas pelo clique terminarem
+    aguardar_rede_ociosa(driver)
     driver.quit()
 
-# Executar o fluxo de automação
-executar_automacao()
\ No newline at end of file
+# Executar o fluxo de automação (o benchmark importa este módulo sem executá-lo)
+if __name__ == "__main__":
+    executar_automacao()
\ No newline at end of file
@@ -0,0 +1,235 @@
+import os
+import time
+from selenium.common.exceptions import WebDriverException
+
+from espera_pagina import aguardar_rede_ociosa, reinstalar_monitor_rede
+from navegador_gerenciado import URL_INICIAL, bloquear_recursos, conectar_navegador, navegador_gerenciado_ativo
+from rastreamento import etapa
+
+
+MONITOR_SESSAO_ATIVO = os.environ.get("MONITOR_SESSAO_ATIVO", "1") != "0"
+# Esperas esgotadas seguidas que levam a conferir a sessão e a reciclar a aba
+LIMITE_TIMEOUTS_CONSECUTIVOS = int(os.environ.get("LIMITE_TIMEOUTS_CONSECUTIVOS", "3"))
+# Memória JavaScript da aba (MB) acima da qual ela é trocada por uma nova; conferida a cada N itens
+LIMITE_MEMORIA_ABA_MB = int(os.environ.get("LIMITE_MEMORIA_ABA_MB", "1024"))
+INTERVALO_VERIFICACAO_MEMORIA = int(os.environ.get("INTERVALO_VERIFICACAO_MEMORIA", "25"))
+# Segundos para o usuário refazer o login no Chrome aberto; 0 = sem espera (execuções desacompanhadas)
+TEMPO_ESPERA_LOGIN = int(os.environ.get("TEMPO_ESPERA_LOGIN", "0"))
+# Reinícios do navegador por execução quando a sessão não volta; esgotados, os itens restantes ficam pendentes
+LIMITE_REINICIOS_NAVEGADOR = int(os.environ.get("LIMITE_REINICIOS_NAVEGADOR", "2"))
+
+# Mesmos sinais de tela de login usados pelo caminho HTTP (ver sessao_http.XPATH_HTML_LOGIN)
+SCRIPT_TELA_LOGIN = """return !!document.querySelector('input[type="password"], form[action*="login"]');"""
+
+
+class SessaoExpirada(RuntimeError):
+    """A sessão do portal expirou e não pôde ser recuperada: os itens seguintes falham de imediato."""
+
+
+class MonitorSessao:
+    """
+    Acompanha a saúde do navegador de um robô ao longo da execução.
+
+    Detecta a tela de login (sessão expirada), sequências de esperas esgotadas e o crescimento da
+    memória da aba. Na sessão expirada, abre de novo a página inicial para que o login salvo no
+    perfil (ou, com TEMPO_ESPERA_LOGIN, o usuário) reautentique; em esperas seguidas ou memória
+    alta, troca a aba por uma nova. Se a sessão não voltar, marca o navegador como encerrado e
+    `verificar` passa a levantar SessaoExpirada na hora, em vez de cada item esgotar suas esperas.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.timeouts_consecutivos = 0
+        self.itens_verificados = 0
+        self.encerrada = False
+
+    def _executar(self, script):
+        try:
+            return self.driver.execute_script(script)
+        except WebDriverException:
+            return None
+
+    def tela_de_login(self):
+        return bool(self._executar(SCRIPT_TELA_LOGIN))
+
+    def memoria_aba_mb(self):
+        """Memória JavaScript em uso na aba, lida via CDP (None em navegadores sem CDP)."""
+        try:
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+            metricas = self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        except (AttributeError, KeyError, WebDriverException):
+            return None
+        for metrica in metricas:
+            if metrica["name"] == "JSHeapUsedSize":
+                return metrica["value"] / (1024 * 1024)
+        return None
+
+    def garantir_ativa(self):
+        """Levanta SessaoExpirada, sem consultar o navegador, se a sessão já foi dada como perdida."""
+        if self.encerrada and MONITOR_SESSAO_ATIVO:
+            raise SessaoExpirada("Sessão do portal expirada; etapa não executada.")
+
+    def verificar(self):
+        """
+        Confere a sessão antes de um novo item (uma chamada ao navegador; a memória só a cada
+        INTERVALO_VERIFICACAO_MEMORIA itens). Levanta SessaoExpirada se a sessão estiver perdida.
+        """
+        if not MONITOR_SESSAO_ATIVO:
+            return
+        self.garantir_ativa()
+        if self.tela_de_login():
+            self.reautenticar()
+
+        self.itens_verificados += 1
+        if self.itens_verificados % INTERVALO_VERIFICACAO_MEMORIA == 0:
+            memoria = self.memoria_aba_mb()
+            if memoria is not None and memoria > LIMITE_MEMORIA_ABA_MB:
+                print(f"[INFO] Aba usando {memoria:.0f} MB de memória; trocando por uma nova.")
+                self.reciclar_aba("memória alta")
+
+    def registrar_sucesso(self):
+        self.timeouts_consecutivos = 0
+
+    def registrar_timeout(self):
+        """
+        Chamado quando uma espera se esgota. Na tela de login, reautentica na hora; depois de
+        LIMITE_TIMEOUTS_CONSECUTIVOS esperas seguidas, troca a aba por uma nova.
+        """
+        if not MONITOR_SESSAO_ATIVO:
+            return
+        self.garantir_ativa()
+        self.timeouts_consecutivos += 1
+        if self.tela_de_login():
+            self.reautenticar()
+        elif self.timeouts_consecutivos >= LIMITE_TIMEOUTS_CONSECUTIVOS:
+            print(f"[INFO] {self.timeouts_consecutivos} esperas esgotadas seguidas; trocando a aba por uma nova.")
+            self.reciclar_aba("esperas esgotadas")
+
+    def reciclar_aba(self, motivo):
+        """Abre uma aba nova na página inicial e fecha a antiga (libera a memória acumulada pela aba)."""
+        with etapa("reciclar_aba", seletor=motivo):
+            try:
+                antiga = self.driver.current_window_handle
+                self.driver.switch_to.new_window("tab")
+                nova = self.driver.current_window_handle
+                self.driver.switch_to.window(antiga)
+                self.driver.close()
+                self.driver.switch_to.window(nova)
+                # Bloqueio de recursos e monitor de rede valem por aba: são refeitos na nova
+                if navegador_gerenciado_ativo():
+                    bloquear_recursos(self.driver)
+                self.driver.get(URL_INICIAL)
+                reinstalar_monitor_rede(self.driver)
+                aguardar_rede_ociosa(self.driver)
+            except WebDriverException as e:
+                self.encerrada = True
+                raise SessaoExpirada(f"Navegador não respondeu ao trocar de aba: {e}") from e
+        self.timeouts_consecutivos = 0
+        if self.tela_de_login():
+            self.reautenticar()
+
+    def reautenticar(self):
+        """
+        Abre de novo a página inicial para reaproveitar o login salvo no perfil. Se a tela de login
+        continuar, espera até TEMPO_ESPERA_LOGIN segundos pelo login manual; senão, encerra a sessão.
+        """
+        with etapa("reautenticar") as atual:
+            print("[INFO] Sessão do portal expirada; tentando reautenticar...")
+            try:
+                self.driver.get(URL_INICIAL)
+                aguardar_rede_ociosa(self.driver)
+            except WebDriverException as e:
+                print(f"[ERRO] Falha ao abrir a página inicial: {e}")
+            limite = time.monotonic() + TEMPO_ESPERA_LOGIN
+            if self.tela_de_login() and TEMPO_ESPERA_LOGIN:
+                print(f"[ERRO] Faça o login no navegador; aguardando até {TEMPO_ESPERA_LOGIN} s...")
+            while self.tela_de_login():
+                if time.monotonic() >= limite:
+                    self.encerrada = True
+                    raise SessaoExpirada("Sessão do portal expirada e não foi possível reautenticar.")
+                atual.tentativas += 1
+                time.sleep(2)
+        self.timeouts_consecutivos = 0
+        print("[INFO] Sessão do portal restabelecida.")
+
+
+_monitores = {}
+
+
+def monitor_sessao(driver):
+    """Monitor de sessão do navegador informado (um por navegador, criado no primeiro uso)."""
+    monitor = _monitores.get(id(driver))
+    if monitor is None or monitor.driver is not driver:
+        monitor = _monitores[id(driver)] = MonitorSessao(driver)
+    return monitor
+
+
+def _descartar_navegador(driver):
+    """Esquece o monitor do navegador e fecha o Chrome gerenciado (o Chrome do usuário continua aberto)."""
+    _monitores.pop(id(driver), None)
+    if navegador_gerenciado_ativo():
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+def reiniciar_navegador(driver, conectar=conectar_navegador, funcao_preparar=None):
+    """
+    Troca o navegador por um novo quando a aba reciclada e a reautenticação não bastaram.
+
+    O Chrome gerenciado é fechado e aberto de novo com o mesmo perfil (login salvo); o Chrome do
+    usuário não é fechado, só ganha uma nova conexão do WebDriver. `funcao_preparar(driver)`, se
+    informada, leva o novo navegador à tela de trabalho do robô. Levanta SessaoExpirada se o novo
+    navegador não abrir, cair na tela de login ou não puder ser preparado.
+    """
+    with etapa("reiniciar_navegador"):
+        print("[INFO] Reiniciando o navegador...")
+        _descartar_navegador(driver)
+        novo = None
+        try:
+            novo = conectar()
+            novo.get(URL_INICIAL)
+            reinstalar_monitor_rede(novo)
+            aguardar_rede_ociosa(novo)
+            monitor_sessao(novo).verificar()
+            if funcao_preparar:
+                funcao_preparar(novo)
+        except (SessaoExpirada, WebDriverException) as e:
+            if novo is not None:
+                _descartar_navegador(novo)
+            raise SessaoExpirada(f"Não foi possível reiniciar o navegador: {e}") from e
+    print("[INFO] Navegador reiniciado.")
+    return novo
+
+
+def processar_com_reinicio(driver, itens, funcao_processar, conectar=conectar_navegador, funcao_preparar=None):
+    """
+    Processa os itens em sequência no navegador, devolvendo (item, resultado) a cada consulta.
+
+    Se a sessão expirar sem recuperação (SessaoExpirada), reinicia o navegador e retoma pelo item
+    interrompido, com até LIMITE_REINICIOS_NAVEGADOR reinícios na execução. Esgotados, encerra a
+    sequência: os itens restantes não são marcados no registro de execução e voltam na próxima.
+    `funcao_preparar(driver)` é executada em cada navegador reiniciado (ver pool_navegadores).
+    """
+    reinicios = 0
+    for indice, item in enumerate(itens):
+        while True:
+            try:
+                resultado = funcao_processar(driver, item)
+                break
+            except SessaoExpirada as e:
+                print(f"[ERRO] {e}")
+                novo = None
+                while novo is None and reinicios < LIMITE_REINICIOS_NAVEGADOR:
+                    reinicios += 1
+                    try:
+                        novo = reiniciar_navegador(driver, conectar, funcao_preparar)
+                    except SessaoExpirada as erro:
+                        print(f"[ERRO] {erro}")
+                if novo is None:
+                    print(f"[ERRO] Sessão não recuperada após {reinicios} reinícios do navegador; "
+                          f"{len(itens) - indice} itens ficam pendentes para a próxima execução.")
+                    return
+                driver = novo
+        yield item, resultado
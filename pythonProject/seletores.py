@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime
+from selenium.common.exceptions import WebDriverException
+
+from rastreamento import etapa
+
+
+# Estatísticas de acerto de cada XPath candidato, mantidas entre execuções
+CAMINHO_BANCO_SELETORES = os.environ.get(
+    "CAMINHO_BANCO_SELETORES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "seletores.db"),
+)
+
+# Avalia todos os XPaths de uma vez e devolve quais deles encontram um elemento visível
+SCRIPT_SONDAR_XPATHS = """
+return arguments[0].map(function (xpath) {
+    try {
+        const elemento = document.evaluate(
+            xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+        return !!elemento && elemento.getClientRects().length > 0;
+    } catch (erro) {
+        return false;
+    }
+});
+"""
+
+
+class RegistroSeletores:
+    """
+    Registro dos XPaths alternativos de cada elemento lógico da página (ex.: "nova_pesquisa").
+
+    Cada vez que um dos candidatos é usado com sucesso, o acerto é gravado. Os candidatos passam
+    a ser tentados em ordem de taxa de acerto, e todos são sondados em uma única chamada de
+    JavaScript em vez de uma espera com tempo limite para cada um.
+    """
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO_SELETORES):
+        self.caminho_banco = caminho_banco
+        with closing(self._conectar()) as conexao:
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS acertos_seletores (
+                    elemento TEXT NOT NULL,
+                    xpath TEXT NOT NULL,
+                    acertos INTEGER NOT NULL DEFAULT 0,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    atualizado_em TEXT NOT NULL,
+                    PRIMARY KEY (elemento, xpath)
+                )
+            """)
+            conexao.commit()
+            self.estatisticas = {
+                (elemento, xpath): (acertos, tentativas)
+                for elemento, xpath, acertos, tentativas in conexao.execute(
+                    "SELECT elemento, xpath, acertos, tentativas FROM acertos_seletores"
+                )
+            }
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho_banco, timeout=30)
+
+    def taxa_acerto(self, elemento, xpath):
+        """Taxa de acerto suavizada: candidatos nunca usados começam em 0,5."""
+        acertos, tentativas = self.estatisticas.get((elemento, xpath), (0, 0))
+        return (acertos + 1) / (tentativas + 2)
+
+    def ordenar(self, elemento, candidatos):
+        """Ordena os candidatos pela taxa de acerto (empates mantêm a ordem original)."""
+        return sorted(candidatos, key=lambda xpath: -self.taxa_acerto(elemento, xpath))
+
+    def registrar(self, elemento, candidatos, vencedor):
+        """
+        Conta uma tentativa para cada candidato e um acerto para o vencedor (None se nenhum funcionou).
+        O banco recebe só os incrementos, para não desfazer o que outros processos do pool gravaram.
+        """
+        agora = datetime.now().isoformat(timespec="seconds")
+        with closing(self._conectar()) as conexao:
+            for xpath in candidatos:
+                acerto = int(xpath == vencedor)
+                acertos, tentativas = self.estatisticas.get((elemento, xpath), (0, 0))
+                self.estatisticas[(elemento, xpath)] = (acertos + acerto, tentativas + 1)
+                conexao.execute(
+                    """
+                    INSERT INTO acertos_seletores VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT (elemento, xpath) DO UPDATE SET
+                        acertos = acertos + excluded.acertos,
+                        tentativas = tentativas + excluded.tentativas,
+                        atualizado_em = excluded.atualizado_em
+                    """,
+                    (elemento, xpath, acerto, agora),
+                )
+            conexao.commit()
+
+    def sondar(self, driver, elemento, candidatos, tempo_espera=2):
+        """
+        Espera até algum candidato aparecer e devolve os presentes, na ordem de taxa de acerto.
+
+        Returns:
+            list: XPaths presentes na página (vazia se nenhum apareceu no tempo de espera).
+        """
+        ordenados = self.ordenar(elemento, candidatos)
+        limite = time.monotonic() + tempo_espera
+        while True:
+            try:
+                encontrados = driver.execute_script(SCRIPT_SONDAR_XPATHS, ordenados)
+            except WebDriverException:
+                encontrados = []
+            presentes = [xpath for xpath, achou in zip(ordenados, encontrados or []) if achou]
+            if presentes or time.monotonic() >= limite:
+                return presentes
+            time.sleep(0.1)
+
+    def clicar_primeiro(self, driver, elemento, candidatos, clicar, tempo_espera=2):
+        """
+        Clica no primeiro candidato presente que aceitar o clique e grava o resultado.
+
+        Args:
+            clicar: função `(driver, xpath)` que clica e levanta exceção em caso de falha.
+
+        Returns:
+            str | None: o XPath usado, ou None se nenhum candidato funcionou.
+        """
+        vencedor = None
+        with etapa(f"clicar_primeiro:{elemento}") as atual:
+            atual.tentativas = 0
+            for xpath in self.sondar(driver, elemento, candidatos, tempo_espera):
+                atual.tentativas += 1
+                try:
+                    clicar(driver, xpath)
+                    vencedor = xpath
+                    break
+                except Exception as e:
+                    print(f"Falha ao clicar em '{elemento}' com o XPath {xpath}: {e}. Tentando o próximo...")
+            atual.seletor = vencedor
+            if vencedor is None:
+                atual.resultado = "nenhum candidato"
+        self.registrar(elemento, candidatos, vencedor)
+        return vencedor
+
+
+_registro_seletores = None
+
+
+def registro_seletores():
+    """Devolve o registro de seletores do processo, carregando as estatísticas na primeira chamada."""
+    global _registro_seletores
+    if _registro_seletores is None:
+        _registro_seletores = RegistroSeletores()
+    return _registro_seletores
@@ -0,0 +1,306 @@
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# Páginas gravadas (arquivos <tipo>_<número>.html) servidas no lugar das páginas geradas
+DIRETORIO_PAGINAS_SIMULADAS = os.environ.get("DIRETORIO_PAGINAS_SIMULADAS")
+MODALIDADES_SIMULADAS = ["Termo de Fomento", "Convênio"]
+
+
+def _numero_estavel(texto, modulo):
+    """Número derivado do texto, igual em todas as execuções (dados simulados reproduzíveis)."""
+    return int(hashlib.sha1(str(texto).encode("utf-8")).hexdigest(), 16) % modulo
+
+
+def _aninhar(caminho, conteudo):
+    """
+    Envolve o conteúdo em elementos que reproduzem um caminho absoluto do portal, ex.:
+    [("div", 3), ("div", 16)] → dois <div> vazios, depois <div> com 15 <div> vazios e o conteúdo.
+    """
+    for tag, posicao in reversed(caminho):
+        conteudo = f"<{tag}></{tag}>" * (posicao - 1) + f"<{tag}>{conteudo}</{tag}>"
+    return conteudo
+
+
+def _layout(titulo, corpo):
+    """Cabeçalho comum do portal (logo e menu principal) seguido do conteúdo da página."""
+    itens_menu = "".join(f'<li><a href="/consulta?item={indice}">Consultar {indice}</a></li>' for indice in range(1, 9))
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{escape(titulo)}</title></head><body>"
+        '<div id="logo"><a href="/menuPrincipal">Transferegov (simulado)</a></div>'
+        '<div id="menuPrincipal"><div><div>Início</div><div>Propostas</div><div>Execução</div>'
+        '<div onclick="document.getElementById(\'contentMenu\').style.display=\'block\'">Consultas</div></div></div>'
+        f'<div id="contentMenu"><div><ul>{itens_menu}</ul></div></div>'
+        f"{corpo}</body></html>"
+    )
+
+
+def pagina_menu():
+    return _layout("Menu principal", "<p>Bem-vindo.</p>")
+
+
+def pagina_consulta():
+    return _layout(
+        "Consultar instrumento",
+        '<form action="/consultarNumeroConvenio" method="post">'
+        '<input type="hidden" name="invalidatePageControlCounter" value="1">'
+        '<input type="text" id="consultarNumeroConvenio" name="numeroConvenio" value="">'
+        '<input type="submit" id="form_submit" name="acao" value="Consultar">'
+        "</form>",
+    )
+
+
+def pagina_resultado_pesquisa(numero):
+    if not numero:
+        return _layout("Resultado", "<p>Nenhum registro encontrado.</p>")
+    return _layout(
+        "Resultado",
+        f'<table><tr><td id="instrumentoId"><a href="/instrumento?id={escape(numero)}">{escape(numero)}</a></td></tr></table>',
+    )
+
+
+def dados_instrumento(numero):
+    """Término e modalidade simulados (estáveis) do instrumento."""
+    termino = date.today() + timedelta(days=_numero_estavel(numero, 720) - 120)
+    modalidade = MODALIDADES_SIMULADAS[_numero_estavel(numero, len(MODALIDADES_SIMULADAS))]
+    return termino, modalidade
+
+
+def pagina_detalhe(numero):
+    termino, modalidade = dados_instrumento(numero)
+    return _layout(
+        f"Instrumento {numero}",
+        f"<h1>Instrumento {escape(numero)}</h1><table>"
+        f'<tr id="tr-alterarNumero"><td>Número</td><td>{escape(numero)}</td></tr>'
+        f'<tr id="tr-alterarTerminoVigencia"><td>Término da vigência</td><td>{termino:%d/%m/%Y}</td></tr>'
+        f'<tr id="tr-alterarModalidade"><td>Modalidade</td><td><table><tbody><tr><td>{escape(modalidade)}</td>'
+        "</tr></tbody></table></td></tr></table>"
+        f'<a id="linkAnexos" href="/anexos?id={escape(numero)}">Anexos</a>'
+        # Menu "Plano de Trabalho" → "Ajustes do PT", nos ids lidos por AjustePT
+        '<div id="div_-173460853"><span><span>Plano de Trabalho</span></span></div>'
+        f'<a id="menu_link_-173460853_-1293190284" href="/ajustes?id={escape(numero)}">'
+        "<div><span><span>Ajustes do PT</span></span></div></a>",
+    )
+
+
+def pagina_ajustes(numero):
+    """Lista de ajustes do PT; um instrumento em cada dez não tem ajuste em análise."""
+    situacao = "Concluído" if _numero_estavel(f"{numero}-ajuste", 10) == 0 else "Em Análise"
+    linhas = "".join(
+        f"<tr><td>Ajuste {indice}</td><td>{situacao if indice == 5 else 'Concluído'}</td><td>Solicitação</td>"
+        f'<td><nobr><a href="/solicitacao?id={escape(numero)}">Detalhar</a></nobr></td></tr>'
+        for indice in range(1, 6)
+    )
+    return _layout(f"Ajustes do PT {numero}", f'<table id="row"><tbody id="tbodyrow">{linhas}</tbody></table>')
+
+
+def pagina_solicitacao(numero):
+    solicitacao = date.today() - timedelta(days=_numero_estavel(f"{numero}-solicitacao", 90))
+    return _layout(
+        f"Ajuste do PT {numero}",
+        f'<table><tr id="tr-editarDataSolicitacao"><td>Data da Solicitação</td><td>{solicitacao:%d/%m/%Y}</td></tr></table>',
+    )
+
+
+def pagina_anexos(numero):
+    quantidade = _numero_estavel(numero, 6)
+    linhas = "".join(
+        f"<tr><td>Anexo {indice}</td><td>Documento</td>"
+        f"<td><div>{date.today() - timedelta(days=_numero_estavel(f'{numero}-{indice}', 400)):%d/%m/%Y}</div></td></tr>"
+        for indice in range(1, quantidade + 1)
+    )
+    return _layout(
+        f"Anexos {numero}",
+        f'<h1>Anexos do instrumento {escape(numero)}</h1><table><tbody id="tbodyrow">{linhas}</tbody></table>',
+    )
+
+
+def pagina_requisitos(proposta):
+    """Seções de Requisitos para celebração nos caminhos absolutos lidos por configuracao_planilha."""
+    secoes = ""
+    for indice in range(1, 5):
+        momento = date.today() - timedelta(days=_numero_estavel(f"{proposta}-{indice}", 300))
+        secoes += f"<div><table><tbody><tr><td>Seção {indice}</td><td>{momento:%d/%m/%Y} 10:00:00</td></tr></tbody></table></div>"
+    secoes += (
+        "<div><table><tbody><tr><td>Aprovado</td><td>Histórico</td>"
+        f"<td>{date.today():%d/%m/%Y} 09:30:00</td></tr></tbody></table></div>"
+    )
+    formulario = _aninhar([("div", 3), ("div", 16), ("div", 2), ("div", 2)], f"<form><div>{secoes}</div></form>")
+    # O cabeçalho do portal ocupa os dois primeiros <div> do <body>
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Requisitos {escape(proposta)}</title></head>"
+        f"<body>{formulario}</body></html>"
+    )
+
+
+def pagina_membros(numero):
+    cargos = ["Tesoureiro", "Presidente", "Secretário"]
+    linhas = "".join(
+        f'<tr><td>Membro {indice}</td><td title="{cargo}">{cargo}</td>'
+        f'<td><button id="tblMembros_acoes_{indice}" type="button">Ações</button></td></tr>'
+        for indice, cargo in enumerate(cargos, start=1)
+    )
+    return _layout(f"Membros {numero}", f'<table id="tblMembros"><tbody>{linhas}</tbody></table>')
+
+
+def pagina_login():
+    return _layout(
+        "Login",
+        '<form action="/login" method="post"><input type="text" name="usuario"><input type="password" name="senha"></form>',
+    )
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Mantém as conexões abertas (keep-alive), como o portal
+    # Cabeçalho e corpo saem em escritas separadas; sem isso o Nagle soma ~40 ms a cada resposta
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _parametros(self):
+        partes = urlsplit(self.path)
+        parametros = parse_qs(partes.query)
+        if self.command == "POST":
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            parametros.update(parse_qs(self.rfile.read(tamanho).decode("utf-8")))
+        return partes.path, {chave: valores[-1] for chave, valores in parametros.items()}
+
+    def _responder(self, status, corpo):
+        conteudo = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def _gravada(self, tipo, numero):
+        diretorio = self.server.simulador.diretorio_paginas
+        if not (diretorio and numero):
+            return None
+        caminho = os.path.join(diretorio, f"{tipo}_{numero}.html")
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, encoding="utf-8") as arquivo:
+            return arquivo.read()
+
+    def _atender(self):
+        simulador = self.server.simulador
+        caminho, parametros = self._parametros()
+        simulador.contar(caminho)
+        simulador.aguardar_latencia()
+
+        sorteio = simulador.sortear()
+        if sorteio < simulador.taxa_falhas:
+            return self._responder(503, "<html><body>Serviço indisponível</body></html>")
+        if sorteio < simulador.taxa_falhas + simulador.taxa_sessao_expirada:
+            return self._responder(200, pagina_login())
+
+        numero = (parametros.get("id") or parametros.get("numeroConvenio") or parametros.get("proposta") or "").strip()
+        rotas = {
+            "/": ("menu", pagina_menu),
+            "/menuPrincipal": ("menu", pagina_menu),
+            "/consulta": ("consulta", pagina_consulta),
+            "/consultarNumeroConvenio": ("pesquisa", lambda: pagina_resultado_pesquisa(numero)),
+            "/instrumento": ("detalhe", lambda: pagina_detalhe(numero)),
+            "/anexos": ("anexos", lambda: pagina_anexos(numero)),
+            "/ajustes": ("ajustes", lambda: pagina_ajustes(numero)),
+            "/solicitacao": ("solicitacao", lambda: pagina_solicitacao(numero)),
+            "/requisitos": ("requisitos", lambda: pagina_requisitos(numero)),
+            "/membros": ("membros", lambda: pagina_membros(numero)),
+        }
+        if caminho not in rotas:
+            return self._responder(404, "<html><body>Página não encontrada</body></html>")
+        tipo, gerar = rotas[caminho]
+        self._responder(200, self._gravada(tipo, numero) or gerar())
+
+    do_GET = _atender
+    do_POST = _atender
+
+
+class ServidorSimulado:
+    """
+    Servidor local que imita as páginas do Transferegov usadas pelos robôs (menu, consulta por
+    número, detalhes do instrumento, anexos, ajustes do PT, requisitos e membros), para medir e
+    comparar a velocidade dos robôs sem acessar o portal.
+
+    Args:
+        latencia (float): Atraso médio, em segundos, de cada resposta.
+        variacao (float): Desvio padrão do atraso.
+        taxa_falhas (float): Fração das respostas devolvidas como HTTP 503.
+        taxa_sessao_expirada (float): Fração das respostas devolvidas como tela de login.
+        diretorio_paginas (str, opcional): Pasta com páginas gravadas (<tipo>_<número>.html),
+            servidas no lugar das páginas geradas.
+        semente (int, opcional): Semente do sorteio de latências e falhas.
+    """
+
+    def __init__(self, porta=0, latencia=0.0, variacao=0.0, taxa_falhas=0.0, taxa_sessao_expirada=0.0,
+                 diretorio_paginas=DIRETORIO_PAGINAS_SIMULADAS, semente=None):
+        self.latencia = latencia
+        self.variacao = variacao
+        self.taxa_falhas = taxa_falhas
+        self.taxa_sessao_expirada = taxa_sessao_expirada
+        self.diretorio_paginas = diretorio_paginas
+        self.requisicoes = {}
+        self._aleatorio = random.Random(semente)
+        self._trava = threading.Lock()
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", porta), _Manipulador)
+        self.servidor.daemon_threads = True
+        self.servidor.simulador = self
+        self.thread = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def contar(self, caminho):
+        with self._trava:
+            self.requisicoes[caminho] = self.requisicoes.get(caminho, 0) + 1
+
+    def sortear(self):
+        with self._trava:
+            return self._aleatorio.random()
+
+    def aguardar_latencia(self):
+        if not (self.latencia or self.variacao):
+            return
+        with self._trava:
+            atraso = self._aleatorio.gauss(self.latencia, self.variacao)
+        time.sleep(max(0.0, atraso))
+
+    def iniciar(self):
+        """Atende as requisições em uma thread em segundo plano."""
+        self.thread = threading.Thread(target=self.servidor.serve_forever, name="servidor-simulado", daemon=True)
+        self.thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, tipo, valor, rastreamento):
+        self.parar()
+        return False
+
+
+if __name__ == "__main__":
+    # Ex.: python servidor_simulado.py 8765 0.3  →  portal simulado na porta 8765, com 300 ms por resposta
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    simulador = ServidorSimulado(porta, latencia=latencia)
+    print(f"[INFO] Portal simulado em {simulador.url_base} (Ctrl+C para encerrar).")
+    try:
+        simulador.servidor.serve_forever()
+    except KeyboardInterrupt:
+        simulador.parar()
@@ -0,0 +1,183 @@
+import os
+from datetime import datetime
+from urllib.parse import urljoin
+
+import requests
+from lxml import html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from arquivo_paginas import arquivar_pagina
+from extracao_html import normalizar_texto, texto
+from navegacao import XPATH_CAMPO_PESQUISA, abrir_tela_consulta, guardar_link_instrumento, obter_link_instrumento
+
+
+# Motor de coleta: "navegador" (padrão), "http" (consulta direta reaproveitando a sessão do Chrome)
+# ou "assincrono" (consultas HTTP concorrentes, ver motor_assincrono.py)
+MOTOR_COLETA = os.environ.get("MOTOR_COLETA", "navegador")
+TEMPO_LIMITE_HTTP = float(os.environ.get("TEMPO_LIMITE_HTTP", "15"))
+
+# XPaths tolerantes à ausência de <tbody>, que o navegador insere mas o HTML do servidor pode não ter
+XPATH_HTML_DATA_TERMINO = '//*[@id="tr-alterarTerminoVigencia"]/td[2]'
+XPATH_HTML_MODALIDADE = '//*[@id="tr-alterarModalidade"]/td[2]/table//tr/td[1]'
+XPATH_HTML_DETALHE_INSTRUMENTO = '//*[@id="instrumentoId"]/a'
+# Elemento que confirma que a página baixada é do tipo esperado
+MARCADORES_PAGINA = {
+    "detalhe": XPATH_HTML_DATA_TERMINO,
+    "anexos": '//*[@id="tbodyrow"]',
+}
+# Sinais de que a resposta é a tela de login (sessão expirada) e não a página pedida
+XPATH_HTML_LOGIN = '//input[@type="password"] | //form[contains(@action, "login")]'
+
+
+def criar_sessao_http(driver, conexoes=10):
+    """
+    Cria uma sessão HTTP keep-alive autenticada com os cookies do Chrome conectado.
+
+    A sessão usa um pool de conexões reaproveitáveis e o mesmo User-Agent do navegador, de modo
+    que o portal a trate como a mesma sessão já autenticada pelo usuário. Sem navegador
+    (driver=None, ex.: portal simulado), a sessão é criada sem cookies.
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(
+        pool_connections=conexoes,
+        pool_maxsize=conexoes,
+        max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+    )
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    if driver is not None:
+        sessao.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+        atualizar_cookies(sessao, driver)
+    return sessao
+
+
+def atualizar_cookies(sessao, driver):
+    """Copia para a sessão HTTP os cookies atuais do navegador (ex.: depois de um novo login)."""
+    for cookie in driver.get_cookies():
+        sessao.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+
+
+def pagina_exige_navegador(arvore):
+    """Indica se a página recebida não serve para extração direta (tela de login ou conteúdo vazio)."""
+    return arvore is None or bool(arvore.xpath(XPATH_HTML_LOGIN)) or not normalizar_texto(arvore.text_content())
+
+
+def pagina_do_instrumento(arvore, numero_instrumento, tipo="detalhe"):
+    """
+    Confere se a página baixada é a página esperada do instrumento, e não login, erro ou outro
+    instrumento. O número é conferido em todos os tipos de página: com várias consultas simultâneas
+    na mesma sessão, um link que dependa do estado da sessão pode devolver a página de outro instrumento.
+    """
+    if pagina_exige_navegador(arvore) or not arvore.xpath(MARCADORES_PAGINA[tipo]):
+        return False
+    return str(numero_instrumento) in arvore.text_content()
+
+
+def link_detalhe_da_pesquisa(arvore, url_final):
+    """Extrai do resultado da pesquisa o link navegável da página de detalhes, ou None."""
+    if arvore is None:
+        return None
+    links = arvore.xpath(XPATH_HTML_DETALHE_INSTRUMENTO + "/@href")
+    if not links or links[0].startswith("javascript"):
+        return None
+    return urljoin(url_final, links[0])
+
+
+def dados_formulario_consulta(formulario, numero_instrumento):
+    """Monta os campos do formulário de consulta preenchidos com o número do instrumento."""
+    dados = dict(formulario["campos"])
+    dados[formulario["campo_numero"]] = str(numero_instrumento)
+    return dados
+
+
+def buscar_pagina(sessao, url, metodo="get", dados=None):
+    """Busca uma página pela sessão HTTP e devolve (árvore lxml, URL final), ou (None, None) em caso de falha."""
+    try:
+        if metodo == "post":
+            resposta = sessao.post(url, data=dados, timeout=TEMPO_LIMITE_HTTP)
+        else:
+            resposta = sessao.get(url, params=dados, timeout=TEMPO_LIMITE_HTTP)
+        resposta.raise_for_status()
+        return html.fromstring(resposta.content), resposta.url
+    except (requests.RequestException, ValueError) as e:
+        print(f"[ERRO] Falha na requisição HTTP para {url}: {e}")
+        return None, None
+
+
+def capturar_formulario_consulta(driver, item_menu=6):
+    """
+    Abre a tela de consulta no navegador e lê o formulário que contém 'consultarNumeroConvenio'.
+
+    Returns:
+        dict | None: ação (URL absoluta), método, campos com seus valores padrão e nome do campo de número.
+    """
+    abrir_tela_consulta(driver, item_menu)
+    return formulario_da_pagina(html.fromstring(driver.page_source), driver.current_url)
+
+
+def formulario_da_pagina(arvore, url_pagina):
+    """Lê o formulário de consulta de uma página já obtida (navegador ou HTTP); ver `capturar_formulario_consulta`."""
+    formularios = arvore.xpath(XPATH_CAMPO_PESQUISA + "/ancestor::form[1]")
+    campos_numero = arvore.xpath(XPATH_CAMPO_PESQUISA)
+    if not formularios or not campos_numero:
+        print("[ERRO] Formulário de consulta não encontrado na página atual.")
+        return None
+
+    formulario = formularios[0]
+    campos = {}
+    for campo in formulario.xpath(".//input[@name] | .//select[@name]"):
+        if campo.get("type") in ("submit", "button", "image", "checkbox", "radio"):
+            continue
+        campos[campo.get("name")] = campo.get("value", "")
+    botao = formulario.xpath('.//*[@id="form_submit"][@name]')
+    if botao:
+        campos[botao[0].get("name")] = botao[0].get("value", "")
+
+    return {
+        "acao": urljoin(url_pagina, formulario.get("action") or url_pagina),
+        "metodo": (formulario.get("method") or "get").lower(),
+        "campos": campos,
+        "campo_numero": campos_numero[0].get("name"),
+    }
+
+
+def pesquisar_instrumento_http(sessao, formulario, numero_instrumento):
+    """Envia o formulário de consulta pela sessão HTTP e devolve o link da página de detalhes, ou None."""
+    if not formulario or not formulario.get("campo_numero"):
+        return None
+    dados = dados_formulario_consulta(formulario, numero_instrumento)
+    arvore, url_final = buscar_pagina(sessao, formulario["acao"], formulario["metodo"], dados)
+    return link_detalhe_da_pesquisa(arvore, url_final)
+
+
+def abrir_detalhe_http(sessao, numero_instrumento, formulario=None):
+    """
+    Busca por HTTP a página de detalhes do instrumento (link gravado ou formulário de consulta).
+
+    Returns:
+        lxml.html.HtmlElement | None: a árvore da página, ou None se for preciso recorrer ao navegador.
+    """
+    url = obter_link_instrumento(numero_instrumento)
+    if not url:
+        url = pesquisar_instrumento_http(sessao, formulario, numero_instrumento)
+        if not url:
+            return None
+        guardar_link_instrumento(numero_instrumento, url)
+
+    arvore, url_final = buscar_pagina(sessao, url)
+    if not pagina_do_instrumento(arvore, numero_instrumento):
+        return None
+    arquivar_pagina(numero_instrumento, "detalhe", arvore, url_final)
+    return arvore
+
+
+def extrair_data_termino_html(arvore):
+    """Lê a data de término de vigência da página de detalhes já baixada."""
+    data_texto = texto(arvore, XPATH_HTML_DATA_TERMINO)
+    return datetime.strptime(data_texto, "%d/%m/%Y") if data_texto else None
+
+
+def extrair_modalidade_html(arvore):
+    """Lê a modalidade da página de detalhes já baixada."""
+    return texto(arvore, XPATH_HTML_MODALIDADE)
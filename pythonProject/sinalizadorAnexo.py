@@ -1,18 +1,25 @@
 import os
-import openpyxl
-import pyperclip
+import sys
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from datetime import datetime
 
 from AjustePT import clicar_elemento
-from robov1 import clicar_e_colar
+from arquivo_paginas import reprocessar_paginas
+from escritor_segundo_plano import EscritorSegundoPlano
+from extracao_html import capturar_pagina, data_mais_recente, textos
+from gravador_resultados import GravadorResultados
+from modelo_instrumento import Instrumento, formatar_data, instrumentos_do_controle
+from navegacao import abrir_detalhe_instrumento, guardar_link_instrumento, link_identifica_instrumento
+from navegador_gerenciado import conectar_navegador
+from planilha_controle import STATUS_ATIVO, carregar_controle
+from pool_navegadores import NUM_NAVEGADORES, aguardar_porta_depuracao, executar_em_paralelo
+from rastreamento import emitir_relatorio, medir
+from registro_execucao import RegistroExecucao
+from saude_sessao import SessaoExpirada, processar_com_reinicio
+from sessao_http import MOTOR_COLETA
 
 
 def conectar_navegador_existente(retentativas=3):
@@ -20,14 +27,12 @@ def conectar_navegador_existente(retentativas=3):
     for tentativa in range(1, retentativas + 1):
         try:
             print(f"[INFO] Tentativa {tentativa} de conectar ao navegador na porta 9222...")
-            options = webdriver.ChromeOptions()
-            options.debugger_address = "localhost:9222"
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+            driver = conectar_navegador()
             print("[INFO] Conectado ao navegador existente com sucesso.")
             return driver
         except WebDriverException as e:
             print(f"[ERRO] Erro ao conectar ao navegador (tentativa {tentativa}): {e}")
-            time.sleep(3)
+            aguardar_porta_depuracao(9222, tempo_limite=3)  # Segue assim que o Chrome responder
     print("[ERRO] Não foi possível conectar ao navegador após múltiplas tentativas.")
     return None
 
@@ -46,27 +51,10 @@ def acessar_aba_anexos(driver):
 def coletar_dados_instrumentos(nome_arquivo, aba):
     """Extrai dados das colunas 'Número do Instrumento', 'Técnico Responsável' e 'Email' apenas para instrumentos ativos."""
     try:
-        wb = openpyxl.load_workbook(nome_arquivo)
-        ws = wb[aba]
-        cabecalho = [cell.value for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-        print(f"[DEBUG] Cabeçalho encontrado: {cabecalho}")
-
-        required_columns = ["Instrumento nº", "Técnico", "e-mail do Técnico", "Status"]
-        col_indices = {col: cabecalho.index(col) for col in required_columns if col in cabecalho}
-
-        if len(col_indices) < len(required_columns):
-            print("[ERRO] Algumas colunas obrigatórias não foram encontradas no Excel de controle.")
-            return []
-
-        dados_instrumentos = [
-            [
-                row[col_indices["Instrumento nº"]].value or "Não encontrado",
-                row[col_indices["Técnico"]].value or "Não encontrado",
-                row[col_indices["e-mail do Técnico"]].value or "Não encontrado",
-            ]
-            for row in ws.iter_rows(min_row=2)
-            if row[col_indices["Status"]].value == "ATIVOS TODOS"
-        ]
+        controle = carregar_controle(nome_arquivo, aba)
+        colunas = ["Instrumento nº", "Técnico", "e-mail do Técnico"]
+        ativos = controle.loc[controle["Status"] == STATUS_ATIVO, colunas].astype(object)
+        dados_instrumentos = instrumentos_do_controle(ativos.where(ativos.notna(), "Não encontrado"))
         print(f"[INFO] {len(dados_instrumentos)} instrumentos ativos encontrados.")
         return dados_instrumentos
     except Exception as e:
@@ -74,55 +62,123 @@ def coletar_dados_instrumentos(nome_arquivo, aba):
         return []
 
 
-def inicializar_arquivo_excel(caminho_arquivo_excel):
-    """Inicializa o arquivo Excel e cria o cabeçalho se ele ainda não existir."""
-    diretorio_excel = os.path.dirname(caminho_arquivo_excel)
-    if not os.path.exists(diretorio_excel):
-        os.makedirs(diretorio_excel)
+# Relatório de saída e suas colunas
+CAMINHO_RELATORIO = r'C:\Users\diego.brito\Downloads\robov1\relatorio_instrumentos.xlsx'
+COLUNAS_RELATORIO = ["Número do Instrumento", "Técnico Responsável", "Email", "AnexosExistentes", "NovosAnexos"]
+# Relatório gerado ao reextrair as abas de anexos arquivadas (ver arquivo_paginas.py)
+CAMINHO_RELATORIO_REPROCESSADO = r'C:\Users\diego.brito\Downloads\robov1\relatorio_instrumentos_reprocessado.xlsx'
+SEM_ANEXOS = "Sem anexos"
+ERRO_CAPTURA_ANEXO = "Erro ao capturar data"
 
-    if not os.path.exists(caminho_arquivo_excel):
-        workbook = openpyxl.Workbook()
-        planilha = workbook.active
-        planilha.title = "Dados Processados"
-        planilha.append(["Número do Instrumento", "Técnico Responsável", "Email", "AnexosExistentes", "NovosAnexos"])
-        workbook.save(caminho_arquivo_excel)
-        print(f"[INFO] Arquivo Excel '{caminho_arquivo_excel}' inicializado com o cabeçalho.")
-    else:
-        print(f"[INFO] Arquivo Excel '{caminho_arquivo_excel}' já existe e será atualizado.")
+
+def extrair_data_ultimo_anexo(pagina):
+    """Extrai, do HTML já capturado da aba de anexos, a data (date) de upload mais recente, ou None sem anexos."""
+    ultima_data, invalidos = data_mais_recente(textos(pagina, '//*[@id="tbodyrow"]/tr/td[3]/div'), "%d/%m/%Y")
+    if invalidos:
+        raise ValueError(f"Datas inválidas na tabela de anexos: {invalidos}")
+    return ultima_data.date() if ultima_data else None
 
 
+@medir("capturar_data_ultimo_anexo")
 def capturar_data_ultimo_anexo(driver, numero_do_instrumento):
-    """Captura a data de upload mais atual dos anexos na tabela de anexos para um instrumento específico."""
+    """
+    Captura a data de upload mais atual dos anexos na tabela de anexos para um instrumento específico.
+    Levanta TimeoutException, NoSuchElementException ou ValueError se a tabela não puder ser lida.
+    """
+    WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.XPATH, '//*[@id="tbodyrow"]/tr')))
+    # Lê a tabela inteira de uma vez e extrai as datas localmente
+    return extrair_data_ultimo_anexo(capturar_pagina(driver, numero_do_instrumento, "anexos"))
+
+
+def linha_relatorio(instrumento, anexos=None):
+    """
+    Monta a linha do relatório a partir do registro do instrumento; a data do último anexo só é
+    formatada aqui. `anexos` substitui essa coluna (ex.: ERRO_CAPTURA_ANEXO).
+    """
+    if anexos is None:
+        anexos = formatar_data(instrumento.data_ultimo_anexo, SEM_ANEXOS)
+    return [instrumento.numero, instrumento.tecnico, instrumento.email_tecnico, anexos, "Nenhum"]
+
+
+def captura_concluida(linha):
+    """A linha só conclui o instrumento se a data do último anexo foi lida; erros de captura são refeitos ao retomar."""
+    return linha is not None and linha[3] != ERRO_CAPTURA_ANEXO
+
+
+def linha_da_pagina_anexos(instrumento, pagina):
+    """Monta a linha do relatório a partir do HTML da aba de anexos (usado pelo motor assíncrono)."""
     try:
-        WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.XPATH, '//*[@id="tbodyrow"]/tr')))
-        data_elements = driver.find_elements(By.XPATH, '//*[@id="tbodyrow"]/tr/td[3]/div')
-        datas = [
-            datetime.strptime(element.text.strip(), "%d/%m/%Y")
-            for element in data_elements if element.text.strip()
-        ]
-        if datas:
-            ultima_data = max(datas)
-            return ultima_data.strftime("%d/%m/%Y")
-        else:
-            return "Sem anexos"
+        instrumento.data_ultimo_anexo = extrair_data_ultimo_anexo(pagina)
+    except ValueError:
+        return None
+    return linha_relatorio(instrumento)
+
+
+@medir("processar_instrumento", lambda navegador_web, instrumento: instrumento.numero)
+def processar_instrumento(navegador_web, instrumento):
+    """Consulta um instrumento, captura a data do último anexo e devolve a linha para o relatório."""
+    numero_do_instrumento = instrumento.numero
+    abrir_detalhe_instrumento(navegador_web, numero_do_instrumento)
+
+    acessar_aba_anexos(navegador_web)
+    try:
+        instrumento.data_ultimo_anexo = capturar_data_ultimo_anexo(navegador_web, numero_do_instrumento)
     except (TimeoutException, NoSuchElementException, ValueError):
-        return "Erro ao capturar data"
+        return linha_relatorio(instrumento, ERRO_CAPTURA_ANEXO)
+    # Tabela de anexos lida: a URL aberta é a da aba de anexos, guardada para consultas diretas (motor assíncrono)
+    # apenas se identificar o instrumento; senão ela depende do estado da sessão
+    url_anexos = navegador_web.current_url
+    if url_anexos.startswith("http") and link_identifica_instrumento(url_anexos, numero_do_instrumento):
+        guardar_link_instrumento(numero_do_instrumento, url_anexos, tipo="anexos")
+    return linha_relatorio(instrumento)
 
 
-def executar_processo():
-    """Executa o processo principal de coleta de dados e atualização no Excel."""
-    navegador_web = conectar_navegador_existente()
-    if not navegador_web:
-        return
+def registrar_resultado(gravador, registro, dados_instrumento, linha):
+    """Grava a linha no relatório e marca o instrumento no registro de execução (executado pelo escritor em segundo plano)."""
+    if linha is not None:
+        print(f"[DEBUG] Salvando linha: {linha}")
+        gravador.registrar(linha)
+    registro.marcar(dados_instrumento.numero, concluido=captura_concluida(linha))
+
+
+def processar_em_sequencia(navegador_web, lista_dados_instrumentos):
+    """
+    Processa os instrumentos um a um no navegador informado, devolvendo (instrumento, linha) a cada consulta.
+    Se a sessão cair, o navegador é reiniciado e a consulta retomada pelo instrumento interrompido.
+    """
+    total_instrumentos = len(lista_dados_instrumentos)
+    posicoes = {id(dados_instrumento): idx for idx, dados_instrumento in enumerate(lista_dados_instrumentos, start=1)}
+
+    def processar_com_log(navegador, dados_instrumento):
+        idx = posicoes[id(dados_instrumento)]
+        inicio = time.perf_counter()
+        print(f"[INFO] Processando instrumento {idx}/{total_instrumentos}: {dados_instrumento.numero}")
+        try:
+            return processar_instrumento(navegador, dados_instrumento)
+        except SessaoExpirada:
+            raise  # Tratada por processar_com_reinicio, que reinicia o navegador
+        except Exception as erro:
+            print(f"[ERRO] Instrumento {idx}/{total_instrumentos}: Falha ao processar {dados_instrumento.numero}: {erro}")
+            return None
+        finally:
+            fim = time.perf_counter()
+            print(f"[INFO] Instrumento {idx}/{total_instrumentos} processado em {fim - inicio:.2f} segundos.")
+
+    return processar_com_reinicio(navegador_web, lista_dados_instrumentos, processar_com_log)
 
+
+def executar_processo(num_navegadores=NUM_NAVEGADORES, motor=MOTOR_COLETA):
+    """
+    Executa o processo principal de coleta de dados e atualização no Excel.
+    Com num_navegadores > 1, distribui os instrumentos entre navegadores isolados.
+    Com motor="assincrono", lê por HTTP concorrente as abas de anexos cujo link já foi gravado
+    em execuções anteriores e usa o navegador para as demais.
+    Instrumentos já concluídos na execução atual são pulados ao retomar uma execução interrompida.
+    """
     # Caminhos dos arquivos
     caminho_arquivo_controle = r'C:\Users\diego.brito\Downloads\robov1\CONTROLE DE PARCERIAS CGAP.xlsx'
-    caminho_novo_arquivo_excel = r'C:\Users\diego.brito\Downloads\robov1\relatorio_instrumentos.xlsx'
     nome_da_aba_controle = 'PARCERIAS CGAP'
 
-    # Inicializa o arquivo Excel de saída
-    inicializar_arquivo_excel(caminho_novo_arquivo_excel)
-
     # Coleta os dados dos instrumentos no arquivo de controle
     lista_dados_instrumentos = coletar_dados_instrumentos(caminho_arquivo_controle, nome_da_aba_controle)
 
@@ -130,51 +186,71 @@ def executar_processo():
         print("[ERRO] Nenhum dado foi coletado. Processo encerrado.")
         return
 
-    dados_para_salvar = []
-    total_instrumentos = len(lista_dados_instrumentos)
+    registro = RegistroExecucao("sinalizadorAnexo")
+    lista_dados_instrumentos = registro.filtrar_pendentes(lista_dados_instrumentos, lambda item: item.numero)
 
-    for idx, (numero_do_instrumento, tecnico_responsavel, email_tecnico) in enumerate(lista_dados_instrumentos, start=1):
-        inicio = time.perf_counter()
-        print(f"[INFO] Processando instrumento {idx}/{total_instrumentos}: {numero_do_instrumento}")
-        try:
-            clicar_elemento(navegador_web, '//*[@id="logo"]/a')
-            pyperclip.copy(str(numero_do_instrumento))
-            clicar_elemento(navegador_web, '//*[@id="menuPrincipal"]/div[1]/div[4]')
-            clicar_elemento(navegador_web, '//*[@id="contentMenu"]/div[1]/ul/li[6]/a')
-            WebDriverWait(navegador_web, 10).until(
-                EC.presence_of_element_located((By.XPATH, '//*[@id="consultarNumeroConvenio"]'))
-            ).send_keys(numero_do_instrumento)
-            clicar_elemento(navegador_web, '//*[@id="form_submit"]')
-            clicar_elemento(navegador_web, '//*[@id="instrumentoId"]/a')
-
-            acessar_aba_anexos(navegador_web)
-            data_anexo = capturar_data_ultimo_anexo(navegador_web, numero_do_instrumento)
-
-            dados_para_salvar.append([
-                numero_do_instrumento,
-                tecnico_responsavel,
-                email_tecnico,
-                data_anexo,
-                "Nenhum",
-            ])
-        except Exception as erro:
-            print(f"[ERRO] Instrumento {idx}/{total_instrumentos}: Falha ao processar {numero_do_instrumento}: {erro}")
-        finally:
-            fim = time.perf_counter()
-            print(f"[INFO] Instrumento {idx}/{total_instrumentos} processado em {fim - inicio:.2f} segundos.")
+    if motor == "assincrono":
+        from motor_assincrono import executar_assincrono
+
+        navegador_web = conectar_navegador_existente()
+        if not navegador_web:
+            return
+        resultados = executar_assincrono(
+            navegador_web,
+            lista_dados_instrumentos,
+            lambda item: item.numero,
+            linha_da_pagina_anexos,
+            processar_instrumento,
+            tipo="anexos",
+        )
+    elif num_navegadores > 1:
+        resultados = executar_em_paralelo(lista_dados_instrumentos, processar_instrumento, num_navegadores)
+    else:
+        navegador_web = conectar_navegador_existente()
+        if not navegador_web:
+            return
+        resultados = processar_em_sequencia(navegador_web, lista_dados_instrumentos)
 
-    # Salvar todos os dados no Excel ao final
+    # Cada linha vai para o banco de resultados assim que é processada, gravada em uma thread à parte
+    gravador = GravadorResultados(
+        CAMINHO_RELATORIO, COLUNAS_RELATORIO, "Dados Processados",
+        coluna_instrumento="Número do Instrumento", robo="sinalizadorAnexo",
+    )
     try:
-        workbook = openpyxl.load_workbook(caminho_novo_arquivo_excel)
-        planilha = workbook.active
-        for linha in dados_para_salvar:
-            print(f"[DEBUG] Salvando linha: {linha}")
-            planilha.append(linha)
-        workbook.save(caminho_novo_arquivo_excel)
-        print("[INFO] Dados salvos no Excel com sucesso.")
-    except Exception as e:
-        print(f"[ERRO] Falha ao salvar os dados no Excel: {e}")
+        with EscritorSegundoPlano() as escritor:
+            for dados_instrumento, linha in resultados:
+                escritor.enviar(registrar_resultado, gravador, registro, dados_instrumento, linha)
+    finally:
+        gravador.fechar()
+        registro.fechar()
+        emitir_relatorio()
+
+
+def reprocessar_arquivo(execucao=None):
+    """
+    Reextrai a data do último anexo das abas de anexos arquivadas, sem navegador nem portal.
+    Técnico e e-mail vêm das últimas linhas do relatório normal.
+    """
+    gravador = GravadorResultados(
+        CAMINHO_RELATORIO_REPROCESSADO, COLUNAS_RELATORIO, "Dados Processados", robo="sinalizadorAnexo_reprocessado"
+    )
+    gravador.limpar()
+    responsaveis = {
+        str(linha[0]): (linha[1], linha[2]) for linha in gravador.banco.linhas(os.path.normpath(CAMINHO_RELATORIO))
+    }
+
+    def extrair(numero_do_instrumento, pagina):
+        tecnico, email_tecnico = responsaveis.get(numero_do_instrumento, (None, None))
+        return linha_da_pagina_anexos(Instrumento(numero_do_instrumento, tecnico, email_tecnico), pagina)
+
+    try:
+        reprocessar_paginas("anexos", extrair, lambda linha: gravador.registrar(linha, observacao=False), execucao)
+    finally:
+        gravador.fechar()
 
 
 if __name__ == "__main__":
-    executar_processo()
+    if "--reprocessar" in sys.argv:
+        reprocessar_arquivo()
+    else:
+        executar_processo()
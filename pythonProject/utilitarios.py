@@ -1,3 +1,113 @@
-import chromedriver_autoinstaller
+import os
+import re
+import shutil
+import subprocess
+import sys
+from functools import lru_cache
+from selenium.webdriver.chrome.service import Service
 
-chromedriver_autoinstaller.install(version="131.0.6778.85")  # Versão exata do ChromeDriver
\ No newline at end of file
+
+# Cópias locais do ChromeDriver, uma por versão principal do Chrome (drivers_chrome/<versão>/chromedriver)
+DIRETORIO_DRIVERS = os.environ.get(
+    "DIRETORIO_DRIVERS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "drivers_chrome"),
+)
+CAMINHO_CHROME = os.environ.get("CAMINHO_CHROME", r"C:\Program Files\Google\Chrome\Application\chrome.exe")
+# Versão fixa opcional (ex.: "131.0.6778.85"), usada quando a versão do Chrome não pode ser detectada
+VERSAO_CHROMEDRIVER = os.environ.get("VERSAO_CHROMEDRIVER")
+
+NOME_EXECUTAVEL = "chromedriver.exe" if sys.platform.startswith("win") else "chromedriver"
+
+
+def versao_chrome_local():
+    """
+    Detecta a versão do Chrome instalado sem acessar a rede.
+
+    No Windows lê o registro (não abre o navegador); nos demais sistemas executa `--version`.
+    Returns:
+        str | None: a versão completa (ex.: "131.0.6778.85"), ou None se não for possível detectar.
+    """
+    if sys.platform.startswith("win"):
+        import winreg
+
+        for raiz in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            try:
+                with winreg.OpenKey(raiz, r"Software\Google\Chrome\BLBeacon") as chave:
+                    return winreg.QueryValueEx(chave, "version")[0]
+            except OSError:
+                continue
+        return None
+
+    for binario in (CAMINHO_CHROME, "google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        try:
+            saida = subprocess.run([binario, "--version"], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        encontrada = re.search(r"\d+\.\d+\.\d+\.\d+", saida)
+        if encontrada:
+            return encontrada.group(0)
+    return None
+
+
+def _caminho_em_cache(versao_principal):
+    return os.path.join(DIRETORIO_DRIVERS, versao_principal, NOME_EXECUTAVEL)
+
+
+def _driver_mais_recente_em_cache():
+    """Devolve o ChromeDriver de maior versão já guardado, ou None."""
+    if not os.path.isdir(DIRETORIO_DRIVERS):
+        return None
+    versoes = sorted((nome for nome in os.listdir(DIRETORIO_DRIVERS) if nome.isdigit()), key=int, reverse=True)
+    for versao in versoes:
+        if os.path.exists(_caminho_em_cache(versao)):
+            return _caminho_em_cache(versao)
+    return None
+
+
+def _baixar_chromedriver(versao):
+    """Baixa o ChromeDriver da versão informada (ou o mais recente) e devolve o caminho baixado."""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    try:
+        return ChromeDriverManager(driver_version=versao).install()
+    except Exception as e:
+        print(f"[INFO] ChromeDriver {versao} não disponível para download ({e}). Baixando o mais recente.")
+        return ChromeDriverManager().install()
+
+
+@lru_cache(maxsize=None)
+def caminho_chromedriver():
+    """
+    Devolve o caminho do ChromeDriver compatível com o Chrome instalado.
+
+    O driver é procurado primeiro na cópia local da versão principal do Chrome, sem acesso à
+    rede. Só quando o Chrome muda de versão principal (ou na primeira execução) o driver é
+    baixado e guardado em DIRETORIO_DRIVERS para as próximas execuções.
+    """
+    versao = versao_chrome_local() or VERSAO_CHROMEDRIVER
+    if not versao:
+        caminho = _driver_mais_recente_em_cache()
+        if caminho:
+            print("[INFO] Versão do Chrome não detectada; usando o ChromeDriver mais recente em cache.")
+            return caminho
+        print("[INFO] Versão do Chrome não detectada; baixando o ChromeDriver mais recente.")
+        return _baixar_chromedriver(None)
+
+    versao_principal = versao.split(".")[0]
+    caminho = _caminho_em_cache(versao_principal)
+    if os.path.exists(caminho):
+        return caminho
+
+    print(f"[INFO] Chrome {versao}: ChromeDriver ainda não está em cache. Baixando...")
+    baixado = _baixar_chromedriver(versao)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_temporario = caminho + ".tmp"
+    shutil.copy2(baixado, caminho_temporario)
+    os.replace(caminho_temporario, caminho)
+    print(f"[INFO] ChromeDriver guardado em {caminho}.")
+    return caminho
+
+
+def servico_chromedriver():
+    """Cria o `Service` do Selenium com o ChromeDriver em cache."""
+    return Service(caminho_chromedriver())